@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is shed instead of admitted ("queue_full" or "deadline").
+    """
+
+    def __init__(self, reason):
+        super().__init__(f"Request not admitted: {reason}")
+        self.reason = reason
+
+
+class _LoopEvent:
+    """
+    Stand-in for threading.Event used by waiters on an event loop; set() may be called from any thread.
+    """
+
+    def __init__(self, loop):
+        self._loop = loop
+        self.future = loop.create_future()
+
+    def set(self):
+        self._loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class _Waiter:
+    __slots__ = ("user_id", "channel_id", "enqueued_at", "event", "granted")
+
+    def __init__(self, user_id, channel_id, event=None):
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.enqueued_at = time.monotonic()
+        self.event = event or threading.Event()
+        self.granted = False
+
+
+class AdmissionController:
+    """
+    Limits concurrent calls to an expensive upstream (the LLM).
+    At most max_concurrent calls run at once, with at most max_per_user / max_per_channel of
+    them for one user or channel. Waiting requests are queued per user and served round-robin,
+    so one busy user cannot starve the others. A request is shed right away when the queue is
+    full or its deadline is earlier than the estimated wait, and when it is still queued at
+    its deadline.
+    """
+
+    def __init__(self, max_concurrent=8, max_queue=50, max_per_user=2, max_per_channel=4):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.max_per_channel = max_per_channel
+        self._lock = threading.Lock()
+        # user_id -> waiters of that user; the order of the keys is the round-robin order
+        self._queues = OrderedDict()
+        self._queued = 0
+        self._in_flight = 0
+        self._user_in_flight = Counter()
+        self._channel_in_flight = Counter()
+        # Moving average of how long an admitted call holds its slot
+        self._service_time = None
+        self._stats = {
+            "admitted": 0,
+            "shed_queue_full": 0,
+            "shed_deadline": 0,
+            "total_wait_time": 0.0,
+            "max_wait_time": 0.0,
+        }
+
+    @contextmanager
+    def admit(self, user_id, channel_id, timeout):
+        """
+        Holds a slot for the duration of the block. Raises AdmissionRejected if the call
+        cannot start within timeout seconds.
+        """
+        self.acquire(user_id, channel_id, time.monotonic() + timeout)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(user_id, channel_id, time.monotonic() - started)
+
+    @asynccontextmanager
+    async def admit_async(self, user_id, channel_id, timeout):
+        """
+        admit() for coroutines: waits without blocking the event loop.
+        """
+        await self.acquire_async(user_id, channel_id, time.monotonic() + timeout)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(user_id, channel_id, time.monotonic() - started)
+
+    def acquire(self, user_id, channel_id, deadline):
+        waiter = self._enqueue(user_id, channel_id, deadline)
+        waiter.event.wait(max(deadline - time.monotonic(), 0))
+        self._finish_wait(waiter)
+
+    async def acquire_async(self, user_id, channel_id, deadline):
+        waiter = self._enqueue(user_id, channel_id, deadline, _LoopEvent(asyncio.get_running_loop()))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.event.future), max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._dequeue(waiter)
+            if granted:
+                self.release(user_id, channel_id, 0.0)
+            raise
+        self._finish_wait(waiter)
+
+    def _enqueue(self, user_id, channel_id, deadline, event=None):
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._shed("queue_full")
+            if self._estimated_wait() > deadline - time.monotonic():
+                self._shed("deadline")
+            waiter = _Waiter(user_id, channel_id, event)
+            self._queues.setdefault(user_id, deque()).append(waiter)
+            self._queued += 1
+            self._dispatch()
+        return waiter
+
+    def _dequeue(self, waiter):
+        """
+        Removes a waiter that was not granted a slot. Caller holds the lock.
+        """
+        queue = self._queues[waiter.user_id]
+        queue.remove(waiter)
+        if not queue:
+            del self._queues[waiter.user_id]
+        self._queued -= 1
+
+    def _finish_wait(self, waiter):
+        """
+        Returns if the waiter was granted a slot; otherwise dequeues it and sheds the request.
+        """
+        with self._lock:
+            if waiter.granted:
+                wait = time.monotonic() - waiter.enqueued_at
+                self._stats["total_wait_time"] += wait
+                self._stats["max_wait_time"] = max(self._stats["max_wait_time"], wait)
+                return
+            self._dequeue(waiter)
+            self._shed("deadline")
+
+    def release(self, user_id, channel_id, service_time):
+        with self._lock:
+            self._in_flight -= 1
+            self._user_in_flight[user_id] -= 1
+            if not self._user_in_flight[user_id]:
+                del self._user_in_flight[user_id]
+            self._channel_in_flight[channel_id] -= 1
+            if not self._channel_in_flight[channel_id]:
+                del self._channel_in_flight[channel_id]
+            if self._service_time is None:
+                self._service_time = service_time
+            else:
+                self._service_time = 0.8 * self._service_time + 0.2 * service_time
+            self._dispatch()
+
+    def _eligible(self, waiter):
+        if waiter.user_id is not None and self._user_in_flight[waiter.user_id] >= self.max_per_user:
+            return False
+        if waiter.channel_id is not None and self._channel_in_flight[waiter.channel_id] >= self.max_per_channel:
+            return False
+        return True
+
+    def _dispatch(self):
+        """
+        Grants free slots to eligible waiters, one user at a time. Caller holds the lock.
+        """
+        while self._in_flight < self.max_concurrent and self._queued:
+            for user_id, queue in self._queues.items():
+                if self._eligible(queue[0]):
+                    break
+            else:
+                return
+            waiter = queue.popleft()
+            if queue:
+                self._queues.move_to_end(user_id)
+            else:
+                del self._queues[user_id]
+            self._queued -= 1
+            self._in_flight += 1
+            self._user_in_flight[waiter.user_id] += 1
+            self._channel_in_flight[waiter.channel_id] += 1
+            self._stats["admitted"] += 1
+            waiter.granted = True
+            waiter.event.set()
+
+    def _estimated_wait(self):
+        """
+        Rough time until a new request would start. Caller holds the lock.
+        """
+        if self._service_time is None or self._in_flight + self._queued < self.max_concurrent:
+            return 0.0
+        return (self._queued + 1) / self.max_concurrent * self._service_time
+
+    def _shed(self, reason):
+        """
+        Counts and raises a rejection. Caller holds the lock.
+        """
+        self._stats[f"shed_{reason}"] += 1
+        logger.warning(f"Shedding LLM request ({reason}): {self._in_flight} in flight, {self._queued} queued.")
+        raise AdmissionRejected(reason)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = self._in_flight
+            stats["queued"] = self._queued
+            stats["waiting_users"] = len(self._queues)
+            stats["avg_service_time"] = self._service_time or 0.0
+        return stats
@@ -1,70 +1,504 @@
-import openai
+import asyncio
 import logging
 import os
+import threading
+import metrics
+from admission import AdmissionController, AdmissionRejected
+from response_cache import ResponseCache, SQLiteBackend, make_cache_key
+from singleflight import AsyncSingleFlight, SingleFlight
 # Initialize logging
 logger = logging.getLogger(__name__)
 
 # OpenAI Configuration
-openai.api_key = os.environ.get("OPENAI_API_KEY")
+# The openai package is imported on first use so requests that never reach the LLM
+# (URL verification, ignored events, feedback clicks) don't pay for it on a cold start.
+_openai = None
+_openai_lock = threading.Lock()
 
-def get_openai_response(user_message):
+def get_openai():
+    """
+    Imports and configures the openai module once, on first use.
+    """
+    global _openai
+    if _openai is None:
+        with _openai_lock:
+            if _openai is None:
+                import openai
+                openai.api_key = os.environ.get("OPENAI_API_KEY")
+                _openai = openai
+    return _openai
+
+CHAT_MODEL = "gpt-3.5-turbo"
+EMBEDDING_MODEL = "text-embedding-ada-002"
+ANSWER_SYSTEM_PROMPT = "You are a helpful IT assistant answering FAQs on MacBook devices."
+SUMMARY_SYSTEM_PROMPT = "You are an assistant that summarizes user messages for Jira ticket titles."
+SUMMARY_TEMPERATURE = 0.3
+
+# Exact-match response cache: identical questions (after normalization) are answered once
+# per RESPONSE_CACHE_TTL. Set RESPONSE_CACHE_PATH to a SQLite file to persist answers across
+# cold starts and share them between instances.
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 6 * 60 * 60))
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 1024))
+RESPONSE_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH")
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+# Semantic answer cache: paraphrased questions above the similarity threshold reuse a
+# previous answer instead of querying the chat model again.
+SEMANTIC_CACHE_ENABLED = os.environ.get("SEMANTIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", 0.92))
+SEMANTIC_CACHE_CAPACITY = int(os.environ.get("SEMANTIC_CACHE_CAPACITY", 500))
+
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+# Knowledge-base retrieval: set KB_INDEX_PATH to an index built with `python kb_index.py build`.
+# Matching passages are added to the prompt; a sufficiently confident match on a specific
+# question (at least KB_DIRECT_ANSWER_MIN_TERMS terms) is returned without calling OpenAI.
+KB_INDEX_PATH = os.environ.get("KB_INDEX_PATH")
+KB_TOP_K = int(os.environ.get("KB_TOP_K", 3))
+KB_MIN_CONFIDENCE = float(os.environ.get("KB_MIN_CONFIDENCE", 0.3))
+KB_DIRECT_ANSWER_CONFIDENCE = float(os.environ.get("KB_DIRECT_ANSWER_CONFIDENCE", 0.9))
+KB_DIRECT_ANSWER_MIN_TERMS = int(os.environ.get("KB_DIRECT_ANSWER_MIN_TERMS", 3))
+
+_kb_index = None
+_kb_index_lock = threading.Lock()
+
+# Admission control for chat completions: at most LLM_MAX_CONCURRENCY calls run at once, with
+# per-user/per-channel caps and a bounded queue. A call that cannot start within
+# LLM_QUEUE_TIMEOUT seconds raises AdmissionRejected so the caller can answer right away.
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 8))
+LLM_MAX_QUEUE = int(os.environ.get("LLM_MAX_QUEUE", 50))
+LLM_MAX_PER_USER = int(os.environ.get("LLM_MAX_PER_USER", 2))
+LLM_MAX_PER_CHANNEL = int(os.environ.get("LLM_MAX_PER_CHANNEL", 4))
+LLM_QUEUE_TIMEOUT = float(os.environ.get("LLM_QUEUE_TIMEOUT", 20))
+
+llm_admission = AdmissionController(
+    max_concurrent=LLM_MAX_CONCURRENCY,
+    max_queue=LLM_MAX_QUEUE,
+    max_per_user=LLM_MAX_PER_USER,
+    max_per_channel=LLM_MAX_PER_CHANNEL,
+)
+
+# Concurrent identical questions (same cache key) share one completion. Callers that join an
+# in-flight request wait at most SINGLE_FLIGHT_TIMEOUT seconds for it.
+SINGLE_FLIGHT_TIMEOUT = float(os.environ.get("SINGLE_FLIGHT_TIMEOUT", 60))
+llm_single_flight = SingleFlight()
+# The asyncio server mode coalesces on its event loop instead
+llm_async_single_flight = AsyncSingleFlight()
+
+# aiohttp session shared by async OpenAI calls (set by the asyncio server mode)
+_openai_async_session = None
+
+# Gauges exported by the metrics module; caches that were never created report nothing
+metrics.register_collector("response_cache", lambda: _response_cache and _response_cache.stats())
+metrics.register_collector("semantic_cache", lambda: _semantic_cache and _semantic_cache.stats())
+metrics.register_collector("llm_admission", llm_admission.stats)
+metrics.register_collector("llm_single_flight", llm_single_flight.stats)
+metrics.register_collector("llm_async_single_flight", llm_async_single_flight.stats)
+
+def get_response_cache():
+    """
+    Returns the exact-match response cache, or None when it is disabled.
+    """
+    global _response_cache
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                backend = None
+                if RESPONSE_CACHE_PATH:
+                    try:
+                        backend = SQLiteBackend(RESPONSE_CACHE_PATH)
+                    except Exception as e:
+                        logger.error("Error opening response cache at %s: %s", RESPONSE_CACHE_PATH, str(e))
+                _response_cache = ResponseCache(
+                    ttl=RESPONSE_CACHE_TTL, maxsize=RESPONSE_CACHE_SIZE, backend=backend
+                )
+    return _response_cache
+
+def get_kb_version():
+    kb_index = get_kb_index()
+    return kb_index.version if kb_index is not None else None
+
+def answer_cache_key(user_message):
+    # Rebuilding the knowledge base changes the prompt context, so it invalidates answers too
+    return make_cache_key(CHAT_MODEL, ANSWER_SYSTEM_PROMPT, user_message, kb=get_kb_version())
+
+def answer_cache_namespace():
+    """
+    Returns the semantic cache namespace for answers: everything answer_cache_key covers
+    except the question itself, so a model, prompt or knowledge base change stops old
+    answers from matching.
+    """
+    return make_cache_key(CHAT_MODEL, ANSWER_SYSTEM_PROMPT, "", kb=get_kb_version())
+
+def summary_cache_key(user_message):
+    return make_cache_key(
+        CHAT_MODEL, SUMMARY_SYSTEM_PROMPT, user_message, temperature=SUMMARY_TEMPERATURE
+    )
+
+def get_embedding(text):
+    """
+    Returns the OpenAI embedding vector for the given text.
+    """
+    with metrics.span("openai_request", operation="embedding"):
+        response = get_openai().Embedding.create(model=EMBEDDING_MODEL, input=text)
+    return response["data"][0]["embedding"]
+
+def get_semantic_cache():
+    """
+    Returns the semantic answer cache, or None when it is disabled.
+    numpy is only imported when the cache is enabled.
+    """
+    global _semantic_cache
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                from semantic_cache import SemanticCache
+                _semantic_cache = SemanticCache(
+                    get_embedding,
+                    capacity=SEMANTIC_CACHE_CAPACITY,
+                    threshold=SEMANTIC_CACHE_THRESHOLD,
+                )
+    return _semantic_cache
+
+def lookup_cached_response(user_message):
+    """
+    Returns a cached answer for the same question, or for a semantically similar one, or None.
+    """
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        cached = response_cache.get(answer_cache_key(user_message))
+        if cached is not None:
+            logger.info("Response cache hit for: %s", user_message)
+            return cached
+
+    cache = get_semantic_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.lookup(user_message, namespace=answer_cache_namespace())
+    except Exception as e:
+        logger.error("Error looking up semantic cache: %s", str(e))
+        return None
+
+def store_cached_response(user_message, response):
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        response_cache.set(answer_cache_key(user_message), response)
+
+    cache = get_semantic_cache()
+    if cache is None:
+        return
+    try:
+        cache.add(user_message, response, namespace=answer_cache_namespace())
+    except Exception as e:
+        logger.error("Error storing response in semantic cache: %s", str(e))
+
+def report_bad_response(user_message):
+    """
+    Evicts cached answers for user_message and similar questions after negative feedback.
+    """
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        response_cache.delete(answer_cache_key(user_message))
+
+    cache = get_semantic_cache()
+    if cache is None:
+        return
+    try:
+        removed = cache.invalidate(user_message)
+        if removed:
+            logger.info(f"Evicted {removed} cached answer(s) after negative feedback.")
+    except Exception as e:
+        logger.error("Error invalidating semantic cache: %s", str(e))
+
+def get_kb_index():
+    """
+    Opens the knowledge-base index once, or returns None if none is configured or it can't be read.
+    """
+    global _kb_index
+    if not KB_INDEX_PATH:
+        return None
+    if _kb_index is None:
+        with _kb_index_lock:
+            if _kb_index is None:
+                try:
+                    from kb_index import KBIndex
+                    _kb_index = KBIndex(KB_INDEX_PATH)
+                    logger.info(f"Loaded KB index {_kb_index.version} from {KB_INDEX_PATH}")
+                except Exception as e:
+                    logger.error(f"Error loading KB index from {KB_INDEX_PATH}: {e}")
+                    _kb_index = False
+    return _kb_index or None
+
+def retrieve_passages(user_message):
+    """
+    Returns the knowledge-base passages relevant to the user message, best first.
+    """
+    kb_index = get_kb_index()
+    if kb_index is None:
+        return []
+    try:
+        passages = kb_index.search(user_message, k=KB_TOP_K)
+    except Exception as e:
+        logger.error("Error searching KB index: %s", str(e))
+        return []
+    return [passage for passage in passages if passage.confidence >= KB_MIN_CONFIDENCE]
+
+def direct_kb_answer(user_message, passages):
+    """
+    Returns the top passage as the answer when it matches a specific question confidently enough.
+    """
+    from kb_index import tokenize
+    if not passages or passages[0].confidence < KB_DIRECT_ANSWER_CONFIDENCE:
+        return None
+    if len(set(tokenize(user_message))) < KB_DIRECT_ANSWER_MIN_TERMS:
+        return None
+    passage = passages[0]
+    logger.info(f"Answering from KB passage in {passage.source} (confidence {passage.confidence:.2f})")
+    return f"{passage.text}\n\n_Source: {passage.title}_"
+
+def build_answer_messages(user_message, passages=()):
+    messages = [{"role": "system", "content": ANSWER_SYSTEM_PROMPT}]
+    if passages:
+        excerpts = "\n\n---\n\n".join(f"[{p.title}]\n{p.text}" for p in passages)
+        messages.append(
+            {
+                "role": "system",
+                "content": "Use these knowledge base excerpts when they are relevant:\n\n" + excerpts,
+            }
+        )
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+def get_openai_response(user_message, user_id=None, channel_id=None):
     """
     Queries OpenAI to get a response for the given user message.
+    Raises AdmissionRejected if the LLM is too busy to take the request in time.
     """
+    cached = lookup_cached_response(user_message)
+    if cached is not None:
+        return cached
+    passages = retrieve_passages(user_message)
+    direct = direct_kb_answer(user_message, passages)
+    if direct is not None:
+        return direct
+    key = answer_cache_key(user_message)
     try:
-        logger.info("Querying OpenAI with user message: %s", user_message)
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful IT assistant answering FAQs on MacBook devices.",
-                },
-                {"role": "user", "content": user_message},
-            ],
+        return llm_single_flight.do(
+            key,
+            lambda: _complete_answer(key, user_message, passages, user_id, channel_id),
+            timeout=SINGLE_FLIGHT_TIMEOUT,
         )
-        result = response["choices"][0]["message"]["content"]
-        logger.info("OpenAI response: %s", result)
-        return result
+    except AdmissionRejected:
+        raise
     except Exception as e:
         logger.error("Error querying OpenAI: %s", str(e))
         return f"Error: {str(e)}"
 
+def _complete_answer(key, user_message, passages, user_id, channel_id):
+    # An identical request may have finished just before this one started
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+    with llm_admission.admit(user_id, channel_id, LLM_QUEUE_TIMEOUT):
+        logger.info("Querying OpenAI with user message: %s", user_message)
+        with metrics.span("openai_request", operation="answer"):
+            response = get_openai().ChatCompletion.create(
+                model=CHAT_MODEL,
+                messages=build_answer_messages(user_message, passages),
+            )
+    result = response["choices"][0]["message"]["content"]
+    logger.info("OpenAI response: %s", result)
+    store_cached_response(user_message, result)
+    return result
+
+def stream_openai_response(user_message, user_id=None, channel_id=None):
+    """
+    Streams the response for the given user message from OpenAI, yielding content fragments.
+    Errors are raised to the caller, which is expected to fall back to get_openai_response().
+    The admission slot is held until the stream is consumed or closed.
+    """
+    passages = retrieve_passages(user_message)
+    direct = direct_kb_answer(user_message, passages)
+    if direct is not None:
+        yield direct
+        return
+    with llm_admission.admit(user_id, channel_id, LLM_QUEUE_TIMEOUT):
+        logger.info("Streaming OpenAI response for user message: %s", user_message)
+        # Time to the start of the stream; the full answer is timed by the caller's handler span
+        with metrics.span("openai_request", operation="answer_stream"):
+            response = get_openai().ChatCompletion.create(
+                model=CHAT_MODEL,
+                messages=build_answer_messages(user_message, passages),
+                stream=True,
+            )
+        for chunk in response:
+            content = chunk["choices"][0].get("delta", {}).get("content")
+            if content:
+                yield content
+
 def summarize_message(user_message):
     """
     Uses OpenAI to summarize the user's message for the Jira ticket summary.
     """
+    key = summary_cache_key(user_message)
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
     try:
-        prompt = (
-            "Summarize the following user message into a concise summary suitable for a Jira ticket title. "
-            "The summary should be clear and capture the main issue without losing essential details.\n\n"
-            "User Message:\n"
-            f"{user_message}\n\n"
-            "Summary:"
+        return llm_single_flight.do(
+            key, lambda: _complete_summary(key, user_message), timeout=SINGLE_FLIGHT_TIMEOUT
         )
+    except Exception as e:
+        logger.error(f"Error summarizing message with OpenAI: {e}")
+        return "Support Request"
+
+def build_summary_messages(user_message):
+    prompt = (
+        "Summarize the following user message into a concise summary suitable for a Jira ticket title. "
+        "The summary should be clear and capture the main issue without losing essential details.\n\n"
+        "User Message:\n"
+        f"{user_message}\n\n"
+        "Summary:"
+    )
+    return [
+        {
+            "role": "system",
+            "content": SUMMARY_SYSTEM_PROMPT,
+        },
+        {"role": "user", "content": prompt},
+    ]
 
-        logger.info("Sending prompt to OpenAI for message summarization.")
-
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an assistant that summarizes user messages for Jira ticket titles.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.3,  # Low temperature for more deterministic summaries
+def _complete_summary(key, user_message):
+    logger.info("Sending prompt to OpenAI for message summarization.")
+
+    with llm_admission.admit(None, None, LLM_QUEUE_TIMEOUT):
+        with metrics.span("openai_request", operation="summary"):
+            response = get_openai().ChatCompletion.create(
+                model=CHAT_MODEL,
+                messages=build_summary_messages(user_message),
+                temperature=SUMMARY_TEMPERATURE,  # Low temperature for more deterministic summaries
+            )
+
+    summary = response["choices"][0]["message"]["content"].strip()
+    logger.info(f"OpenAI generated summary: {summary}")
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        response_cache.set(key, summary)
+
+    return summary
+
+def set_async_http_session(session):
+    """
+    Makes async OpenAI calls reuse the given aiohttp session instead of opening one per call.
+    """
+    global _openai_async_session
+    _openai_async_session = session
+
+def _get_async_openai():
+    openai = get_openai()
+    # openai keeps the session in a context variable, so set it in the calling task
+    if _openai_async_session is not None:
+        openai.aiosession.set(_openai_async_session)
+    return openai
+
+async def _call_cache(func, *args):
+    """
+    Runs a cache helper from a coroutine: in a worker thread when it may block on SQLite or
+    an embedding request, inline when it only touches memory.
+    """
+    if SEMANTIC_CACHE_ENABLED or RESPONSE_CACHE_PATH:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+async def get_openai_response_async(user_message, user_id=None, channel_id=None):
+    """
+    get_openai_response() for the asyncio server mode, using ChatCompletion.acreate.
+    Raises AdmissionRejected if the LLM is too busy to take the request in time.
+    """
+    cached = await _call_cache(lookup_cached_response, user_message)
+    if cached is not None:
+        return cached
+    passages = retrieve_passages(user_message)
+    direct = direct_kb_answer(user_message, passages)
+    if direct is not None:
+        return direct
+    key = answer_cache_key(user_message)
+    try:
+        return await llm_async_single_flight.do(
+            key,
+            lambda: _complete_answer_async(key, user_message, passages, user_id, channel_id),
+            timeout=SINGLE_FLIGHT_TIMEOUT,
         )
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        logger.error("Error querying OpenAI: %s", str(e))
+        return f"Error: {str(e)}"
 
-        summary = response["choices"][0]["message"]["content"].strip()
-        logger.info(f"OpenAI generated summary: {summary}")
+async def _complete_answer_async(key, user_message, passages, user_id, channel_id):
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        cached = await _call_cache(response_cache.get, key)
+        if cached is not None:
+            return cached
+    async with llm_admission.admit_async(user_id, channel_id, LLM_QUEUE_TIMEOUT):
+        logger.info("Querying OpenAI with user message: %s", user_message)
+        with metrics.span("openai_request", operation="answer"):
+            response = await _get_async_openai().ChatCompletion.acreate(
+                model=CHAT_MODEL,
+                messages=build_answer_messages(user_message, passages),
+            )
+    result = response["choices"][0]["message"]["content"]
+    logger.info("OpenAI response: %s", result)
+    await _call_cache(store_cached_response, user_message, result)
+    return result
 
-        return summary
+async def summarize_message_async(user_message):
+    """
+    summarize_message() for the asyncio server mode.
+    """
+    key = summary_cache_key(user_message)
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        cached = await _call_cache(response_cache.get, key)
+        if cached is not None:
+            return cached
+    try:
+        return await llm_async_single_flight.do(
+            key, lambda: _complete_summary_async(key, user_message), timeout=SINGLE_FLIGHT_TIMEOUT
+        )
     except Exception as e:
         logger.error(f"Error summarizing message with OpenAI: {e}")
         return "Support Request"
 
+async def _complete_summary_async(key, user_message):
+    async with llm_admission.admit_async(None, None, LLM_QUEUE_TIMEOUT):
+        with metrics.span("openai_request", operation="summary"):
+            response = await _get_async_openai().ChatCompletion.acreate(
+                model=CHAT_MODEL,
+                messages=build_summary_messages(user_message),
+                temperature=SUMMARY_TEMPERATURE,
+            )
+    summary = response["choices"][0]["message"]["content"].strip()
+    logger.info(f"OpenAI generated summary: {summary}")
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        await _call_cache(response_cache.set, key, summary)
+    return summary
+
 #def train_model_on_confluence(confluence_pages, model, tokenizer):
     """Train a model using content from Confluence pages."""
     from transformers import Trainer, TrainingArguments
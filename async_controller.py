@@ -0,0 +1,287 @@
+import asyncio
+import logging
+import os
+import metrics
+from slack_bolt.async_app import AsyncApp
+from admission import AdmissionRejected
+from ai_controller import get_openai_response_async, summarize_message_async
+from jira_controller import create_jira_ticket_async, resolve_request_ids_async
+from sheet_controller import append_to_sheet_async
+from pipeline import run_pipeline_async
+from slack_controller import (
+    EMAIL_NOT_FOUND_REPLY,
+    ERROR_REPLY,
+    JIRA_PROJECT_KEY,
+    JIRA_REQUEST_TYPE_NAME,
+    PIPELINE_DEADLINE,
+    POSITIVE_FEEDBACK_REPLY,
+    POSITIVE_FEEDBACK_ROW,
+    THINKING_UPDATE_INTERVAL,
+    THREAD_SCAN_PAGE_SIZE,
+    TICKET_QUEUED_REPLY,
+    USER_MESSAGE_NOT_FOUND,
+    ThinkingIndicator,
+    decode_question_reference,
+    enqueue_ticket,
+    feedback_context,
+    feedback_received_blocks,
+    known_jira_account_id,
+    message_context,
+    message_reply,
+    message_to_answer,
+    remember_jira_account_id,
+    report_rejected_answer,
+    ticket_fields,
+    ticket_outbox,
+    ticket_result_reply,
+    ticket_stages,
+    user_directory,
+)
+
+logger = logging.getLogger(__name__)
+
+# Handlers for the asyncio server mode (async_main.py). The decisions (ignore rules, replies,
+# question references, the ticket stage graph) come from slack_controller; only the I/O
+# differs: every Slack, OpenAI and Jira call is awaited, so one process can keep hundreds of conversations
+# in flight. ASYNC_MAX_IN_FLIGHT caps how many run at once; the rest wait for a slot.
+ASYNC_MAX_IN_FLIGHT = int(os.environ.get("ASYNC_MAX_IN_FLIGHT", 500))
+
+_tasks = set()
+_slots = None
+
+
+def spawn(coro):
+    """
+    Runs a handler coroutine in the background after the ack, holding an in-flight slot.
+    """
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(ASYNC_MAX_IN_FLIGHT)
+
+    async def run():
+        async with _slots:
+            await coro
+
+    task = asyncio.ensure_future(run())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+async def drain(timeout):
+    """
+    Waits up to timeout seconds for background handlers to finish. Returns True if all did.
+    """
+    if not _tasks:
+        return True
+    done, pending = await asyncio.wait(set(_tasks), timeout=timeout)
+    return not pending
+
+
+def stats():
+    return {"in_flight": len(_tasks)}
+
+
+metrics.register_collector("async_handlers", stats)
+
+
+def handle_message_events_async(app: AsyncApp):
+    @app.event("message")
+    async def message_event_handler(body, client):
+        """
+        Filters incoming messages and answers them in the background, so the event is acked right away.
+        """
+        try:
+            event = message_to_answer(body)
+            if event is not None:
+                spawn(process_message_event_async(client, event))
+        except Exception as e:
+            logger.error("Error handling message event: %s", str(e))
+
+
+async def process_message_event_async(client, event):
+    """
+    process_message_event() for an AsyncWebClient.
+    """
+    user_message, user_id, channel_id, thread_ts = message_context(event)
+
+    with metrics.span("handler", stage="answer_message"):
+        try:
+            indicator = AsyncThinkingIndicator(client, channel_id, thread_ts)
+            indicator.start()
+            try:
+                bot_response = await get_openai_response_async(user_message, user_id, channel_id)
+            except AdmissionRejected:
+                bot_response = None
+            finally:
+                message_ts = await indicator.stop()
+
+            text, blocks = message_reply(user_id, user_message, bot_response)
+            await client.chat_update(channel=channel_id, ts=message_ts, text=text, blocks=blocks)
+
+        except Exception as e:
+            logger.error("Error handling message event: %s", str(e))
+            await client.chat_postMessage(channel=channel_id, thread_ts=thread_ts, text=ERROR_REPLY)
+
+
+class AsyncThinkingIndicator:
+    """
+    ThinkingIndicator as a task on the event loop.
+    """
+
+    def __init__(self, client, channel_id, thread_ts, interval=THINKING_UPDATE_INTERVAL):
+        self.client = client
+        self.channel_id = channel_id
+        self.thread_ts = thread_ts
+        self.interval = interval
+        self.message_ts = None
+        self._stop = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        self._stop.set()
+        await self._task
+        if self.message_ts is None:
+            self.message_ts = await self._post()
+        return self.message_ts
+
+    async def _post(self):
+        message = await self.client.chat_postMessage(
+            channel=self.channel_id, text=ThinkingIndicator.STEPS[0], thread_ts=self.thread_ts
+        )
+        return message["ts"]
+
+    async def _run(self):
+        try:
+            self.message_ts = await self._post()
+            step = 0
+            while True:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), self.interval)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+                step += 1
+                await self.client.chat_update(
+                    channel=self.channel_id,
+                    ts=self.message_ts,
+                    text=ThinkingIndicator.STEPS[step % len(ThinkingIndicator.STEPS)],
+                )
+        except Exception as e:
+            logger.error("Error updating thinking indicator: %s", str(e))
+
+
+def handle_feedback_actions_async(app: AsyncApp):
+    @app.action("feedback_positive")
+    async def handle_positive_feedback(ack, body, client):
+        await ack()
+        spawn(process_feedback_async(body, client, positive_feedback=True))
+
+    @app.action("feedback_negative")
+    async def handle_negative_feedback(ack, body, client):
+        await ack()
+        spawn(process_feedback_async(body, client, positive_feedback=False))
+
+
+async def process_feedback_async(body, client, positive_feedback):
+    """
+    process_feedback() for an AsyncWebClient.
+    """
+    channel_id, thread_ts, message_ts, user_id = feedback_context(body)
+
+    with metrics.span("handler", stage="feedback"):
+        try:
+            profile = await user_directory.get_async(client, user_id)
+            if not profile.email:
+                logger.error("Unable to retrieve user's email.")
+                await client.chat_postMessage(channel=channel_id, thread_ts=thread_ts, text=EMAIL_NOT_FOUND_REPLY)
+                return
+
+            await client.chat_update(
+                channel=channel_id,
+                ts=message_ts,
+                text=body["message"]["text"],
+                blocks=feedback_received_blocks(body, positive_feedback),
+            )
+
+            if positive_feedback:
+                # The sheet writer thread batches rows; only a full queue makes this wait
+                await asyncio.to_thread(append_to_sheet_async, *POSITIVE_FEEDBACK_ROW, profile.email)
+                await client.chat_postMessage(channel=channel_id, thread_ts=thread_ts, text=POSITIVE_FEEDBACK_REPLY)
+            else:
+                original_message = decode_question_reference(body, user_id)
+                await handle_negative_feedback_async(
+                    client, channel_id, thread_ts, user_id, profile.email, original_message
+                )
+        except Exception as e:
+            kind = "positive" if positive_feedback else "negative"
+            logger.error("Error handling %s feedback: %s", kind, str(e))
+
+
+async def handle_negative_feedback_async(client, channel_id, thread_ts, user_id, user_email, original_message=None):
+    """
+    handle_negative_feedback_action() for an AsyncWebClient. With the ticket outbox enabled the
+    ticket is queued and created by the outbox workers.
+    """
+    if ticket_outbox is not None:
+        try:
+            queued = await asyncio.to_thread(
+                enqueue_ticket, channel_id, thread_ts, user_id, user_email, original_message
+            )
+        except Exception as e:
+            logger.error(f"Error writing ticket to the outbox, creating it inline: {e}")
+        else:
+            if queued:
+                await client.chat_postMessage(channel=channel_id, thread_ts=thread_ts, text=TICKET_QUEUED_REPLY)
+            return
+
+    stages = ticket_stages(
+        lambda: get_user_original_message_async(client, channel_id, thread_ts, user_id),
+        summarize_message_async,
+        lambda: resolve_reporter_request_ids_async(user_id, user_email),
+        original_message,
+    )
+    results, errors = await run_pipeline_async(stages, deadline=PIPELINE_DEADLINE)
+    if errors:
+        logger.warning(f"Negative feedback pipeline completed with errors in: {sorted(errors)}")
+
+    # No deadline for the POST (see create_ticket_for_thread): cancelling it could leave a
+    # ticket created behind the manual button. Jira's connect and read timeouts bound it.
+    with metrics.span("pipeline_stage", stage="ticket"):
+        issue_key, ticket_url = await create_jira_ticket_async(**ticket_fields(results, user_email))
+
+    text, blocks = ticket_result_reply(issue_key, ticket_url)
+    await client.chat_postMessage(channel=channel_id, thread_ts=thread_ts, text=text, blocks=blocks)
+    await asyncio.to_thread(report_rejected_answer, results["user_message"])
+
+
+async def resolve_reporter_request_ids_async(user_id, user_email):
+    """
+    resolve_reporter_request_ids() without blocking the event loop.
+    """
+    known_account_id = known_jira_account_id(user_id, user_email)
+    request_ids = await resolve_request_ids_async(
+        user_email, JIRA_PROJECT_KEY, JIRA_REQUEST_TYPE_NAME, account_id=known_account_id
+    )
+    remember_jira_account_id(user_id, known_account_id, request_ids)
+    return request_ids
+
+
+async def get_user_original_message_async(client, channel_id, thread_ts, user_id):
+    """
+    get_user_original_message() for an AsyncWebClient.
+    """
+    cursor = None
+    while True:
+        response = await client.conversations_replies(
+            channel=channel_id, ts=thread_ts, limit=THREAD_SCAN_PAGE_SIZE, cursor=cursor
+        )
+        for msg in response["messages"]:
+            if msg.get("user") == user_id:
+                return msg.get("text")
+        cursor = response.get("response_metadata", {}).get("next_cursor")
+        if not cursor:
+            return USER_MESSAGE_NOT_FOUND
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import logging
+import os
+import metrics
+from aiohttp import web
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.request.async_request import AsyncBoltRequest
+from slack_sdk.http_retry.builtin_async_handlers import AsyncRateLimitErrorRetryHandler
+from slack_sdk.web.async_client import AsyncWebClient
+import async_controller
+from ai_controller import set_async_http_session
+from jira_controller import close_async_session
+from slack_controller import is_ignorable_event
+from dedup import create_deduplicator, event_dedup_keys
+from utils import verify_slack_request
+from config import SLACK_API_URL, SLACK_BOT_TOKEN, SLACK_SIGNING_SECRET, get_bot_user_id
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Asyncio server mode: a long-running aiohttp server (Cloud Run, a VM) instead of the Cloud
+# Function entry point in main.py. Handlers await Slack, OpenAI and Jira on one event loop,
+# so concurrency is bounded by ASYNC_MAX_IN_FLIGHT rather than by worker threads.
+#   python async_main.py   (PORT, default 8080)
+PORT = int(os.environ.get("PORT", 8080))
+# Seconds to let in-flight handlers finish on shutdown
+SHUTDOWN_GRACE_PERIOD = float(os.environ.get("SHUTDOWN_GRACE_PERIOD", 20))
+
+deduplicator = create_deduplicator()
+metrics.register_collector("dedup", deduplicator.stats)
+
+def create_bolt_app(session):
+    """
+    Builds the AsyncApp with the async handlers; Web API calls go through the shared session.
+    """
+    client = AsyncWebClient(
+        token=SLACK_BOT_TOKEN,
+        base_url=SLACK_API_URL or AsyncWebClient.BASE_URL,
+        session=session,
+        retry_handlers=[AsyncRateLimitErrorRetryHandler(max_retry_count=2)],
+    )
+    # Requests are verified in slackbot() before they reach Bolt
+    bolt_app = AsyncApp(client=client, signing_secret=SLACK_SIGNING_SECRET, request_verification_enabled=False)
+    async_controller.handle_message_events_async(bolt_app)
+    async_controller.handle_feedback_actions_async(bolt_app)
+    return bolt_app
+
+async def slackbot(request):
+    dedup_keys = []
+    try:
+        raw_body = await request.read()
+
+        # Verify Slack request
+        if not verify_slack_request(request, raw_body):
+            return web.Response(status=403, text="Invalid request")
+
+        request_json = None
+        if request.content_type == "application/json":
+            try:
+                request_json = json.loads(raw_body)
+            except ValueError:
+                pass
+
+        # Ack events the bot ignores (thread replies, bot messages, joins...) without Bolt
+        if is_ignorable_event(request_json):
+            return web.Response(text="Ignored")
+
+        # Drop events already handled; retries of events whose first delivery failed still run
+        dedup_keys = event_dedup_keys(request_json)
+        if not await deduplicator.is_new_async(dedup_keys):
+            retry_num = request.headers.get("X-Slack-Retry-Num")
+            logger.info(f"Ignoring duplicate event {dedup_keys} (X-Slack-Retry-Num={retry_num})")
+            return web.Response(text="Duplicate event")
+
+        bolt_response = await request.app["bolt_app"].async_dispatch(
+            AsyncBoltRequest(
+                body=raw_body.decode("utf-8"),
+                query=request.query_string,
+                headers={key.lower(): [value] for key, value in request.headers.items()},
+            )
+        )
+        if bolt_response.status >= 500:
+            await deduplicator.forget_async(dedup_keys)
+        response = web.Response(status=bolt_response.status, text=bolt_response.body)
+        for name, values in bolt_response.headers.items():
+            if name.lower() != "content-length":
+                for value in values:
+                    response.headers.add(name, value)
+        return response
+    except Exception as e:
+        logger.error(f"Error handling request: {e}")
+        await deduplicator.forget_async(dedup_keys)
+        return web.Response(status=500, text="Internal server error")
+
+async def healthz(request):
+    return web.json_response({"status": "ok", **async_controller.stats()})
+
+async def metrics_endpoint(request):
+    if not metrics.registry.enabled:
+        return web.Response(status=404, text="Metrics are disabled; set METRICS_ENABLED=true.\n")
+    return web.Response(text=metrics.registry.render_prometheus(), content_type="text/plain")
+
+async def on_startup(web_app):
+    # Resolve the bot user ID once so message filtering never calls auth.test on the loop
+    await asyncio.to_thread(get_bot_user_id)
+    if metrics.registry.enabled and metrics.METRICS_LOG_INTERVAL > 0:
+        metrics.registry.start_log_exporter(metrics.METRICS_LOG_INTERVAL)
+
+async def on_cleanup(web_app):
+    if not await async_controller.drain(SHUTDOWN_GRACE_PERIOD):
+        logger.warning("Shutting down with handlers still in flight.")
+    await close_async_session()
+    await web_app["http_session"].close()
+
+async def create_web_app():
+    import aiohttp
+    web_app = web.Application()
+    # One session (and connection pool) for Slack and OpenAI; Jira keeps its own with its auth
+    web_app["http_session"] = aiohttp.ClientSession()
+    set_async_http_session(web_app["http_session"])
+    web_app["bolt_app"] = create_bolt_app(web_app["http_session"])
+    web_app.router.add_post("/slack/events", slackbot)
+    web_app.router.add_get("/healthz", healthz)
+    web_app.router.add_get("/metrics", metrics_endpoint)
+    web_app.on_startup.append(on_startup)
+    web_app.on_cleanup.append(on_cleanup)
+    return web_app
+
+if __name__ == "__main__":
+    web.run_app(create_web_app(), port=PORT)
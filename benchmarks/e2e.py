@@ -0,0 +1,375 @@
+"""
+End-to-end benchmark: drives main.slackbot with signed message events and feedback clicks at
+a target rate, against local stand-ins for Slack, OpenAI, Jira and Sheets (benchmarks/fakes.py).
+
+Reports ack latency (the HTTP response to Slack), end-to-end latency (request sent until the
+final Slack call for that event: the answer, or the ticket / feedback confirmation), upstream
+calls per event and peak RSS.
+
+    python benchmarks/e2e.py --rate 20 --events 400
+    python benchmarks/e2e.py --rate 50 --events 1000 --latency openai=1.5,jira=0.3 --error-rate openai=0.05
+    python benchmarks/e2e.py --rate 20 --events 400 --save e2e_baseline.json
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import queue
+import random
+import resource
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+# Appended, so the bot's modules win over benchmark scripts with the same name (kb_index)
+sys.path.append(BENCHMARKS_DIR)
+
+from fakes import SERVICES, fake_environment, fake_stats, start_fakes  # noqa: E402
+
+SIGNING_SECRET = "benchmark-signing-secret"
+
+QUESTIONS = [
+    "My VPN keeps disconnecting every few minutes",
+    "How do I reset my Okta password?",
+    "The MacBook battery drains overnight",
+    "I can't connect to the office wifi",
+    "How do I request a software license?",
+    "My external monitor is not detected",
+    "Zoom says my camera is in use",
+    "How do I enable FileVault?",
+]
+
+
+def parse_overrides(value, cast=float):
+    """
+    Parses "openai=1.5,jira=0.2" into {"openai": 1.5, "jira": 0.2}.
+    """
+    overrides = {}
+    for item in filter(None, (value or "").split(",")):
+        name, _, number = item.partition("=")
+        if name not in SERVICES:
+            raise argparse.ArgumentTypeError(f"Unknown service '{name}', expected one of {SERVICES}")
+        overrides[name] = cast(number)
+    return overrides
+
+
+def sign(body, secret=SIGNING_SECRET, timestamp=None):
+    """
+    Returns the Slack signature headers for a raw request body.
+    """
+    timestamp = str(int(timestamp if timestamp is not None else time.time()))
+    basestring = b"v0:" + timestamp.encode("ascii") + b":" + body
+    signature = "v0=" + hmac.new(secret.encode("utf-8"), basestring, hashlib.sha256).hexdigest()
+    return {"X-Slack-Request-Timestamp": timestamp, "X-Slack-Signature": signature}
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def message_event(index, user_id, channel_id, text):
+    thread_ts = f"1700000000.{index:06d}"
+    body = {
+        "type": "event_callback",
+        "team_id": "TBENCH",
+        "api_app_id": "ABENCH",
+        "event_id": f"EvBENCH{index:08d}",
+        "event_time": int(time.time()),
+        "event": {
+            "type": "message",
+            "user": user_id,
+            "text": text,
+            "channel": channel_id,
+            "channel_type": "channel",
+            "ts": thread_ts,
+            "client_msg_id": f"bench-{index:08d}",
+        },
+    }
+    return json.dumps(body).encode("utf-8"), "application/json", ("message", thread_ts)
+
+
+def feedback_action(index, user_id, channel_id, text, positive):
+    thread_ts = f"1700000000.{index:06d}"
+    message_ts = f"1800000000.{index:06d}"
+    action_id = "feedback_positive" if positive else "feedback_negative"
+    payload = {
+        "type": "block_actions",
+        "user": {"id": user_id, "team_id": "TBENCH"},
+        "team": {"id": "TBENCH"},
+        "api_app_id": "ABENCH",
+        "trigger_id": f"trigger-{index}",
+        "container": {
+            "type": "message",
+            "message_ts": message_ts,
+            "channel_id": channel_id,
+            "is_ephemeral": False,
+            "thread_ts": thread_ts,
+        },
+        "channel": {"id": channel_id},
+        "message": {
+            "ts": message_ts,
+            "text": "Benchmark answer",
+            "blocks": [
+                {"type": "section", "text": {"type": "mrkdwn", "text": "Benchmark answer"}},
+                {"type": "actions", "block_id": "feedback_buttons", "elements": []},
+            ],
+        },
+        "actions": [
+            {
+                "type": "button",
+                "action_id": action_id,
+                "block_id": "feedback_buttons",
+                "value": json.dumps({"user": user_id, "question": text}),
+                "action_ts": str(time.time()),
+            }
+        ],
+    }
+    body = urllib.parse.urlencode({"payload": json.dumps(payload)}).encode("utf-8")
+    key = ("positive", message_ts) if positive else ("negative", thread_ts)
+    return body, "application/x-www-form-urlencoded", key
+
+
+class CompletionTracker:
+    """
+    Matches Slack calls reported by the fake Slack to pending events:
+    a message is done when its answer (a chat.update with blocks) or error reply is posted,
+    a negative click when the ticket message is posted, a positive click when the reply is edited.
+    """
+
+    def __init__(self, events):
+        self.events = events
+        self.sent = {}
+        self.completed = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def expect(self, key, sent_at):
+        with self._lock:
+            self.sent[key] = sent_at
+
+    def _match(self, method, thread_ts, ts, has_blocks, text):
+        if method == "chat.update" and has_blocks:
+            return [("message", thread_ts), ("positive", ts)]
+        if method == "chat.postMessage":
+            keys = [("negative", thread_ts)]
+            if text.startswith("Sorry"):
+                keys.append(("message", thread_ts))
+            return keys
+        return []
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                at, method, thread_ts, ts, has_blocks, text = self.events.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            with self._lock:
+                for key in self._match(method, thread_ts, ts, has_blocks, text):
+                    if key in self.sent and key not in self.completed:
+                        self.completed[key] = at - self.sent[key]
+                        break
+
+    def wait(self, timeout):
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            with self._lock:
+                if len(self.completed) >= len(self.sent):
+                    return True
+            time.sleep(0.05)
+        return False
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def call_slackbot(main_module, flask_app, body, content_type, headers=None):
+    """
+    Invokes main.slackbot with a signed request and returns the HTTP status code.
+    """
+    request_headers = {"Content-Type": content_type}
+    request_headers.update(headers or sign(body))
+    with flask_app.test_request_context("/", method="POST", data=body, headers=request_headers):
+        from flask import request
+        response = main_module.slackbot(request)
+    if isinstance(response, dict):
+        return response.get("statusCode", 200)
+    return getattr(response, "status_code", 200)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def start_bot(args):
+    """
+    Starts the fakes with the --latency/--jitter/--error-rate settings, points the bot at them
+    and imports main. Returns (fakes_process, fake_urls, slack_events, main_module).
+    """
+    configs = {name: {"seed": args.seed} for name in SERVICES}
+    for name, latency in args.latency.items():
+        configs[name]["latency"] = latency
+    for name, jitter in args.jitter.items():
+        configs[name]["jitter"] = jitter
+    for name, error_rate in args.error_rate.items():
+        configs[name]["error_rate"] = error_rate
+    process, urls, slack_events = start_fakes(configs)
+    os.environ.update(fake_environment(urls, SIGNING_SECRET))
+
+    import main as bot
+    return process, urls, slack_events, bot
+
+
+def finish_background_work(timeout):
+    """
+    Lets deferred tasks finish and flushes queued Sheets rows, so upstream call counts are complete.
+    """
+    import sheet_controller
+    import slack_controller
+    slack_controller.task_queue.drain(timeout)
+    sheet_controller.sheet_writer.shutdown(timeout=30)
+
+
+def add_fake_arguments(parser):
+    parser.add_argument("--latency", type=parse_overrides, default={}, help="Per-service latency, e.g. openai=1.5,slack=0.05")
+    parser.add_argument("--jitter", type=parse_overrides, default={}, help="Per-service extra random latency")
+    parser.add_argument("--error-rate", type=parse_overrides, default={}, help="Per-service error rate, e.g. openai=0.05")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def run(args):
+    process, urls, slack_events, bot = start_bot(args)
+    from flask import Flask
+
+    rss_before = peak_rss_mb()
+    flask_app = Flask("e2e-benchmark")
+    tracker = CompletionTracker(slack_events)
+    tracker.start()
+    rng = random.Random(args.seed)
+    pool = QUESTIONS[: args.distinct_questions] if args.distinct_questions else None
+
+    acks, statuses = [], []
+    results_lock = threading.Lock()
+
+    def build(index):
+        user_id = f"UBENCH{rng.randrange(args.users)}"
+        channel_id = f"CBENCH{rng.randrange(args.channels)}"
+        text = rng.choice(pool) if pool else f"{rng.choice(QUESTIONS)} (#{index})"
+        if rng.random() < args.feedback_ratio:
+            positive = rng.random() >= args.negative_ratio
+            return feedback_action(index, user_id, channel_id, text, positive)
+        return message_event(index, user_id, channel_id, text)
+
+    def send(body, content_type, key):
+        sent_at = time.time()
+        tracker.expect(key, sent_at)
+        try:
+            status = call_slackbot(bot, flask_app, body, content_type)
+        except Exception as e:
+            print(f"Request failed: {e}", file=sys.stderr)
+            status = 0
+        with results_lock:
+            acks.append(time.time() - sent_at)
+            statuses.append(status)
+
+    print(f"Sending {args.events} events at {args.rate}/s...")
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.senders) as executor:
+        for index in range(args.events):
+            request = build(index)
+            delay = start + index / args.rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, *request)
+    send_duration = time.monotonic() - start
+
+    finished = tracker.wait(args.timeout)
+    duration = time.monotonic() - start
+    tracker.stop()
+
+    finish_background_work(args.timeout)
+
+    upstream = {name: fake_stats(url) for name, url in urls.items()}
+    process.terminate()
+
+    kinds = {}
+    for (kind, _), latency in tracker.completed.items():
+        kinds.setdefault(kind, []).append(latency)
+    report = {
+        "events": args.events,
+        "target_rate": args.rate,
+        "achieved_rate": args.events / send_duration if send_duration else 0.0,
+        "completed": len(tracker.completed),
+        "timed_out": not finished,
+        "non_2xx_acks": sum(1 for status in statuses if not 200 <= status < 300),
+        "ack_p50": percentile(acks, 0.5),
+        "ack_p99": percentile(acks, 0.99),
+        "e2e_p50": percentile(list(tracker.completed.values()), 0.5),
+        "e2e_p99": percentile(list(tracker.completed.values()), 0.99),
+        "e2e_by_kind": {
+            kind: {"count": len(values), "p50": percentile(values, 0.5), "p99": percentile(values, 0.99)}
+            for kind, values in sorted(kinds.items())
+        },
+        "upstream_calls_per_event": {name: stats["calls"] / args.events for name, stats in upstream.items()},
+        "upstream_errors_injected": {name: stats["errors"] for name, stats in upstream.items()},
+        "duration": duration,
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_before_load_mb": rss_before,
+    }
+    return report
+
+
+def print_report(report):
+    print(f"\nevents {report['events']}  completed {report['completed']}  "
+          f"rate {report['achieved_rate']:.1f}/s (target {report['target_rate']})"
+          + ("  TIMED OUT" if report["timed_out"] else ""))
+    print(f"ack latency      p50 {report['ack_p50'] * 1000:8.1f} ms   p99 {report['ack_p99'] * 1000:8.1f} ms"
+          f"   non-2xx {report['non_2xx_acks']}")
+    print(f"end-to-end       p50 {report['e2e_p50'] * 1000:8.1f} ms   p99 {report['e2e_p99'] * 1000:8.1f} ms")
+    for kind, stats in report["e2e_by_kind"].items():
+        print(f"  {kind:<14} p50 {stats['p50'] * 1000:8.1f} ms   p99 {stats['p99'] * 1000:8.1f} ms   n={stats['count']}")
+    print("upstream calls per event: " + ", ".join(
+        f"{name} {calls:.2f}" for name, calls in report["upstream_calls_per_event"].items()))
+    print("injected errors: " + ", ".join(
+        f"{name} {errors}" for name, errors in report["upstream_errors_injected"].items()))
+    print(f"peak RSS {report['peak_rss_mb']:.1f} MB (after import {report['rss_before_load_mb']:.1f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rate", type=float, default=10, help="Events per second")
+    parser.add_argument("--events", type=int, default=200, help="Total events to send")
+    parser.add_argument("--feedback-ratio", type=float, default=0.2, help="Fraction of events that are feedback clicks")
+    parser.add_argument("--negative-ratio", type=float, default=0.5, help="Fraction of clicks that are negative")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--channels", type=int, default=5)
+    parser.add_argument("--distinct-questions", type=int, default=0,
+                        help="Draw questions from this many fixed texts (0: every question is unique)")
+    parser.add_argument("--senders", type=int, default=64, help="Concurrent request senders")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for replies after sending")
+    add_fake_arguments(parser)
+    parser.add_argument("--save", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved report to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""
+Local stand-ins for the bot's upstream services, used by the end-to-end benchmarks:
+the Slack Web API, OpenAI chat completions/embeddings, Jira Service Desk REST and the
+Google Sheets append endpoint (plus its OAuth token endpoint), and optionally a Socket Mode
+WebSocket server.
+
+Each service runs an HTTP server on a local port with configurable latency and error
+injection. start_fakes() runs them all in a child process, so they don't compete with the
+bot for the GIL, and returns their base URLs. Slack calls are reported back through a queue
+so the benchmark can tell when an event's final reply was posted.
+"""
+import asyncio
+import json
+import multiprocessing
+import random
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SERVICES = ("slack", "openai", "jira", "sheets")
+
+
+class FakeService:
+    """
+    Base class: routes requests to self.route() after the injected latency, and replaces
+    a configurable fraction of responses with error_status.
+    """
+
+    error_payload = {"error": "injected failure"}
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_status=500, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = Counter()
+        self.errors = 0
+
+    def handle(self, method, path, query, body):
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self.calls[path] += 1
+            fail = self.error_rate and self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if fail:
+            return self.error_status, self.error_payload
+        return self.route(method, path, query, body)
+
+    def route(self, method, path, query, body):
+        raise NotImplementedError
+
+    def stats(self):
+        with self._lock:
+            return {"calls": sum(self.calls.values()), "errors": self.errors, "by_path": dict(self.calls)}
+
+
+class FakeSlack(FakeService):
+    """
+    Slack Web API at /api/<method>. Messages get sequential timestamps; every call is reported
+    to `events` as (time, method, thread_ts, ts, has_blocks, text) for completion tracking.
+    """
+
+    error_payload = {"ok": False, "error": "internal_error"}
+
+    def __init__(self, events=None, socket_mode_url=None, **kwargs):
+        super().__init__(**kwargs)
+        self.events = events
+        self.socket_mode_url = socket_mode_url
+        self._next_ts = 0
+        self._threads = {}
+
+    def route(self, method, path, query, body):
+        api_method = path.rsplit("/", 1)[-1]
+        args = dict(query)
+        args.update(body)
+        thread_ts = args.get("thread_ts")
+        ts = args.get("ts")
+        response = {"ok": True}
+
+        if api_method == "auth.test":
+            response.update(user_id="UBOT", bot_id="BBOT", team_id="TBENCH", user="bot")
+        elif api_method == "chat.postMessage":
+            with self._lock:
+                self._next_ts += 1
+                ts = f"2000000000.{self._next_ts:06d}"
+                self._threads[ts] = thread_ts
+            response.update(ts=ts, channel=args.get("channel"))
+        elif api_method == "chat.update":
+            with self._lock:
+                thread_ts = self._threads.get(ts)
+            response.update(ts=ts, channel=args.get("channel"))
+        elif api_method == "users.info":
+            user = args.get("user")
+            response["user"] = {
+                "id": user,
+                "profile": {"email": f"{user.lower()}@example.com", "real_name": f"User {user}"},
+            }
+        elif api_method == "apps.connections.open":
+            response["url"] = self.socket_mode_url
+        elif api_method == "users.list":
+            response["members"] = []
+        elif api_method == "conversations.replies":
+            response["messages"] = [{"user": "UBENCH0", "text": "benchmark question", "ts": ts}]
+
+        if self.events is not None:
+            blocks = args.get("blocks")
+            self.events.put((time.time(), api_method, thread_ts, ts, bool(blocks), args.get("text") or ""))
+        return 200, response
+
+
+class FakeOpenAI(FakeService):
+    """
+    OpenAI API at /v1/chat/completions and /v1/embeddings.
+    """
+
+    error_payload = {"error": {"message": "injected failure", "type": "server_error"}}
+
+    def route(self, method, path, query, body):
+        if path.endswith("/embeddings"):
+            rng = random.Random(json.dumps(body.get("input"), sort_keys=True))
+            return 200, {"data": [{"embedding": [rng.uniform(-1, 1) for _ in range(64)], "index": 0}]}
+        question = body.get("messages", [{}])[-1].get("content", "")
+        content = f"Benchmark answer to: {question[:80]}"
+        return 200, {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+        }
+
+
+class FakeJira(FakeService):
+    """
+    Jira user search and Service Desk endpoints used for ticket creation.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._next_issue = 0
+
+    def route(self, method, path, query, body):
+        if path == "/rest/api/3/user/search":
+            email = query.get("query", "")
+            return 200, [{"emailAddress": email, "accountId": f"acc-{email.split('@')[0]}"}]
+        if path == "/rest/servicedeskapi/servicedesk":
+            return 200, {"values": [{"id": "1", "projectKey": "SD"}]}
+        if path.endswith("/requesttype"):
+            return 200, {"values": [{"id": "10", "name": "Get IT help"}]}
+        if path == "/rest/servicedeskapi/request" and method == "POST":
+            with self._lock:
+                self._next_issue += 1
+                issue = self._next_issue
+            return 201, {"issueKey": f"SD-{issue}"}
+        return 404, {"errorMessages": [f"No route for {method} {path}"]}
+
+
+class FakeSheets(FakeService):
+    """
+    Sheets values.append plus the OAuth token endpoint at /token.
+    """
+
+    def route(self, method, path, query, body):
+        if path == "/token":
+            return 200, {"access_token": "bench-token", "expires_in": 3600, "token_type": "Bearer"}
+        if path.endswith(":append"):
+            rows = body.get("values", [])
+            return 200, {"updates": {"updatedRows": len(rows), "updatedCells": sum(len(row) for row in rows)}}
+        return 404, {"error": {"message": f"No route for {method} {path}"}}
+
+
+class FakeSocketMode:
+    """
+    Socket Mode WebSocket server at /link, the URL the fake Slack hands out from
+    apps.connections.open. Envelopes POSTed to /__send as {"type", "payload"} are pushed to the
+    connected clients in turn; the time until each is acked is recorded. POST /__disconnect asks
+    every client to reconnect, like Slack does before rotating a connection.
+    """
+
+    def __init__(self):
+        self.sockets = []
+        self.connections = 0
+        self.sent = {}
+        self.ack_latencies = []
+        self._next_envelope = 0
+
+    async def link(self, request):
+        from aiohttp import WSMsgType, web
+        ws = web.WebSocketResponse(autoping=True)
+        await ws.prepare(request)
+        self.connections += 1
+        self.sockets.append(ws)
+        await ws.send_json({"type": "hello", "num_connections": len(self.sockets)})
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.TEXT:
+                    sent_at = self.sent.pop(json.loads(message.data).get("envelope_id"), None)
+                    if sent_at is not None:
+                        self.ack_latencies.append(time.time() - sent_at)
+        finally:
+            self.sockets.remove(ws)
+        return ws
+
+    async def send(self, request):
+        from aiohttp import web
+        body = await request.json()
+        if not self.sockets:
+            return web.json_response({"ok": False, "error": "not_connected"}, status=503)
+        self._next_envelope += 1
+        envelope_id = f"envelope-{self._next_envelope:08d}"
+        envelope = {
+            "envelope_id": envelope_id,
+            "type": body["type"],
+            "payload": body["payload"],
+            "accepts_response_payload": False,
+            "retry_attempt": body.get("retry_attempt", 0),
+            "retry_reason": "",
+        }
+        self.sent[envelope_id] = time.time()
+        await self.sockets[self._next_envelope % len(self.sockets)].send_json(envelope)
+        return web.json_response({"ok": True, "envelope_id": envelope_id})
+
+    async def disconnect(self, request):
+        from aiohttp import web
+        for ws in list(self.sockets):
+            await ws.send_json({"type": "disconnect", "reason": "refresh_requested"})
+        return web.json_response({"ok": True})
+
+    async def stats(self, request):
+        from aiohttp import web
+        return web.json_response({
+            "calls": self._next_envelope,
+            "connections": self.connections,
+            "connected": len(self.sockets),
+            "unacked": len(self.sent),
+            "ack_latencies": self.ack_latencies,
+        })
+
+
+def _serve_socket_mode():
+    """
+    Runs a FakeSocketMode on its own event loop in a daemon thread; returns its base URL.
+    """
+    from aiohttp import web
+    fake = FakeSocketMode()
+    app = web.Application()
+    app.router.add_get("/link", fake.link)
+    app.router.add_post("/__send", fake.send)
+    app.router.add_post("/__disconnect", fake.disconnect)
+    app.router.add_get("/__stats", fake.stats)
+
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = runner.addresses[0][1]
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}"
+
+
+FAKE_CLASSES = {"slack": FakeSlack, "openai": FakeOpenAI, "jira": FakeJira, "sheets": FakeSheets}
+
+
+def _make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _dispatch(self):
+            parsed = urllib.parse.urlsplit(self.path)
+            if parsed.path == "/__stats":
+                return self._send(200, service.stats())
+            query = dict(urllib.parse.parse_qsl(parsed.query))
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            body = {}
+            if raw:
+                if "json" in (self.headers.get("Content-Type") or ""):
+                    body = json.loads(raw)
+                else:
+                    body = dict(urllib.parse.parse_qsl(raw.decode("utf-8")))
+            status, payload = service.handle(self.command, parsed.path, query, body)
+            self._send(status, payload)
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = _dispatch
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def _serve(configs, events, ready, socket_mode):
+    servers = {}
+    if socket_mode:
+        servers["socket_mode"] = _serve_socket_mode()
+    for name, config in configs.items():
+        kwargs = dict(config)
+        if name == "slack":
+            kwargs["events"] = events
+            if socket_mode:
+                kwargs["socket_mode_url"] = servers["socket_mode"].replace("http://", "ws://") + "/link"
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(FAKE_CLASSES[name](**kwargs)))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers[name] = f"http://127.0.0.1:{server.server_address[1]}"
+    ready.put(servers)
+    threading.Event().wait()
+
+
+def start_fakes(configs, socket_mode=False):
+    """
+    Starts the fake services in a child process. configs maps a service name to FakeService
+    keyword arguments (latency, jitter, error_rate, error_status, seed). With socket_mode, a
+    FakeSocketMode is started too and its base URL is returned as "socket_mode".
+    Returns (process, base_urls, slack_events_queue).
+    """
+    context = multiprocessing.get_context("spawn")
+    events = context.Queue()
+    ready = context.Queue()
+    process = context.Process(target=_serve, args=(configs, events, ready, socket_mode), daemon=True)
+    process.start()
+    return process, ready.get(timeout=30), events
+
+
+def fake_stats(base_url):
+    with urllib.request.urlopen(f"{base_url}/__stats", timeout=5) as response:
+        return json.loads(response.read())
+
+
+def fake_environment(urls, signing_secret):
+    """
+    Environment variables that point the bot at the fakes.
+    """
+    return {
+        "SLACK_BOT_TOKEN": "xoxb-benchmark",
+        "SLACK_SIGNING_SECRET": signing_secret,
+        "SLACK_BOT_USER_ID": "UBOT",
+        "SLACK_API_URL": f"{urls['slack']}/api/",
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_API_BASE": f"{urls['openai']}/v1",
+        "JIRA_DOMAIN": urls["jira"],
+        "JIRA_EMAIL": "bench@example.com",
+        "JIRA_API_TOKEN": "benchmark",
+        "SHEETS_API_URL": urls["sheets"],
+        "GOOGLE_TOKEN_URI": f"{urls['sheets']}/token",
+    }
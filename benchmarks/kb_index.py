@@ -0,0 +1,91 @@
+"""
+Knowledge-base index benchmark: build time, on-disk size, open time and query latency.
+
+Uses a real export when --source is given, otherwise a synthetic corpus of Markdown pages.
+
+    python benchmarks/kb_index.py --pages 2000 --queries 500
+    python benchmarks/kb_index.py --source ./kb-export --queries 500
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kb_index import KBIndex, build_index  # noqa: E402
+
+TOPICS = [
+    "vpn", "wifi", "password", "macbook", "okta", "printer", "keyboard", "battery", "slack",
+    "zoom", "jira", "laptop", "monitor", "dock", "bluetooth", "certificate", "email", "calendar",
+    "browser", "update", "firmware", "filevault", "backup", "license", "software", "onboarding",
+]
+FILLER = (
+    "open settings select network restart device sign again check connection contact support "
+    "install latest version click button menu account access request approval manager team "
+    "office remote home gateway region profile token reset unlock screen disk storage"
+).split()
+
+def generate_corpus(directory, pages, rng):
+    for page in range(pages):
+        topic = rng.choice(TOPICS)
+        sections = []
+        for section in range(rng.randint(2, 5)):
+            words = [rng.choice(FILLER if rng.random() < 0.8 else TOPICS) for _ in range(rng.randint(40, 160))]
+            sections.append(f"## {topic} issue {section}\n\n" + " ".join(words))
+        with open(os.path.join(directory, f"page-{page:05d}.md"), "w") as f:
+            f.write(f"# {topic.title()} guide {page}\n\n" + "\n\n".join(sections))
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--source", help="directory of exported KB pages")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.source
+        if source is None:
+            source = os.path.join(tmp, "source")
+            os.makedirs(source)
+            generate_corpus(source, args.pages, rng)
+        index_dir = os.path.join(tmp, "index")
+
+        stats = build_index(source, index_dir)
+        print(f"build:        {stats['build_time'] * 1000:9.1f} ms "
+              f"({stats['sources']} sources, {stats['passages']} passages, {stats['terms']} terms)")
+        print(f"index size:   {stats['size_bytes'] / 1024:9.1f} KiB")
+
+        rebuild = build_index(source, index_dir)
+        print(f"rebuild:      {rebuild['build_time'] * 1000:9.1f} ms "
+              f"({rebuild['reused_sources']} sources reused)")
+
+        start = time.perf_counter()
+        index = KBIndex(index_dir)
+        print(f"open:         {(time.perf_counter() - start) * 1000:9.1f} ms")
+
+        queries = [
+            " ".join(rng.choice(TOPICS + FILLER) for _ in range(rng.randint(2, 8)))
+            for _ in range(args.queries)
+        ]
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, k=3)
+            latencies.append(time.perf_counter() - start)
+        print(f"query p50:    {statistics.median(latencies) * 1000:9.3f} ms")
+        print(f"query p95:    {percentile(latencies, 95) * 1000:9.3f} ms")
+        print(f"query p99:    {percentile(latencies, 99) * 1000:9.3f} ms")
+        index.close()
+
+if __name__ == "__main__":
+    main()
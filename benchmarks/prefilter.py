@@ -0,0 +1,90 @@
+"""
+Pre-dispatch filter benchmark: per-request CPU time of slackbot() for events the bot ignores
+(thread replies, bot messages, channel joins) versus a message it handles.
+
+Slack Web API calls are answered locally and deferred work is not run, so only the request
+path itself (signature check, parsing, filtering, Bolt dispatch) is measured.
+
+    python benchmarks/prefilter.py --requests 2000
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SIGNING_SECRET = "benchmark-secret"
+os.environ.setdefault("SLACK_BOT_TOKEN", "xoxb-benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("SLACK_BOT_USER_ID", "UBOT")
+os.environ["SLACK_SIGNING_SECRET"] = SIGNING_SECRET
+
+from flask import Flask  # noqa: E402
+from slack_sdk.web.client import WebClient  # noqa: E402
+from slack_sdk.web.slack_response import SlackResponse  # noqa: E402
+
+def local_api_call(self, api_method, **kwargs):
+    data = {"ok": True, "ts": "1.0", "user_id": "UBOT", "team_id": "T1", "bot_id": "B1", "user": "UBOT"}
+    return SlackResponse(client=self, http_verb="POST", api_url=api_method, req_args={},
+                         data=data, headers={}, status_code=200)
+
+WebClient.api_call = local_api_call
+
+import main  # noqa: E402
+import slack_controller  # noqa: E402
+
+slack_controller.defer_task = lambda name, payload: None
+
+EVENTS = {
+    "thread_reply": {"type": "message", "user": "U1", "text": "thanks", "channel": "C1",
+                     "channel_type": "channel", "ts": "2.0", "thread_ts": "1.0"},
+    "bot_message": {"type": "message", "subtype": "bot_message", "bot_id": "B2", "text": "deploy done",
+                    "channel": "C1", "channel_type": "channel", "ts": "3.0"},
+    "channel_join": {"type": "message", "subtype": "channel_join", "user": "U2", "text": "<@U2> has joined",
+                     "channel": "C1", "channel_type": "channel", "ts": "4.0"},
+    "handled_message": {"type": "message", "user": "U1", "text": "my vpn keeps disconnecting",
+                        "channel": "C1", "channel_type": "channel", "ts": "5.0"},
+}
+
+def signed_request(event, event_id):
+    body = json.dumps({"type": "event_callback", "team_id": "T1", "api_app_id": "A1",
+                       "event_id": event_id, "event": event}).encode("utf-8")
+    timestamp = str(int(time.time()))
+    signature = "v0=" + hmac.new(SIGNING_SECRET.encode("utf-8"), b"v0:" + timestamp.encode("ascii") + b":" + body,
+                                 hashlib.sha256).hexdigest()
+    headers = {"Content-Type": "application/json", "X-Slack-Request-Timestamp": timestamp,
+               "X-Slack-Signature": signature}
+    return body, headers
+
+def measure(flask_app, name, event, requests):
+    cpu_times = []
+    for i in range(requests):
+        body, headers = signed_request(event, f"Ev{name}{i}")
+        with flask_app.test_request_context("/", method="POST", data=body, headers=headers):
+            from flask import request
+            start = time.process_time()
+            main.slackbot(request)
+            cpu_times.append(time.process_time() - start)
+    return cpu_times
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per event kind")
+    args = parser.parse_args()
+
+    flask_app = Flask("prefilter-benchmark")
+    print(f"{'event':<18}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, event in EVENTS.items():
+        cpu_times = sorted(measure(flask_app, name, event, args.requests))
+        mean = statistics.fmean(cpu_times) * 1000
+        p50 = cpu_times[len(cpu_times) // 2] * 1000
+        p95 = cpu_times[int(len(cpu_times) * 0.95)] * 1000
+        print(f"{name:<18}{mean:>10.3f}{p50:>10.3f}{p95:>10.3f}")
+
+if __name__ == "__main__":
+    run()
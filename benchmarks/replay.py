@@ -0,0 +1,252 @@
+"""
+Replays captured Slack traffic (CAPTURE_PATH, see capture.py) against the bot, re-signing every
+request, and reports latency and throughput, optionally compared with a saved baseline.
+
+By default the bot runs in this process against the local fakes from benchmarks/fakes.py, so
+end-to-end latency is measured too. With --url the requests are sent to a running instance
+instead (started with SLACK_SIGNING_SECRET set to --signing-secret) and only acks are measured.
+Requests keep their recorded spacing divided by --speed, or are sent at a fixed --rps.
+
+    python benchmarks/replay.py capture.jsonl --speed 10 --save replay_baseline.json
+    python benchmarks/replay.py capture.jsonl --speed 100 --baseline replay_baseline.json
+    python benchmarks/replay.py capture.jsonl --rps 50 --url http://localhost:8080/
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from e2e import (
+    SIGNING_SECRET, CompletionTracker, add_fake_arguments, call_slackbot, finish_background_work,
+    peak_rss_mb, percentile, sign, start_bot,
+)
+from fakes import fake_stats
+# e2e put the repository root on sys.path
+from capture import load_capture
+
+# Report values compared with the baseline, and whether a higher value is better
+COMPARED_METRICS = {
+    "achieved_rate": True,
+    "ack_p50": False,
+    "ack_p99": False,
+    "e2e_p50": False,
+    "e2e_p99": False,
+    "non_2xx_acks": False,
+    "incomplete": False,
+}
+
+
+def completion_key(record, ignorable):
+    """
+    Returns the CompletionTracker key for a recorded request the bot answers, or None.
+    """
+    body = record["body"]
+    if record["content_type"] == "application/json":
+        body = json.loads(body)
+        event = body.get("event") or {}
+        if body.get("type") != "event_callback" or ignorable(body):
+            return None
+        return ("message", event.get("ts"))
+    payload = json.loads(urllib.parse.parse_qs(body)["payload"][0])
+    action_id = (payload.get("actions") or [{}])[0].get("action_id")
+    container = payload.get("container") or {}
+    if action_id == "feedback_negative":
+        return ("negative", container.get("thread_ts"))
+    if action_id == "feedback_positive":
+        return ("positive", container.get("message_ts"))
+    return None
+
+
+def schedule(records, speed, rps):
+    """
+    Returns the send offset in seconds of each record.
+    """
+    if rps:
+        return [index / rps for index in range(len(records))]
+    first = records[0]["ts"]
+    return [(record["ts"] - first) / speed for record in records]
+
+
+def post(url, body, content_type, headers):
+    request_headers = {"Content-Type": content_type}
+    request_headers.update(headers)
+    request = urllib.request.Request(url, data=body, headers=request_headers, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def run(args):
+    records = load_capture(args.capture)
+    if args.limit:
+        records = records[: args.limit]
+    if not records:
+        raise SystemExit(f"No requests in {args.capture}")
+    offsets = schedule(records, args.speed, args.rps)
+
+    tracker = None
+    process = urls = None
+    if args.url:
+        def send_request(body, content_type, headers):
+            return post(args.url, body, content_type, headers)
+    else:
+        process, urls, slack_events, bot = start_bot(args)
+        from flask import Flask
+        from slack_controller import is_ignorable_event
+        flask_app = Flask("replay-benchmark")
+        tracker = CompletionTracker(slack_events)
+        tracker.start()
+
+        def send_request(body, content_type, headers):
+            return call_slackbot(bot, flask_app, body, content_type, headers)
+
+    rss_before = peak_rss_mb()
+    keys = []
+    seen = set()
+    for record in records:
+        key = completion_key(record, is_ignorable_event) if tracker else None
+        # Slack retries and repeated clicks are only expected to complete once
+        if key in seen or record.get("retry_num"):
+            key = None
+        seen.add(key)
+        keys.append(key)
+
+    acks, statuses = [], []
+    results_lock = threading.Lock()
+
+    def send(record, key):
+        body = record["body"].encode("utf-8")
+        headers = sign(body, args.signing_secret)
+        if record.get("retry_num"):
+            headers["X-Slack-Retry-Num"] = str(record["retry_num"])
+        sent_at = time.time()
+        if key is not None:
+            tracker.expect(key, sent_at)
+        try:
+            status = send_request(body, record["content_type"], headers)
+        except Exception as e:
+            print(f"Request failed: {e}", file=sys.stderr)
+            status = 0
+        with results_lock:
+            acks.append(time.time() - sent_at)
+            statuses.append(status)
+
+    print(f"Replaying {len(records)} requests from {args.capture} "
+          + (f"at {args.rps}/s" if args.rps else f"at {args.speed}x speed") + "...")
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.senders) as executor:
+        for record, key, offset in zip(records, keys, offsets):
+            delay = start + offset - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, record, key)
+    send_duration = time.monotonic() - start
+
+    report = {
+        "requests": len(records),
+        "speed": None if args.rps else args.speed,
+        "target_rate": args.rps or (len(records) / offsets[-1] if offsets[-1] else None),
+        "achieved_rate": len(records) / send_duration if send_duration else 0.0,
+        "non_2xx_acks": sum(1 for status in statuses if not 200 <= status < 300),
+        "ack_p50": percentile(acks, 0.5),
+        "ack_p99": percentile(acks, 0.99),
+    }
+    if tracker is not None:
+        tracker.wait(args.timeout)
+        tracker.stop()
+        finish_background_work(args.timeout)
+        expected = sum(1 for key in keys if key is not None)
+        completed = list(tracker.completed.values())
+        report.update({
+            "expected_replies": expected,
+            "incomplete": expected - len(completed),
+            "e2e_p50": percentile(completed, 0.5),
+            "e2e_p99": percentile(completed, 0.99),
+            "upstream_calls_per_request": {
+                name: fake_stats(url)["calls"] / len(records) for name, url in urls.items()
+            },
+            "peak_rss_mb": peak_rss_mb(),
+            "rss_before_load_mb": rss_before,
+        })
+        process.terminate()
+    report["duration"] = time.monotonic() - start
+    return report
+
+
+def print_report(report):
+    print(f"\nrequests {report['requests']}  rate {report['achieved_rate']:.1f}/s"
+          + (f" (target {report['target_rate']:.1f}/s)" if report["target_rate"] else ""))
+    print(f"ack latency      p50 {report['ack_p50'] * 1000:8.1f} ms   p99 {report['ack_p99'] * 1000:8.1f} ms"
+          f"   non-2xx {report['non_2xx_acks']}")
+    if "e2e_p50" in report:
+        print(f"end-to-end       p50 {report['e2e_p50'] * 1000:8.1f} ms   p99 {report['e2e_p99'] * 1000:8.1f} ms"
+              f"   incomplete {report['incomplete']}/{report['expected_replies']}")
+        print("upstream calls per request: " + ", ".join(
+            f"{name} {calls:.2f}" for name, calls in report["upstream_calls_per_request"].items()))
+        print(f"peak RSS {report['peak_rss_mb']:.1f} MB (after import {report['rss_before_load_mb']:.1f} MB)")
+
+
+def compare(report, baseline, tolerance):
+    """
+    Prints each compared metric next to the baseline and returns the names of those that are
+    worse by more than tolerance (a fraction of the baseline value).
+    """
+    regressions = []
+    print(f"\n{'metric':<16}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, higher_is_better in COMPARED_METRICS.items():
+        if name not in report or name not in baseline:
+            continue
+        old, new = baseline[name], report[name]
+        change = (new - old) / old if old else (0.0 if new == old else float("inf"))
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > tolerance and new != old:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<16}{old:>12.4g}{new:>12.4g}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("capture", help="Capture file written with CAPTURE_PATH")
+    pacing = parser.add_mutually_exclusive_group()
+    pacing.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (e.g. 10 or 100)")
+    pacing.add_argument("--rps", type=float, help="Send at a fixed rate instead of the recorded timing")
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    parser.add_argument("--url", help="Send to a running instance instead of an in-process bot")
+    parser.add_argument("--signing-secret", default=SIGNING_SECRET, help="Secret used to re-sign requests")
+    parser.add_argument("--senders", type=int, default=64, help="Concurrent request senders")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for replies after sending")
+    add_fake_arguments(parser)
+    parser.add_argument("--save", help="Write the report as JSON to this file")
+    parser.add_argument("--baseline", help="Compare with a report saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Allowed relative regression against the baseline (default 10%%)")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved report to {args.save}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Sheets cold-start benchmark: measures the first append_rows_to_sheet call in a fresh interpreter
+(credential decryption, service build, token fetch and the append itself) against the local
+Sheets fake, while other threads initialize the service at the same time as on a cold instance.
+A second run initializes first, as WARMUP_CLIENTS=sheets does, and then measures the first append.
+
+Reports these appends and a warm one, and how many token fetches each run caused (more than one
+means the service was built more than once).
+Use --save to record a baseline and --baseline to fail on regressions.
+
+    python benchmarks/sheets_init.py --runs 5 --save sheets_baseline.json
+    python benchmarks/sheets_init.py --threads 8 --latency 0.1 --baseline sheets_baseline.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from fakes import fake_stats, start_fakes
+from startup import REPO_ROOT, compare
+
+PROBE = """
+import json, sys, threading, time
+sys.path.insert(0, sys.argv[1])
+threads, warmed = int(sys.argv[2]), sys.argv[3] == "warmed"
+import sheet_controller
+row = ["BENCH", "Positive Feedback", "bench@example.com", "now"]
+results = {}
+# Other threads initialize the service while the writer appends, as client warm-up does;
+# when warmed, they finish before the first append
+start = time.perf_counter()
+initializers = [threading.Thread(target=sheet_controller.initialize_service) for _ in range(threads - 1)]
+for thread in initializers:
+    thread.start()
+if warmed:
+    for thread in initializers:
+        thread.join()
+    results["init"] = time.perf_counter() - start
+    start = time.perf_counter()
+sheet_controller.append_rows_to_sheet([row])
+results["first_append_after_init" if warmed else "cold_first_append"] = time.perf_counter() - start
+for thread in initializers:
+    thread.join()
+start = time.perf_counter()
+sheet_controller.append_rows_to_sheet([row])
+results["warm_append"] = time.perf_counter() - start
+print(json.dumps(results))
+"""
+
+def run_once(sheets_url, threads, warmed):
+    env = dict(os.environ)
+    env.update({"SHEETS_API_URL": sheets_url, "GOOGLE_TOKEN_URI": f"{sheets_url}/token"})
+    before = fake_stats(sheets_url)["by_path"].get("/token", 0)
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, REPO_ROOT, str(threads), "warmed" if warmed else "cold"],
+        env=env,
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    results = json.loads(output.stdout.strip().splitlines()[-1])
+    results["token_fetches"] = fake_stats(sheets_url)["by_path"].get("/token", 0) - before
+    if warmed:
+        del results["warm_append"]
+        results["token_fetches_warmed"] = results.pop("token_fetches")
+    return results
+
+def run(runs, threads, latency):
+    """
+    Returns the median of each measurement over the given number of fresh interpreters.
+    """
+    process, urls, _ = start_fakes({"sheets": {"latency": latency}})
+    try:
+        samples = {}
+        for _ in range(runs):
+            for warmed in (False, True):
+                for key, value in run_once(urls["sheets"], threads, warmed).items():
+                    samples.setdefault(key, []).append(value)
+    finally:
+        process.terminate()
+    return {key: statistics.median(values) for key, values in samples.items()}
+
+def format_value(key, value):
+    return f"{value:.1f}" if key.startswith("token_fetches") else f"{value * 1000:.1f} ms"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=8, help="Threads initializing the service at once, including the appending one")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latency of the Sheets fake per request")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a JSON file written by --save")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args()
+
+    results = run(args.runs, args.threads, args.latency)
+    for key, value in sorted(results.items()):
+        print(f"{key:32} {format_value(key, value):>12}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for key, (base, value) in sorted(regressions.items()):
+            print(f"REGRESSION {key}: {format_value(key, base)} -> {format_value(key, value)}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Socket Mode benchmark: runs socket_main.py in a child process against the local fakes, pushes
+message events and feedback clicks at a target rate through the fake Socket Mode server, then
+sends SIGTERM and checks that the runner drains the work it accepted before exiting.
+
+Reports ack latency (envelope sent until acked over the WebSocket), end-to-end latency, the
+runner's exit code and how many replies were still missing after shutdown.
+The client-side Slack rate limiter is off by default: its workspace-wide chat.update limit
+(~0.8/s) would leave most replies queued at these rates. Pass --slack-rate-limiting to keep it.
+
+    python benchmarks/socket_mode.py --rate 20 --events 200
+    python benchmarks/socket_mode.py --rate 50 --events 500 --workers 4 --latency openai=1.5
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from e2e import (
+    QUESTIONS, SIGNING_SECRET, CompletionTracker, add_fake_arguments, feedback_action, message_event,
+    percentile,
+)
+from fakes import SERVICES, fake_environment, fake_stats, start_fakes
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def post_json(url, payload):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}, method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def wait_until_healthy(url, process, timeout):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if process.poll() is not None:
+            raise SystemExit(f"socket_main.py exited with code {process.returncode} during startup")
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.1)
+    raise SystemExit(f"socket_main.py was not healthy within {timeout}s")
+
+
+def envelope(body, content_type):
+    """
+    Turns a signed-HTTP benchmark request from e2e into a Socket Mode envelope body.
+    """
+    if content_type == "application/json":
+        return {"type": "events_api", "payload": json.loads(body)}
+    payload = urllib.parse.parse_qs(body.decode("utf-8"))["payload"][0]
+    return {"type": "interactive", "payload": json.loads(payload)}
+
+
+def run(args):
+    configs = {name: {"seed": args.seed} for name in SERVICES}
+    for name, latency in args.latency.items():
+        configs[name]["latency"] = latency
+    for name, jitter in args.jitter.items():
+        configs[name]["jitter"] = jitter
+    for name, error_rate in args.error_rate.items():
+        configs[name]["error_rate"] = error_rate
+    fakes_process, urls, slack_events = start_fakes(configs, socket_mode=True)
+
+    env = dict(os.environ)
+    env.update(fake_environment(urls, SIGNING_SECRET))
+    env.update({
+        "SLACK_APP_TOKEN": "xapp-benchmark",
+        "SOCKET_MODE_WORKERS": str(args.workers),
+        "PORT": str(args.health_port),
+        "SHUTDOWN_GRACE_PERIOD": str(args.grace_period),
+        "SLACK_RATE_LIMITING": "true" if args.slack_rate_limiting else "false",
+    })
+    runner = subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, "socket_main.py")], cwd=ROOT_DIR, env=env)
+    try:
+        health_url = f"http://127.0.0.1:{args.health_port}/healthz"
+        startup_start = time.monotonic()
+        wait_until_healthy(health_url, runner, args.timeout)
+        startup = time.monotonic() - startup_start
+
+        tracker = CompletionTracker(slack_events)
+        tracker.start()
+        rng = random.Random(args.seed)
+        print(f"Sending {args.events} envelopes at {args.rate}/s...")
+        start = time.monotonic()
+        for index in range(args.events):
+            delay = start + index / args.rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            user_id = f"UBENCH{rng.randrange(args.users)}"
+            channel_id = f"CBENCH{index % args.channels}"
+            question = rng.choice(QUESTIONS)
+            if rng.random() < args.feedback_share:
+                body, content_type, key = feedback_action(index, user_id, channel_id, question, rng.random() < 0.5)
+            else:
+                body, content_type, key = message_event(index, user_id, channel_id, question)
+            tracker.expect(key, time.time())
+            post_json(f"{urls['socket_mode']}/__send", envelope(body, content_type))
+
+        # Let the last envelopes be acked, then shut down while their work is still in flight
+        time.sleep(args.settle)
+        shutdown_start = time.monotonic()
+        runner.send_signal(signal.SIGTERM)
+        exit_code = runner.wait(args.grace_period + 30)
+        shutdown = time.monotonic() - shutdown_start
+        tracker.wait(1)
+        tracker.stop()
+
+        socket_stats = fake_stats(urls["socket_mode"])
+        completed = list(tracker.completed.values())
+        return {
+            "events": args.events,
+            "startup": startup,
+            "ack_p50": percentile(socket_stats["ack_latencies"], 0.5),
+            "ack_p99": percentile(socket_stats["ack_latencies"], 0.99),
+            "unacked": socket_stats["unacked"],
+            "e2e_p50": percentile(completed, 0.5),
+            "e2e_p99": percentile(completed, 0.99),
+            "incomplete": len(tracker.sent) - len(completed),
+            "shutdown": shutdown,
+            "exit_code": exit_code,
+        }
+    finally:
+        if runner.poll() is None:
+            runner.kill()
+        fakes_process.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rate", type=float, default=20, help="Envelopes per second")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--channels", type=int, default=50)
+    parser.add_argument("--feedback-share", type=float, default=0.2, help="Fraction of envelopes that are button clicks")
+    parser.add_argument("--workers", type=int, default=10, help="SOCKET_MODE_WORKERS for the runner")
+    parser.add_argument("--health-port", type=int, default=8089)
+    parser.add_argument("--grace-period", type=float, default=60, help="SHUTDOWN_GRACE_PERIOD for the runner")
+    parser.add_argument("--slack-rate-limiting", action="store_true", help="Keep the client-side Slack rate limiter on")
+    parser.add_argument("--settle", type=float, default=0.5, help="Seconds between the last envelope and SIGTERM")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for the runner to start")
+    add_fake_arguments(parser)
+    args = parser.parse_args()
+
+    report = run(args)
+    print(f"\nstartup (until healthy) {report['startup']:.2f} s")
+    print(f"ack latency      p50 {report['ack_p50'] * 1000:8.1f} ms   p99 {report['ack_p99'] * 1000:8.1f} ms"
+          f"   unacked {report['unacked']}")
+    print(f"end-to-end       p50 {report['e2e_p50'] * 1000:8.1f} ms   p99 {report['e2e_p99'] * 1000:8.1f} ms"
+          f"   incomplete {report['incomplete']}/{report['events']}")
+    print(f"shutdown after SIGTERM {report['shutdown']:.2f} s, exit code {report['exit_code']}")
+    if report["exit_code"] != 0 or report["incomplete"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Cold-start benchmark: measures import and client-initialization cost per module.
+
+Each run happens in a fresh interpreter so nothing is cached between runs. Modules are
+imported in the order the Cloud Function loads them, so each figure is the marginal cost
+of that import. Use --save to record a baseline and --baseline to fail on regressions.
+
+    python benchmarks/startup.py --runs 5 --save startup_baseline.json
+    python benchmarks/startup.py --baseline startup_baseline.json --threshold 1.25
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "config",
+    "utils",
+    "jira_controller",
+    "ai_controller",
+    "sheet_controller",
+    "slack_controller",
+    "main",
+]
+
+# Client initializers that can run offline (auth.test needs the network and is left out)
+INITIALIZERS = {
+    "openai": "ai_controller:get_openai",
+    "sheets": "sheet_controller:initialize_service",
+}
+
+PROBE = """
+import importlib, json, sys, time
+sys.path.insert(0, sys.argv[1])
+modules, initializers = json.loads(sys.argv[2]), json.loads(sys.argv[3])
+results = {}
+start_all = time.perf_counter()
+for name in modules:
+    start = time.perf_counter()
+    importlib.import_module(name)
+    results["import:" + name] = time.perf_counter() - start
+results["import:total"] = time.perf_counter() - start_all
+for name, target in initializers.items():
+    module_name, func_name = target.split(":")
+    func = getattr(importlib.import_module(module_name), func_name)
+    start = time.perf_counter()
+    try:
+        func()
+        results["init:" + name] = time.perf_counter() - start
+    except Exception as e:
+        print(f"init {name} failed: {e}", file=sys.stderr)
+print(json.dumps(results))
+"""
+
+def run_once(modules, initializers):
+    env = dict(os.environ)
+    # Dummy credentials so config.py imports; nothing here talks to Slack or OpenAI
+    env.setdefault("SLACK_BOT_TOKEN", "xoxb-benchmark")
+    env.setdefault("SLACK_SIGNING_SECRET", "benchmark-secret")
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    env.pop("WARMUP_CLIENTS", None)
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, REPO_ROOT, json.dumps(modules), json.dumps(initializers)],
+        env=env,
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def run(runs, modules=MODULES, initializers=INITIALIZERS):
+    """
+    Returns the median of each measurement (seconds) over the given number of fresh interpreters.
+    """
+    samples = {}
+    for _ in range(runs):
+        for key, value in run_once(modules, initializers).items():
+            samples.setdefault(key, []).append(value)
+    return {key: statistics.median(values) for key, values in samples.items()}
+
+def compare(results, baseline, threshold):
+    """
+    Returns the measurements that are more than threshold times slower than the baseline.
+    Tiny absolute differences (under 5 ms) are ignored as noise.
+    """
+    regressions = {}
+    for key, value in results.items():
+        base = baseline.get(key)
+        if base is not None and value > base * threshold and value - base > 0.005:
+            regressions[key] = (base, value)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a JSON file written by --save")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args()
+
+    results = run(args.runs)
+    for key, value in sorted(results.items()):
+        print(f"{key:32} {value * 1000:9.1f} ms")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for key, (base, value) in sorted(regressions.items()):
+            print(f"REGRESSION {key}: {base * 1000:.1f} ms -> {value * 1000:.1f} ms")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.parse
+
+logger = logging.getLogger(__name__)
+
+# Slack user, bot and enterprise-user IDs (also inside mentions such as <@U012AB3CD>)
+USER_ID_PATTERN = re.compile(r"\b[UWB][A-Z0-9]{8,12}\b")
+# Keys holding a user ID (in interaction payloads "user" is an object whose "id" is the user ID)
+USER_KEYS = {"user", "user_id", "inviter", "bot_id"}
+# Keys whose string values are free text or personal data; replaced by same-length surrogates
+TEXT_KEYS = {
+    "text", "value", "question", "real_name", "display_name", "name", "username", "email", "title",
+    "fallback", "pretext", "permalink", "url", "image_url", "thumb_url", "first_name", "last_name",
+}
+# Keys holding secrets or one-time URLs; dropped entirely
+DROP_KEYS = {
+    "token", "response_url", "response_urls", "authed_users", "authorizations", "files",
+    "user_profile", "bot_profile",
+}
+
+
+class PayloadScrubber:
+    """
+    Removes personal data from Slack request bodies while keeping their shape.
+    User IDs become stable pseudonyms and free text becomes a surrogate of the same length, both
+    derived from a keyed hash: the same user or question maps to the same value within a
+    capture, so per-user limits, deduplication and caches behave as they did live.
+    """
+
+    def __init__(self, salt):
+        self._key = salt.encode("utf-8")
+
+    def _digest(self, value):
+        return hmac.new(self._key, value.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def pseudonym(self, user_id):
+        return user_id[0] + self._digest(user_id)[:10].upper()
+
+    def surrogate(self, text):
+        if not text:
+            return text
+        word = "x" + self._digest(text)[:11] + " "
+        return (word * (len(text) // len(word) + 1))[: len(text)]
+
+    def _scrub_value(self, key, value):
+        if isinstance(value, dict):
+            scrubbed = self.scrub(value)
+            if key in USER_KEYS and isinstance(scrubbed.get("id"), str):
+                scrubbed["id"] = self.pseudonym(value["id"])
+            return scrubbed
+        if isinstance(value, list):
+            return [self._scrub_value(key, item) for item in value]
+        if not isinstance(value, str):
+            return value
+        if key in USER_KEYS:
+            return self.pseudonym(value)
+        if key in TEXT_KEYS:
+            # Button values may carry JSON (e.g. the question reference on feedback buttons)
+            if value.startswith("{"):
+                try:
+                    return json.dumps(self.scrub(json.loads(value)))
+                except ValueError:
+                    pass
+            return self.surrogate(value)
+        return USER_ID_PATTERN.sub(lambda match: self.pseudonym(match.group(0)), value)
+
+    def scrub(self, body):
+        return {
+            key: self._scrub_value(key, value)
+            for key, value in body.items()
+            if key not in DROP_KEYS
+        }
+
+    def scrub_request(self, raw_body, content_type):
+        """
+        Returns the scrubbed raw body, or None if it cannot be parsed.
+        """
+        try:
+            if content_type == "application/json":
+                return json.dumps(self.scrub(json.loads(raw_body)))
+            form = urllib.parse.parse_qs(raw_body.decode("utf-8"))
+            payload = form.get("payload")
+            if not payload:
+                return None
+            return urllib.parse.urlencode({"payload": json.dumps(self.scrub(json.loads(payload[0])))})
+        except (ValueError, UnicodeDecodeError, AttributeError) as e:
+            logger.warning(f"Could not scrub captured request: {e}")
+            return None
+
+
+class TrafficRecorder:
+    """
+    Appends scrubbed copies of incoming Slack requests to a JSON Lines file for replay with
+    benchmarks/replay.py. Requests are queued and scrubbed on a background thread, so the request
+    path only pays for a queue put; when the queue is full the request is not recorded.
+    Each line holds the arrival time, content type, X-Slack-Retry-Num and scrubbed body.
+    """
+
+    def __init__(self, path, salt=None, sample_rate=1.0, max_queue=1000):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.scrubber = PayloadScrubber(salt or os.urandom(16).hex())
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {"recorded": 0, "dropped": 0, "unparseable": 0}
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="traffic-recorder", daemon=True)
+                self._thread.start()
+
+    def record(self, raw_body, content_type, retry_num=None):
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        self.start()
+        try:
+            self._queue.put_nowait((time.time(), raw_body, content_type, retry_num))
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                received_at, raw_body, content_type, retry_num = self._queue.get()
+                try:
+                    self._write(f, received_at, raw_body, content_type, retry_num)
+                    if self._queue.qsize() == 0:
+                        f.flush()
+                except OSError as e:
+                    logger.error(f"Error writing captured request to {self.path}: {e}")
+                finally:
+                    self._queue.task_done()
+
+    def _write(self, f, received_at, raw_body, content_type, retry_num):
+        body = self.scrubber.scrub_request(raw_body, content_type)
+        if body is None:
+            with self._lock:
+                self._stats["unparseable"] += 1
+            return
+        record = {"ts": received_at, "content_type": content_type, "retry_num": retry_num, "body": body}
+        f.write(json.dumps(record) + "\n")
+        with self._lock:
+            self._stats["recorded"] += 1
+
+    def flush(self, timeout=5):
+        """
+        Waits up to timeout seconds until queued requests have been written.
+        """
+        end = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < end:
+            time.sleep(0.05)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+
+def load_capture(path):
+    """
+    Reads a capture file into a list of records ordered by arrival time.
+    """
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    records.sort(key=lambda record: record["ts"])
+    return records
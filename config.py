@@ -1,5 +1,7 @@
 import os
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -16,24 +18,77 @@ except KeyError as e:
     logger.error(f"Environment variable {str(e)} not set. Exiting.")
     raise
 
-# Initialize OpenAI API key
-import openai
-openai.api_key = OPENAI_API_KEY
+# Deferred processing: listeners only ack and enqueue, and the slow work (OpenAI, Jira,
+# Sheets) runs on a background task queue. Bolt then processes each request before
+# responding, which is required on Cloud Functions and now takes milliseconds.
+# Background work after the response needs CPU to stay allocated (Cloud Functions gen2
+# / Cloud Run with "CPU always allocated").
+DEFERRED_PROCESSING = os.environ.get("DEFERRED_PROCESSING", "true").lower() in ("1", "true", "yes")
+DEFERRED_MAX_WORKERS = int(os.environ.get("DEFERRED_MAX_WORKERS", 8))
+DEFERRED_MAX_PENDING = int(os.environ.get("DEFERRED_MAX_PENDING", 100))
 
 # Slack App Initialization
+# Token verification (auth.test) is skipped at import time to keep cold starts fast;
+# Bolt's authorization middleware performs it on the first dispatched request instead.
+# SLACK_API_URL points the Web API client elsewhere (e.g. a local stand-in for benchmarks).
 from slack_bolt import App
-app = App(token=SLACK_BOT_TOKEN)
+SLACK_API_URL = os.environ.get("SLACK_API_URL")
+if SLACK_API_URL:
+    from slack_sdk import WebClient
+    app = App(
+        client=WebClient(token=SLACK_BOT_TOKEN, base_url=SLACK_API_URL),
+        token_verification_enabled=False,
+        process_before_response=DEFERRED_PROCESSING,
+    )
+else:
+    app = App(
+        token=SLACK_BOT_TOKEN,
+        token_verification_enabled=False,
+        process_before_response=DEFERRED_PROCESSING,
+    )
 
-# Retrieve Bot User ID
-try:
-    bot_user_id = app.client.auth_test()["user_id"]
-    logger.info(f"Bot User ID: {bot_user_id}")
-except Exception as e:
-    logger.error(f"Error getting bot user ID: {e}")
-    bot_user_id = None
+# Web API client used for all bot calls. With SLACK_RATE_LIMITING, calls wait on per-method
+# token buckets, honor Retry-After and coalesce pending chat.update calls on the same message.
+from slack_client import RateLimitedClient
+SLACK_RATE_LIMITING = os.environ.get("SLACK_RATE_LIMITING", "true").lower() in ("1", "true", "yes")
+slack_client = RateLimitedClient(app.client) if SLACK_RATE_LIMITING else app.client
+
+# Bot User ID, resolved lazily. Set SLACK_BOT_USER_ID to skip the auth.test call entirely.
+# After a failed auth.test, callers get None for BOT_USER_ID_RETRY_INTERVAL seconds instead
+# of each event retrying it under the lock.
+_bot_user_id = os.environ.get("SLACK_BOT_USER_ID")
+_bot_user_id_lock = threading.Lock()
+_bot_user_id_failed_at = None
+BOT_USER_ID_RETRY_INTERVAL = float(os.environ.get("BOT_USER_ID_RETRY_INTERVAL", 30))
+
+def _bot_user_id_backing_off():
+    if _bot_user_id_failed_at is None:
+        return False
+    return time.monotonic() - _bot_user_id_failed_at < BOT_USER_ID_RETRY_INTERVAL
+
+def peek_bot_user_id():
+    """
+    Returns the bot's user ID if it is already known, without calling auth.test.
+    """
+    return _bot_user_id
+
+def get_bot_user_id():
+    """
+    Returns the bot's user ID, calling auth.test once on first use.
+    """
+    global _bot_user_id, _bot_user_id_failed_at
+    if _bot_user_id is None and not _bot_user_id_backing_off():
+        with _bot_user_id_lock:
+            if _bot_user_id is None and not _bot_user_id_backing_off():
+                try:
+                    _bot_user_id = app.client.auth_test()["user_id"]
+                    logger.info(f"Bot User ID: {_bot_user_id}")
+                except Exception as e:
+                    _bot_user_id_failed_at = time.monotonic()
+                    logger.error(f"Error getting bot user ID, retrying in {BOT_USER_ID_RETRY_INTERVAL:.0f}s: {e}")
+    return _bot_user_id
 
 # Confluence API Configuration
 #CONFLUENCE_BASE_URL = "https://your-confluence-instance.atlassian.net/wiki/rest/api/"
 #CONFLUENCE_USERNAME = "your-username"
 #CONFLUENCE_API_TOKEN = "your-api-token"
-
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Event deduplication: Slack retries an event up to three times over ~5 minutes, so event IDs
+# are remembered for DEDUP_TTL seconds. DEDUP_DB_PATH enables a SQLite store shared by instances.
+DEDUP_TTL = int(os.environ.get("DEDUP_TTL", 15 * 60))
+DEDUP_MAX_KEYS_PER_BUCKET = int(os.environ.get("DEDUP_MAX_KEYS_PER_BUCKET", 10000))
+DEDUP_DB_PATH = os.environ.get("DEDUP_DB_PATH")
+
+
+class TimeBucketedSet:
+    """
+    Fixed-memory record of recently seen keys.
+    Keys are stored in time buckets of bucket_seconds; buckets older than ttl are dropped
+    whole, and each bucket holds at most max_keys_per_bucket keys, so memory stays bounded
+    no matter how many events arrive. Once a bucket is full, further keys are not recorded
+    (they may then be processed twice) rather than growing memory.
+    """
+
+    def __init__(self, ttl=600, bucket_seconds=60, max_keys_per_bucket=10000):
+        self.ttl = ttl
+        self.bucket_seconds = bucket_seconds
+        self.max_keys_per_bucket = max_keys_per_bucket
+        self.num_buckets = -(-ttl // bucket_seconds) + 1
+        self._buckets = [(None, set()) for _ in range(self.num_buckets)]
+        self._lock = threading.Lock()
+        self.overflows = 0
+
+    def _live_buckets(self, now):
+        current = int(now // self.bucket_seconds)
+        oldest = current - self.num_buckets + 1
+        return current, [keys for number, keys in self._buckets if number is not None and number >= oldest]
+
+    def check_and_add(self, key, now=None):
+        """
+        Records key and returns True if it was not seen within the TTL.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            current, live = self._live_buckets(now)
+            if any(key in keys for keys in live):
+                return False
+            slot = current % self.num_buckets
+            number, keys = self._buckets[slot]
+            if number != current:
+                keys = set()
+                self._buckets[slot] = (current, keys)
+            if len(keys) < self.max_keys_per_bucket:
+                keys.add(key)
+            else:
+                self.overflows += 1
+            return True
+
+    def discard(self, key):
+        with self._lock:
+            for _, keys in self._buckets:
+                keys.discard(key)
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(keys) for keys in self._live_buckets(time.time())[1])
+
+
+class SQLiteDedupBackend:
+    """
+    Shared dedup store in a SQLite database, for instances that mount the same file.
+    Any object with check_and_add(key, ttl) and discard(key) can be used instead
+    (e.g. Redis SET NX EX, or a Firestore create()).
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_events (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._last_purge = 0.0
+
+    def check_and_add(self, key, ttl):
+        now = time.time()
+        with self._lock:
+            if now - self._last_purge > ttl:
+                self._conn.execute("DELETE FROM seen_events WHERE expires_at <= ?", (now,))
+                self._last_purge = now
+            # Expired rows are replaced; live rows make the insert a no-op
+            cursor = self._conn.execute(
+                "INSERT INTO seen_events (key, expires_at) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET expires_at = excluded.expires_at "
+                "WHERE seen_events.expires_at <= ?",
+                (key, now + ttl, now),
+            )
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def discard(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM seen_events WHERE key = ?", (key,))
+            self._conn.commit()
+
+
+class EventDeduplicator:
+    """
+    Decides whether an incoming Slack event is new. The local TimeBucketedSet rejects repeats
+    seen by this instance; the optional shared backend catches repeats delivered to another one.
+    Backend errors fail open (the event is processed).
+    """
+
+    def __init__(self, ttl=600, max_keys_per_bucket=10000, backend=None):
+        self.ttl = ttl
+        self.backend = backend
+        self._local = TimeBucketedSet(ttl=ttl, bucket_seconds=max(ttl // 10, 1),
+                                      max_keys_per_bucket=max_keys_per_bucket)
+        self._lock = threading.Lock()
+        self._stats = {"new": 0, "duplicates": 0, "backend_errors": 0}
+
+    def is_new(self, keys):
+        """
+        Records the keys identifying one event and returns False if any of them was already seen.
+        """
+        keys = [key for key in keys if key]
+        if not keys:
+            return True
+        new = all([self._local.check_and_add(key) for key in keys])
+        if new and self.backend is not None:
+            try:
+                new = all([self.backend.check_and_add(key, self.ttl) for key in keys])
+            except Exception as e:
+                logger.error(f"Error checking shared dedup store: {e}")
+                self._count("backend_errors")
+        self._count("new" if new else "duplicates")
+        return new
+
+    def forget(self, keys):
+        """
+        Forgets the keys, e.g. when processing the first delivery failed and a retry should run.
+        """
+        for key in keys:
+            if not key:
+                continue
+            self._local.discard(key)
+            if self.backend is not None:
+                try:
+                    self.backend.discard(key)
+                except Exception as e:
+                    logger.error(f"Error discarding key from shared dedup store: {e}")
+
+    async def is_new_async(self, keys):
+        """
+        is_new() for an event loop: with a shared backend, the check runs in a worker thread.
+        """
+        if self.backend is None:
+            return self.is_new(keys)
+        return await asyncio.to_thread(self.is_new, keys)
+
+    async def forget_async(self, keys):
+        """
+        forget() for an event loop: with a shared backend, it runs in a worker thread.
+        """
+        if self.backend is None:
+            return self.forget(keys)
+        await asyncio.to_thread(self.forget, keys)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["local_keys"] = len(self._local)
+        stats["local_overflows"] = self._local.overflows
+        return stats
+
+
+def create_deduplicator():
+    """
+    Builds the EventDeduplicator configured by the DEDUP_* settings.
+    """
+    backend = None
+    if DEDUP_DB_PATH:
+        try:
+            backend = SQLiteDedupBackend(DEDUP_DB_PATH)
+        except Exception as e:
+            logger.error(f"Error opening shared dedup store at {DEDUP_DB_PATH}: {e}")
+    return EventDeduplicator(
+        ttl=DEDUP_TTL, max_keys_per_bucket=DEDUP_MAX_KEYS_PER_BUCKET, backend=backend
+    )
+
+
+def event_dedup_keys(body):
+    """
+    Returns the identifiers of a Slack Events API body: the event_id, plus the client_msg_id
+    of message events so the same user message is handled once even if delivered twice.
+    """
+    if not isinstance(body, dict) or body.get("type") != "event_callback":
+        return []
+    keys = [f"event:{body['event_id']}"] if body.get("event_id") else []
+    client_msg_id = (body.get("event") or {}).get("client_msg_id")
+    if client_msg_id:
+        keys.append(f"msg:{client_msg_id}")
+    return keys
@@ -1,127 +1,631 @@
+import asyncio
 import json
+import random
+import threading
+import time
+from collections import namedtuple
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.exceptions import NewConnectionError
+from email.utils import parsedate_to_datetime
 import logging
 import os
+import metrics
+from cache import TTLCache
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Jira API Configuration
-JIRA_DOMAIN = "https://catawiki.atlassian.net"
-EMAIL = 
-API_TOKEN = 
+JIRA_DOMAIN = os.environ.get("JIRA_DOMAIN", "https://catawiki.atlassian.net")
+EMAIL = os.environ.get("JIRA_EMAIL")
+API_TOKEN = os.environ.get("JIRA_API_TOKEN")
 
+# Metadata cache configuration (seconds). Service desks and request types almost never
+# change, account IDs are per reporter and bounded by ACCOUNT_ID_CACHE_SIZE.
+SERVICE_DESK_TTL = int(os.environ.get("JIRA_SERVICE_DESK_TTL", 24 * 60 * 60))
+REQUEST_TYPE_TTL = int(os.environ.get("JIRA_REQUEST_TYPE_TTL", 24 * 60 * 60))
+ACCOUNT_ID_TTL = int(os.environ.get("JIRA_ACCOUNT_ID_TTL", 6 * 60 * 60))
+ACCOUNT_ID_NEGATIVE_TTL = int(os.environ.get("JIRA_ACCOUNT_ID_NEGATIVE_TTL", 10 * 60))
+ACCOUNT_ID_CACHE_SIZE = int(os.environ.get("JIRA_ACCOUNT_ID_CACHE_SIZE", 2048))
 
-def get_account_id(email):
-    url = f"{JIRA_DOMAIN}/rest/api/3/user/search"
-    auth = HTTPBasicAuth(EMAIL, API_TOKEN)
+service_desk_cache = TTLCache(maxsize=64, ttl=SERVICE_DESK_TTL)
+request_type_cache = TTLCache(maxsize=256, ttl=REQUEST_TYPE_TTL)
+account_id_cache = TTLCache(
+    maxsize=ACCOUNT_ID_CACHE_SIZE, ttl=ACCOUNT_ID_TTL, negative_ttl=ACCOUNT_ID_NEGATIVE_TTL
+)
+# Called with the reporter email when its cached account ID is invalidated, so that copies
+# kept outside this module (the user directory) are dropped as well
+account_id_invalidation_listeners = []
+
+
+# HTTP client configuration: one keep-alive session shared by every Jira call
+JIRA_POOL_CONNECTIONS = int(os.environ.get("JIRA_POOL_CONNECTIONS", 2))
+JIRA_POOL_MAXSIZE = int(os.environ.get("JIRA_POOL_MAXSIZE", 10))
+JIRA_CONNECT_TIMEOUT = float(os.environ.get("JIRA_CONNECT_TIMEOUT", 3.05))
+JIRA_READ_TIMEOUT = float(os.environ.get("JIRA_READ_TIMEOUT", 10))
+JIRA_MAX_RETRIES = int(os.environ.get("JIRA_MAX_RETRIES", 3))
+JIRA_BACKOFF_BASE = float(os.environ.get("JIRA_BACKOFF_BASE", 0.5))
+JIRA_BACKOFF_MAX = float(os.environ.get("JIRA_BACKOFF_MAX", 8))
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Statuses after which a customer request was certainly not created and may be sent again later.
+# Only a rate limit qualifies: a 5xx (e.g. a 503 from a proxy) may arrive after Jira committed
+# the request, and the POST carries no idempotency key.
+TICKET_RETRY_STATUS_CODES = {429}
+
+session = requests.Session()
+session.auth = HTTPBasicAuth(EMAIL, API_TOKEN)
+_adapter = HTTPAdapter(pool_connections=JIRA_POOL_CONNECTIONS, pool_maxsize=JIRA_POOL_MAXSIZE)
+session.mount("https://", _adapter)
+session.mount("http://", _adapter)
+
+_stats_lock = threading.Lock()
+_http_stats = {"requests": 0, "retries": 0, "errors": 0, "total_time": 0.0, "max_time": 0.0}
+
+
+# IDs needed to create a customer request; from_cache names those taken from the caches,
+# which may be stale ("account_id", "service_desk_id", "request_type_id")
+RequestIds = namedtuple(
+    "RequestIds", ["account_id", "service_desk_id", "request_type_id", "from_cache"]
+)
+
+
+class JiraLookupError(Exception):
+    """Raised by the lookup fetchers on HTTP errors, so that failures are not cached."""
+
+    def __init__(self, status_code):
+        super().__init__(f"Jira returned {status_code}")
+        self.status_code = status_code
+
+
+class JiraTicketError(Exception):
+    """
+    Raised by create_jira_ticket(raise_errors=True). retryable is True when the request was
+    certainly not created (Jira unreachable, 429, or lookups failed on a transport error,
+    429 or 5xx), so sending it again later cannot create a duplicate ticket. Lookups that found
+    nothing or were rejected with another 4xx are not retryable.
+    """
+
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def _record(elapsed=None, retry=False, error=False):
+    with _stats_lock:
+        if elapsed is not None:
+            _http_stats["requests"] += 1
+            _http_stats["total_time"] += elapsed
+            _http_stats["max_time"] = max(_http_stats["max_time"], elapsed)
+        if retry:
+            _http_stats["retries"] += 1
+        if error:
+            _http_stats["errors"] += 1
+
+def _failed_to_connect(error):
+    """
+    True when a request never reached Jira: connect timeouts, refused connections, DNS failures.
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+def _retry_delay(attempt, response=None):
+    """
+    Returns how long to wait before the next attempt: the server's Retry-After when present,
+    otherwise exponential backoff with full jitter.
+    """
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), JIRA_BACKOFF_MAX)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                return min(max(delay, 0), JIRA_BACKOFF_MAX)
+            except (TypeError, ValueError):
+                pass
+    return random.uniform(0, min(JIRA_BACKOFF_MAX, JIRA_BACKOFF_BASE * 2 ** attempt))
+
+def jira_request(method, path, idempotent=True, timeout=None, **kwargs):
+    """
+    Sends a request to the Jira API over the shared session.
+    429/5xx responses and connection errors are retried with backoff. Non-idempotent
+    requests (ticket creation) are only retried when Jira cannot have processed them:
+    on 429 and on failures to connect.
+    """
+    url = f"{JIRA_DOMAIN}{path}"
+    timeout = timeout or (JIRA_CONNECT_TIMEOUT, JIRA_READ_TIMEOUT)
+    for attempt in range(JIRA_MAX_RETRIES + 1):
+        last_attempt = attempt == JIRA_MAX_RETRIES
+        start = time.monotonic()
+        try:
+            with metrics.span("jira_request", method=method):
+                response = session.request(method, url, timeout=timeout, **kwargs)
+        except requests.ConnectionError as e:
+            # ConnectTimeout is a ConnectionError; ReadTimeout is not, and is never retried
+            _record(time.monotonic() - start, error=True)
+            if last_attempt or not (idempotent or _failed_to_connect(e)):
+                raise
+            delay = _retry_delay(attempt)
+            logger.warning(f"Jira {method} {path} failed ({e}), retrying in {delay:.2f}s")
+        except requests.RequestException:
+            _record(time.monotonic() - start, error=True)
+            raise
+        else:
+            _record(time.monotonic() - start)
+            if response.status_code >= 400:
+                metrics.increment("jira_request_errors_total", method=method, status=response.status_code)
+            retryable = response.status_code == 429 or (
+                idempotent and response.status_code in RETRY_STATUS_CODES
+            )
+            if not retryable or last_attempt:
+                return response
+            delay = _retry_delay(attempt, response)
+            logger.warning(
+                f"Jira {method} {path} returned {response.status_code}, retrying in {delay:.2f}s"
+            )
+        _record(retry=True)
+        time.sleep(delay)
+
+def get_http_stats():
+    """
+    Returns request/latency counters for the Jira session together with connection pool usage,
+    so that connection reuse can be verified (connections_reused should grow with requests).
+    """
+    with _stats_lock:
+        stats = dict(_http_stats)
+    stats["avg_time"] = stats["total_time"] / stats["requests"] if stats["requests"] else 0.0
+    connections = pooled_requests = 0
+    pools = _adapter.poolmanager.pools
+    for key in list(pools.keys()):
+        pool = pools.get(key)
+        if pool is not None:
+            connections += pool.num_connections
+            pooled_requests += pool.num_requests
+    stats["connections_opened"] = connections
+    stats["connections_reused"] = max(pooled_requests - connections, 0)
+    return stats
+
+metrics.register_collector("jira_http", get_http_stats)
+metrics.register_collector("jira_service_desk_cache", service_desk_cache.stats)
+metrics.register_collector("jira_request_type_cache", request_type_cache.stats)
+metrics.register_collector("jira_account_id_cache", account_id_cache.stats)
+
+def get_account_id(email, raise_errors=False):
+    """
+    Returns the Jira accountId for the given email, cached per email.
+    Unknown users are cached for ACCOUNT_ID_NEGATIVE_TTL to avoid repeated searches.
+    Failed lookups return None, or raise JiraTicketError when raise_errors is set.
+    """
+    try:
+        return account_id_cache.get_or_load(email, lambda: _fetch_account_id(email))
+    except (JiraLookupError, requests.RequestException) as e:
+        return _lookup_failed(e, raise_errors)
+
+def _fetch_account_id(email):
     headers = {"Accept": "application/json"}
     params = {"query": email}
 
-    response = requests.get(url, headers=headers, auth=auth, params=params)
+    response = jira_request("GET", "/rest/api/3/user/search", headers=headers, params=params)
+    return _parse_account_id(response, email)
+
+def _parse_account_id(response, email):
     if response.status_code == 200:
         users = response.json()
         for user in users:
             if user.get("emailAddress") == email:
                 return user.get("accountId")
-    else:
-        logger.error(f"Failed to fetch accountId. Status Code: {response.status_code}")
-        logger.error(response.text)
-    return None
+        return None
+    logger.error(f"Failed to fetch accountId. Status Code: {response.status_code}")
+    logger.error(response.text)
+    raise JiraLookupError(response.status_code)
 
-def get_service_desk_id_by_project_key(project_key):
-    url = f"{JIRA_DOMAIN}/rest/servicedeskapi/servicedesk"
-    auth = HTTPBasicAuth(EMAIL, API_TOKEN)
+def get_service_desk_id_by_project_key(project_key, raise_errors=False):
+    """
+    Returns the service desk ID for the given project key, cached for SERVICE_DESK_TTL.
+    """
+    try:
+        return service_desk_cache.get_or_load(
+            project_key, lambda: _fetch_service_desk_id(project_key)
+        )
+    except (JiraLookupError, requests.RequestException) as e:
+        return _lookup_failed(e, raise_errors)
+
+def _fetch_service_desk_id(project_key):
     headers = {"Accept": "application/json"}
 
-    response = requests.get(url, headers=headers, auth=auth)
+    response = jira_request("GET", "/rest/servicedeskapi/servicedesk", headers=headers)
+    return _parse_service_desk_id(response, project_key)
+
+def _parse_service_desk_id(response, project_key):
     if response.status_code == 200:
         data = response.json()
         for service_desk in data.get("values", []):
             if service_desk.get("projectKey") == project_key:
                 return service_desk.get("id")
         logger.error(f"Service desk with project key {project_key} not found.")
-    else:
-        logger.error(f"Failed to get service desks. Status Code: {response.status_code}")
-        logger.error(response.text)
-    return None
+        return None
+    logger.error(f"Failed to get service desks. Status Code: {response.status_code}")
+    logger.error(response.text)
+    raise JiraLookupError(response.status_code)
+
+def get_request_type_id(service_desk_id, request_type_name, raise_errors=False):
+    """
+    Returns the request type ID for the given service desk and name, cached for REQUEST_TYPE_TTL.
+    """
+    try:
+        return request_type_cache.get_or_load(
+            (service_desk_id, request_type_name),
+            lambda: _fetch_request_type_id(service_desk_id, request_type_name),
+        )
+    except (JiraLookupError, requests.RequestException) as e:
+        return _lookup_failed(e, raise_errors)
 
-def get_request_type_id(service_desk_id, request_type_name):
-    url = f"{JIRA_DOMAIN}/rest/servicedeskapi/servicedesk/{service_desk_id}/requesttype"
-    auth = HTTPBasicAuth(EMAIL, API_TOKEN)
+def _fetch_request_type_id(service_desk_id, request_type_name):
+    path = f"/rest/servicedeskapi/servicedesk/{service_desk_id}/requesttype"
     headers = {"Accept": "application/json"}
 
-    response = requests.get(url, headers=headers, auth=auth)
+    response = jira_request("GET", path, headers=headers)
+    return _parse_request_type_id(response, request_type_name)
+
+def _parse_request_type_id(response, request_type_name):
     if response.status_code == 200:
         data = response.json()
         for request_type in data.get("values", []):
             if request_type.get("name") == request_type_name:
                 return request_type.get("id")
         logger.error(f"Request type '{request_type_name}' not found.")
-    else:
-        logger.error(f"Failed to get request types. Status Code: {response.status_code}")
-        logger.error(response.text)
+        return None
+    logger.error(f"Failed to get request types. Status Code: {response.status_code}")
+    logger.error(response.text)
+    raise JiraLookupError(response.status_code)
+
+def _lookup_failed(error, raise_errors):
+    """
+    Logs a failed lookup and returns None, or raises it as a JiraTicketError that is retryable
+    only for transport errors, 429 and 5xx.
+    """
+    logger.error(f"Jira lookup failed: {error}")
+    if not raise_errors:
+        return None
+    retryable = not isinstance(error, JiraLookupError) or (
+        error.status_code == 429 or error.status_code >= 500
+    )
+    raise JiraTicketError(f"Jira lookup failed: {error}", retryable=retryable) from error
+
+def _lookup_not_found(message, raise_errors):
+    """
+    Logs a lookup that found nothing and returns None, or raises it as a non-retryable JiraTicketError.
+    """
+    logger.error(message)
+    if raise_errors:
+        raise JiraTicketError(message)
     return None
 
-def create_jira_ticket(summary, description, reporter_email, project_key, request_type_name):
+def invalidate_metadata(reporter_email=None, project_key=None, service_desk_id=None, request_type_name=None):
+    """
+    Drops cached lookups that may be stale, e.g. after Jira rejected a request built from them.
+    """
+    if reporter_email is not None:
+        account_id_cache.invalidate(reporter_email)
+        for listener in account_id_invalidation_listeners:
+            listener(reporter_email)
+    if project_key is not None:
+        service_desk_cache.invalidate(project_key)
+    if service_desk_id is not None and request_type_name is not None:
+        request_type_cache.invalidate((service_desk_id, request_type_name))
+
+def resolve_request_ids(reporter_email, project_key, request_type_name, account_id=None, raise_errors=False):
+    """
+    Resolves the account, service desk and request type IDs needed to create a customer request.
+    A known account_id (e.g. from the user directory) skips the user search.
+    Returns a RequestIds tuple, or None if any lookup fails; with raise_errors set, failures
+    raise JiraTicketError telling whether the lookup is worth retrying.
+    """
+    if account_id:
+        account_id_cache.set(reporter_email, account_id)
+    from_cache = _cached_ids(reporter_email, project_key)
+
+    # Step 1: Get Account ID for the Reporter
+    account_id = get_account_id(reporter_email, raise_errors)
+    if not account_id:
+        return _lookup_not_found(f"Unable to fetch accountId for email: {reporter_email}", raise_errors)
+
+    # Step 2: Get Service Desk ID by Project Key
+    service_desk_id = get_service_desk_id_by_project_key(project_key, raise_errors)
+    if not service_desk_id:
+        return _lookup_not_found(f"Unable to fetch service desk ID for project key: {project_key}", raise_errors)
+
+    # Step 3: Get Request Type ID
+    if (service_desk_id, request_type_name) in request_type_cache:
+        from_cache += ("request_type_id",)
+    request_type_id = get_request_type_id(service_desk_id, request_type_name, raise_errors)
+    if not request_type_id:
+        return _lookup_not_found(f"Unable to fetch request type ID for: {request_type_name}", raise_errors)
+
+    return RequestIds(account_id, service_desk_id, request_type_id, from_cache)
+
+def _cached_ids(reporter_email, project_key):
+    """
+    Returns the names of the account and service desk IDs that a lookup would take from the caches.
+    """
+    cached = ()
+    if reporter_email in account_id_cache:
+        cached += ("account_id",)
+    if project_key in service_desk_cache:
+        cached += ("service_desk_id",)
+    return cached
+
+def _invalidate_cached_ids(request_ids, reporter_email, project_key, request_type_name):
+    """
+    Drops the cached lookups a rejected request was built from, so the retry fetches them again.
+    """
+    cached = request_ids.from_cache
+    invalidate_metadata(
+        reporter_email=reporter_email if "account_id" in cached else None,
+        project_key=project_key if "service_desk_id" in cached else None,
+        service_desk_id=request_ids.service_desk_id if "request_type_id" in cached else None,
+        request_type_name=request_type_name,
+    )
+
+CREATE_REQUEST_HEADERS = {"Accept": "application/json", "Content-Type": "application/json"}
+
+def _customer_request_payload(request_ids, summary, description):
+    return json.dumps({
+        "serviceDeskId": request_ids.service_desk_id,
+        "requestTypeId": request_ids.request_type_id,
+        "requestFieldValues": {"summary": summary, "description": description},
+        "raiseOnBehalfOf": request_ids.account_id,
+    })
+
+def _ticket_url(issue_key):
+    # Construct the support portal URL with the issue key
+    # Assuming the portal can display the ticket based on the issue key appended
+    return f"https://catawiki.atlassian.net/servicedesk/customer/portal/21/{issue_key}"
+
+def create_jira_ticket(summary, description, reporter_email, project_key, request_type_name, request_ids=None,
+                       raise_errors=False):
     """
     Creates a Jira Service Desk customer request with the given details.
     Returns the issue key and a constructed URL to the support portal.
+    request_ids may be pre-resolved with resolve_request_ids() so the lookups can overlap
+    with other work. If Jira rejects a request built from any cached ID, those cache entries
+    are invalidated and the request is retried once with fresh lookups.
+    Failures return (None, None), or raise JiraTicketError when raise_errors is set.
     """
     try:
-        # Step 1: Get Account ID for the Reporter
-        account_id = get_account_id(reporter_email)
-        if not account_id:
-            logger.error(f"Unable to fetch accountId for email: {reporter_email}")
-            return None, None
+        for attempt in range(2):
+            if request_ids is None:
+                request_ids = resolve_request_ids(
+                    reporter_email, project_key, request_type_name, raise_errors=raise_errors
+                )
+                if request_ids is None:
+                    return None, None
 
-        # Step 2: Get Service Desk ID by Project Key
-        service_desk_id = get_service_desk_id_by_project_key(project_key)
-        if not service_desk_id:
-            logger.error(f"Unable to fetch service desk ID for project key: {project_key}")
-            return None, None
+            # Step 4: Create the Customer Request
+            response = jira_request(
+                "POST",
+                "/rest/servicedeskapi/request",
+                idempotent=False,
+                headers=CREATE_REQUEST_HEADERS,
+                data=_customer_request_payload(request_ids, summary, description),
+            )
+            if response.status_code == 201:
+                logger.info("Customer request created successfully.")
+                request = response.json()
+                logger.debug(f"Jira Response: {json.dumps(request, indent=2)}")  # Detailed response
 
-        # Step 3: Get Request Type ID
-        request_type_id = get_request_type_id(service_desk_id, request_type_name)
-        if not request_type_id:
-            logger.error(f"Unable to fetch request type ID for: {request_type_name}")
+                # Correct retrieval of issue key
+                issue_key = request.get("issueKey") or request.get("key")
+                if not issue_key:
+                    logger.error("Issue key not found in Jira response.")
+                    if raise_errors:
+                        raise JiraTicketError("Issue key not found in Jira response")
+                    return None, None
+
+                return issue_key, _ticket_url(issue_key)
+
+            logger.error(f"Failed to create customer request. Status Code: {response.status_code}")
+            logger.error(response.text)
+
+            # A 400/404 built from any cached ID may mean that ID is stale
+            if response.status_code in (400, 404) and request_ids.from_cache and attempt == 0:
+                logger.info("Invalidating cached Jira metadata and retrying with fresh lookups.")
+                _invalidate_cached_ids(request_ids, reporter_email, project_key, request_type_name)
+                request_ids = None
+                continue
+            if raise_errors:
+                raise JiraTicketError(
+                    f"Jira returned {response.status_code}",
+                    retryable=response.status_code in TICKET_RETRY_STATUS_CODES,
+                )
             return None, None
 
-        # Step 4: Create the Customer Request
-        url = f"{JIRA_DOMAIN}/rest/servicedeskapi/request"
-        auth = HTTPBasicAuth(EMAIL, API_TOKEN)
-        headers = {"Accept": "application/json", "Content-Type": "application/json"}
-        payload = {
-            "serviceDeskId": service_desk_id,
-            "requestTypeId": request_type_id,
-            "requestFieldValues": {"summary": summary, "description": description},
-            "raiseOnBehalfOf": account_id,
-        }
-
-        response = requests.post(url, headers=headers, auth=auth, data=json.dumps(payload), timeout=10)
-        if response.status_code == 201:
-            logger.info("Customer request created successfully.")
-            request = response.json()
-            logger.debug(f"Jira Response: {json.dumps(request, indent=2)}")  # Detailed response
-
-            # Correct retrieval of issue key
-            issue_key = request.get("issueKey") or request.get("key")
-            if not issue_key:
-                logger.error("Issue key not found in Jira response.")
-                return None, None
-
-            # Construct the support portal URL with the issue key
-            # Assuming the portal can display the ticket based on the issue key appended
-            ticket_url = f"https://catawiki.atlassian.net/servicedesk/customer/portal/21/{issue_key}"
-
-            return issue_key, ticket_url
+    except JiraTicketError:
+        raise
+    except Exception as e:
+        logger.error(f"Error creating Jira ticket: {e}")
+        if raise_errors:
+            retryable = isinstance(e, requests.ConnectionError) and _failed_to_connect(e)
+            raise JiraTicketError(str(e), retryable=retryable) from e
+        return None, None
+
+
+# Async client for the asyncio server mode (async_main.py): one aiohttp session whose connector
+# keeps connections to Jira alive, with the same retry policy and caches as the sync client.
+_async_session = None
+
+
+class AsyncJiraResponse:
+    """
+    The parts of a requests.Response the parsers above use, read from an aiohttp response.
+    """
+
+    def __init__(self, status_code, text, headers):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def get_async_session():
+    """
+    Returns the shared aiohttp session, creating it on the running event loop on first use.
+    """
+    global _async_session
+    if _async_session is None or _async_session.closed:
+        import aiohttp
+        _async_session = aiohttp.ClientSession(
+            auth=aiohttp.BasicAuth(EMAIL or "", API_TOKEN or ""),
+            connector=aiohttp.TCPConnector(limit=JIRA_POOL_MAXSIZE),
+            timeout=aiohttp.ClientTimeout(sock_connect=JIRA_CONNECT_TIMEOUT, sock_read=JIRA_READ_TIMEOUT),
+        )
+    return _async_session
+
+async def close_async_session():
+    global _async_session
+    if _async_session is not None:
+        await _async_session.close()
+        _async_session = None
+
+async def async_jira_request(method, path, idempotent=True, **kwargs):
+    """
+    jira_request() over the shared aiohttp session; returns an AsyncJiraResponse.
+    """
+    import aiohttp
+    url = f"{JIRA_DOMAIN}{path}"
+    for attempt in range(JIRA_MAX_RETRIES + 1):
+        last_attempt = attempt == JIRA_MAX_RETRIES
+        start = time.monotonic()
+        try:
+            with metrics.span("jira_request", method=method):
+                async with get_async_session().request(method, url, **kwargs) as raw:
+                    response = AsyncJiraResponse(raw.status, await raw.text(), raw.headers)
+        except (aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError) as e:
+            # The request never reached Jira (refused, DNS, or sock_connect timed out), so even
+            # ticket creation can be retried
+            _record(time.monotonic() - start, error=True)
+            if last_attempt:
+                raise
+            delay = _retry_delay(attempt)
+            logger.warning(f"Jira {method} {path} failed ({e}), retrying in {delay:.2f}s")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            _record(time.monotonic() - start, error=True)
+            if last_attempt or not idempotent:
+                raise
+            delay = _retry_delay(attempt)
+            logger.warning(f"Jira {method} {path} failed ({e!r}), retrying in {delay:.2f}s")
         else:
+            _record(time.monotonic() - start)
+            if response.status_code >= 400:
+                metrics.increment("jira_request_errors_total", method=method, status=response.status_code)
+            retryable = response.status_code == 429 or (
+                idempotent and response.status_code in RETRY_STATUS_CODES
+            )
+            if not retryable or last_attempt:
+                return response
+            delay = _retry_delay(attempt, response)
+            logger.warning(
+                f"Jira {method} {path} returned {response.status_code}, retrying in {delay:.2f}s"
+            )
+        _record(retry=True)
+        await asyncio.sleep(delay)
+
+async def _cached_lookup_async(cache, key, fetch):
+    try:
+        return await cache.get_or_load_async(key, fetch)
+    except Exception as e:
+        logger.error(f"Jira lookup failed: {e}")
+        return None
+
+async def resolve_request_ids_async(reporter_email, project_key, request_type_name, account_id=None):
+    """
+    resolve_request_ids() without blocking the event loop.
+    """
+    if account_id:
+        account_id_cache.set(reporter_email, account_id)
+    from_cache = _cached_ids(reporter_email, project_key)
+    headers = {"Accept": "application/json"}
+
+    async def fetch_account_id():
+        response = await async_jira_request(
+            "GET", "/rest/api/3/user/search", headers=headers, params={"query": reporter_email}
+        )
+        return _parse_account_id(response, reporter_email)
+
+    account_id = await _cached_lookup_async(account_id_cache, reporter_email, fetch_account_id)
+    if not account_id:
+        logger.error(f"Unable to fetch accountId for email: {reporter_email}")
+        return None
+
+    async def fetch_service_desk_id():
+        response = await async_jira_request("GET", "/rest/servicedeskapi/servicedesk", headers=headers)
+        return _parse_service_desk_id(response, project_key)
+
+    service_desk_id = await _cached_lookup_async(service_desk_cache, project_key, fetch_service_desk_id)
+    if not service_desk_id:
+        logger.error(f"Unable to fetch service desk ID for project key: {project_key}")
+        return None
+
+    async def fetch_request_type_id():
+        path = f"/rest/servicedeskapi/servicedesk/{service_desk_id}/requesttype"
+        return _parse_request_type_id(await async_jira_request("GET", path, headers=headers), request_type_name)
+
+    if (service_desk_id, request_type_name) in request_type_cache:
+        from_cache += ("request_type_id",)
+    request_type_id = await _cached_lookup_async(
+        request_type_cache, (service_desk_id, request_type_name), fetch_request_type_id
+    )
+    if not request_type_id:
+        logger.error(f"Unable to fetch request type ID for: {request_type_name}")
+        return None
+
+    return RequestIds(account_id, service_desk_id, request_type_id, from_cache)
+
+async def create_jira_ticket_async(summary, description, reporter_email, project_key, request_type_name,
+                                   request_ids=None):
+    """
+    create_jira_ticket() without blocking the event loop. Returns (issue_key, ticket_url),
+    or (None, None) on failure.
+    """
+    try:
+        for attempt in range(2):
+            if request_ids is None:
+                request_ids = await resolve_request_ids_async(reporter_email, project_key, request_type_name)
+                if request_ids is None:
+                    return None, None
+
+            response = await async_jira_request(
+                "POST",
+                "/rest/servicedeskapi/request",
+                idempotent=False,
+                headers=CREATE_REQUEST_HEADERS,
+                data=_customer_request_payload(request_ids, summary, description),
+            )
+            if response.status_code == 201:
+                logger.info("Customer request created successfully.")
+                request = response.json()
+                issue_key = request.get("issueKey") or request.get("key")
+                if not issue_key:
+                    logger.error("Issue key not found in Jira response.")
+                    return None, None
+                return issue_key, _ticket_url(issue_key)
+
             logger.error(f"Failed to create customer request. Status Code: {response.status_code}")
             logger.error(response.text)
+            if response.status_code in (400, 404) and request_ids.from_cache and attempt == 0:
+                logger.info("Invalidating cached Jira metadata and retrying with fresh lookups.")
+                _invalidate_cached_ids(request_ids, reporter_email, project_key, request_type_name)
+                request_ids = None
+                continue
             return None, None
 
     except Exception as e:
-        logger.error(f"Error creating Jira ticket: {e}")
+        logger.error(f"Error creating Jira ticket: {e!r}")
         return None, None
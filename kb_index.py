@@ -0,0 +1,417 @@
+"""
+Local BM25 retrieval index over exported IT knowledge-base pages (Markdown/HTML).
+
+The index is built offline and stored as flat NumPy arrays plus one UTF-8 text blob,
+all opened with memory mapping so a cold start reads only the pages a query touches.
+Rebuilding an existing index only re-reads sources whose size or mtime changed.
+
+    python kb_index.py build <source_dir> <index_dir>
+    python kb_index.py query <index_dir> "vpn not connecting"
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import sys
+import time
+from collections import Counter, namedtuple
+from html.parser import HTMLParser
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT = 1
+BM25_K1 = 1.5
+BM25_B = 0.75
+PASSAGE_WORDS = 120
+SOURCE_EXTENSIONS = {".md", ".markdown", ".html", ".htm", ".txt"}
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in is it its me my "
+    "not of on or our so that the then there this to was we what when where which who why "
+    "will with you your".split()
+)
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_HEADING_RE = re.compile(r"^#{1,6}\s+(.*)$")
+
+# text: passage text, source: path relative to the source directory, title: page title
+# score: BM25 score, confidence: score relative to the best achievable for the query (0-1)
+Passage = namedtuple("Passage", ["text", "source", "title", "score", "confidence"])
+
+
+def tokenize(text):
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def term_hash(term):
+    """
+    64-bit term identifier; the index stores sorted hashes instead of a vocabulary table.
+    """
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """
+    Extracts readable text from an exported HTML page, keeping headings as Markdown headings.
+    """
+
+    BLOCK_TAGS = {"p", "div", "li", "tr", "br", "pre", "table", "ul", "ol", "section"}
+    HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+    SKIP_TAGS = {"script", "style", "head"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.title = None
+        self._skip = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        elif tag in self.SKIP_TAGS:
+            self._skip += 1
+        elif tag in self.HEADING_TAGS:
+            self.parts.append("\n\n" + "#" * int(tag[1]) + " ")
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag in self.SKIP_TAGS:
+            self._skip = max(self._skip - 1, 0)
+        elif tag in self.HEADING_TAGS or tag in self.BLOCK_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title = (self.title or "") + data.strip()
+        elif not self._skip:
+            self.parts.append(data)
+
+
+def read_document(path):
+    """
+    Returns (title, text) for a Markdown, HTML or plain-text page.
+    """
+    with open(path, encoding="utf-8", errors="replace") as f:
+        raw = f.read()
+    title = None
+    if os.path.splitext(path)[1].lower() in (".html", ".htm"):
+        extractor = _HTMLTextExtractor()
+        extractor.feed(raw)
+        title = extractor.title
+        raw = "".join(extractor.parts)
+    text = "\n".join(line.rstrip() for line in raw.splitlines())
+    if not title:
+        for line in text.splitlines():
+            match = _HEADING_RE.match(line)
+            if match:
+                title = match.group(1).strip()
+                break
+    return title or os.path.splitext(os.path.basename(path))[0], text
+
+
+def split_passages(text, max_words=PASSAGE_WORDS):
+    """
+    Splits a page into passages of roughly max_words words. Each passage stays within one
+    section and starts with that section's heading, so it reads well as a standalone answer.
+    """
+    passages = []
+    heading = None
+    chunk = []
+    chunk_words = 0
+
+    def flush():
+        nonlocal chunk, chunk_words
+        if chunk:
+            body = "\n\n".join(chunk)
+            passages.append(f"{heading}\n\n{body}" if heading else body)
+        chunk, chunk_words = [], 0
+
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        match = _HEADING_RE.match(paragraph)
+        if match and "\n" not in paragraph:
+            flush()
+            heading = match.group(1).strip()
+            continue
+        words = paragraph.split()
+        if len(words) > max_words:
+            # Very long paragraphs are cut into max_words windows
+            flush()
+            while len(words) > max_words:
+                chunk, chunk_words = [" ".join(words[:max_words])], max_words
+                flush()
+                words = words[max_words:]
+            paragraph = " ".join(words)
+        if not words:
+            continue
+        if chunk_words + len(words) > max_words:
+            flush()
+        chunk.append(paragraph)
+        chunk_words += len(words)
+    flush()
+    return passages
+
+
+def _iter_sources(source_dir):
+    for root, dirs, files in os.walk(source_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in SOURCE_EXTENSIONS:
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, source_dir), path
+
+
+def build_index(source_dir, index_dir):
+    """
+    Builds (or incrementally rebuilds) the index for every page under source_dir.
+    Sources whose size and mtime are unchanged reuse their passages from the existing index;
+    BM25 statistics are always recomputed for the whole corpus.
+    Returns a dict of build statistics.
+    """
+    start = time.monotonic()
+    previous = None
+    if os.path.exists(os.path.join(index_dir, "meta.json")):
+        try:
+            previous = KBIndex(index_dir)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable index at {index_dir}: {e}")
+
+    sources = []
+    passages = []
+    passage_source = []
+    reused = parsed = 0
+    for relpath, path in _iter_sources(source_dir):
+        stat = os.stat(path)
+        entry = {"path": relpath, "size": stat.st_size, "mtime": stat.st_mtime}
+        old = previous.find_source(relpath) if previous is not None else None
+        if old is not None and old[1]["size"] == entry["size"] and old[1]["mtime"] == entry["mtime"]:
+            index, old_entry = old
+            entry["title"] = old_entry["title"]
+            texts = [previous.passage_text(i) for i in previous.passages_for_source(index)]
+            reused += 1
+        else:
+            entry["title"], text = read_document(path)
+            texts = split_passages(text)
+            parsed += 1
+        passage_source.extend([len(sources)] * len(texts))
+        passages.extend(texts)
+        sources.append(entry)
+    if previous is not None:
+        previous.close()
+
+    # Term frequencies per passage -> postings per term
+    postings = {}
+    lengths = np.zeros(len(passages), dtype=np.float32)
+    for passage_id, text in enumerate(passages):
+        counts = Counter(tokenize(text))
+        lengths[passage_id] = sum(counts.values())
+        for term, tf in counts.items():
+            postings.setdefault(term_hash(term), []).append((passage_id, tf))
+
+    num_passages = len(passages)
+    avg_length = float(lengths.mean()) if num_passages else 0.0
+    terms = np.array(sorted(postings), dtype=np.uint64)
+    term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    total = sum(len(entries) for entries in postings.values())
+    posting_ids = np.empty(total, dtype=np.int32)
+    weights = np.empty(total, dtype=np.float32)
+    max_weights = np.empty(len(terms), dtype=np.float32)
+    position = 0
+    for i, term in enumerate(terms.tolist()):
+        entries = postings[term]
+        ids = np.array([passage_id for passage_id, _ in entries], dtype=np.int32)
+        tf = np.array([tf for _, tf in entries], dtype=np.float32)
+        df = len(entries)
+        idf = np.log(1 + (num_passages - df + 0.5) / (df + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[ids] / (avg_length or 1.0))
+        # Store the full BM25 term weight per posting, so a query is just a sum
+        term_weights = idf * tf * (BM25_K1 + 1) / (tf + norm)
+        posting_ids[position:position + df] = ids
+        weights[position:position + df] = term_weights
+        max_weights[i] = term_weights.max()
+        position += df
+        term_offsets[i + 1] = position
+
+    blob = bytearray()
+    passage_offsets = np.zeros(num_passages + 1, dtype=np.int64)
+    for i, text in enumerate(passages):
+        blob.extend(text.encode("utf-8"))
+        passage_offsets[i + 1] = len(blob)
+
+    # Write into a sibling directory and swap it in, so readers never see a partial index
+    tmp_dir = f"{index_dir.rstrip(os.sep)}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, "terms.npy"), terms)
+    np.save(os.path.join(tmp_dir, "term_offsets.npy"), term_offsets)
+    np.save(os.path.join(tmp_dir, "postings.npy"), posting_ids)
+    np.save(os.path.join(tmp_dir, "weights.npy"), weights)
+    np.save(os.path.join(tmp_dir, "max_weights.npy"), max_weights)
+    np.save(os.path.join(tmp_dir, "passage_offsets.npy"), passage_offsets)
+    np.save(os.path.join(tmp_dir, "passage_source.npy"), np.array(passage_source, dtype=np.int32))
+    with open(os.path.join(tmp_dir, "passages.bin"), "wb") as f:
+        f.write(blob)
+    with open(os.path.join(tmp_dir, "sources.json"), "w") as f:
+        json.dump(sources, f)
+    digest = hashlib.sha256(bytes(blob) + terms.tobytes()).hexdigest()[:16]
+    meta = {
+        "format": INDEX_FORMAT,
+        "version": digest,
+        "built_at": time.time(),
+        "passages": num_passages,
+        "terms": len(terms),
+        "sources": len(sources),
+        "k1": BM25_K1,
+        "b": BM25_B,
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    old_dir = f"{index_dir.rstrip(os.sep)}.old-{os.getpid()}"
+    if os.path.exists(index_dir):
+        os.rename(index_dir, old_dir)
+    os.rename(tmp_dir, index_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    stats = dict(meta)
+    stats.update(
+        reused_sources=reused,
+        parsed_sources=parsed,
+        size_bytes=index_size(index_dir),
+        build_time=time.monotonic() - start,
+    )
+    logger.info(f"Built KB index at {index_dir}: {stats}")
+    return stats
+
+
+def index_size(index_dir):
+    return sum(
+        os.path.getsize(os.path.join(index_dir, name)) for name in os.listdir(index_dir)
+    )
+
+
+class KBIndex:
+    """
+    Read-only view of a built index. Arrays and passage text are memory-mapped.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != INDEX_FORMAT:
+            raise ValueError(f"Unsupported KB index format: {self.meta.get('format')}")
+        with open(os.path.join(index_dir, "sources.json")) as f:
+            self.sources = json.load(f)
+        self._source_positions = {entry["path"]: i for i, entry in enumerate(self.sources)}
+
+        def load(name):
+            return np.load(os.path.join(index_dir, name), mmap_mode="r")
+
+        self.terms = load("terms.npy")
+        self.term_offsets = load("term_offsets.npy")
+        self.postings = load("postings.npy")
+        self.weights = load("weights.npy")
+        self.max_weights = load("max_weights.npy")
+        self.passage_offsets = load("passage_offsets.npy")
+        self.passage_source = load("passage_source.npy")
+        self._blob_file = open(os.path.join(index_dir, "passages.bin"), "rb")
+        size = os.fstat(self._blob_file.fileno()).st_size
+        self._blob = mmap.mmap(self._blob_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    @property
+    def version(self):
+        return self.meta["version"]
+
+    @property
+    def num_passages(self):
+        return len(self.passage_offsets) - 1
+
+    def close(self):
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._blob_file.close()
+
+    def passage_text(self, passage_id):
+        start, end = self.passage_offsets[passage_id], self.passage_offsets[passage_id + 1]
+        return self._blob[int(start):int(end)].decode("utf-8")
+
+    def find_source(self, relpath):
+        index = self._source_positions.get(relpath)
+        return None if index is None else (index, self.sources[index])
+
+    def passages_for_source(self, source_index):
+        return np.nonzero(self.passage_source == source_index)[0].tolist()
+
+    def search(self, query, k=3):
+        """
+        Returns up to k Passages ranked by BM25 score.
+        """
+        unique_terms = list(dict.fromkeys(tokenize(query)))
+        if not unique_terms or not self.num_passages or not len(self.terms):
+            return []
+        hashes = np.array([term_hash(term) for term in unique_terms], dtype=np.uint64)
+        positions = np.searchsorted(self.terms, hashes)
+        found = positions < len(self.terms)
+        found[found] = self.terms[positions[found]] == hashes[found]
+
+        scores = np.zeros(self.num_passages, dtype=np.float32)
+        best_possible = 0.0
+        for position in positions[found].tolist():
+            start, end = self.term_offsets[position], self.term_offsets[position + 1]
+            # A passage appears at most once per term, so fancy-index addition is safe
+            scores[self.postings[start:end]] += self.weights[start:end]
+            best_possible += float(self.max_weights[position])
+        if best_possible == 0.0:
+            return []
+
+        k = min(k, self.num_passages)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        coverage = found.sum() / len(unique_terms)
+        results = []
+        for passage_id in top.tolist():
+            score = float(scores[passage_id])
+            if score <= 0:
+                break
+            source = self.sources[int(self.passage_source[passage_id])]
+            results.append(
+                Passage(
+                    text=self.passage_text(passage_id),
+                    source=source["path"],
+                    title=source["title"],
+                    score=score,
+                    confidence=min(score / best_possible, 1.0) * coverage,
+                )
+            )
+        return results
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO)
+    if len(argv) == 3 and argv[0] == "build":
+        stats = build_index(argv[1], argv[2])
+        print(json.dumps(stats, indent=2))
+    elif len(argv) >= 3 and argv[0] == "query":
+        index = KBIndex(argv[1])
+        for passage in index.search(" ".join(argv[2:])):
+            print(f"[{passage.score:.2f} | {passage.confidence:.2f}] {passage.title} ({passage.source})")
+            print(passage.text[:300])
+            print()
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,9 +1,15 @@
+import atexit
 import logging
 import json
+import os
+import metrics
 from flask import Request
 from slack_bolt.adapter.google_cloud_functions import SlackRequestHandler
-from slack_controller import handle_message_events, handle_feedback_actions
+from slack_controller import handle_message_events, handle_feedback_actions, is_ignorable_event
 from utils import verify_slack_request
+from dedup import create_deduplicator, event_dedup_keys
+from capture import TrafficRecorder
+from warmup import WARMUP_CLIENTS, warm_up_clients
 from config import app
 
 # Initialize logging
@@ -17,19 +23,73 @@ handle_feedback_actions(app)
 # Google Cloud Function entry point
 slack_handler = SlackRequestHandler(app)
 
+# Event deduplication (DEDUP_TTL, DEDUP_DB_PATH; see dedup.py). Keys are recorded before
+# processing and forgotten only if this request fails. With deferred processing the event is
+# acked before its task runs, so Slack never redelivers it and a failed or shed task is not
+# retried: handling is at-most-once (see README).
+deduplicator = create_deduplicator()
+metrics.register_collector("dedup", deduplicator.stats)
+
+# Clients warmed in the background at cold start (WARMUP_CLIENTS; see warmup.py)
+if WARMUP_CLIENTS:
+    warm_up_clients(WARMUP_CLIENTS)
+
+# Traffic capture for load testing: CAPTURE_PATH appends a PII-scrubbed copy of every verified
+# request to a JSON Lines file that benchmarks/replay.py can replay. CAPTURE_SALT keeps the
+# pseudonyms stable across instances; CAPTURE_SAMPLE_RATE records a fraction of requests.
+CAPTURE_PATH = os.environ.get("CAPTURE_PATH")
+CAPTURE_SAMPLE_RATE = float(os.environ.get("CAPTURE_SAMPLE_RATE", 1.0))
+traffic_recorder = None
+if CAPTURE_PATH:
+    traffic_recorder = TrafficRecorder(
+        CAPTURE_PATH, salt=os.environ.get("CAPTURE_SALT"), sample_rate=CAPTURE_SAMPLE_RATE
+    )
+    metrics.register_collector("traffic_recorder", traffic_recorder.stats)
+    atexit.register(traffic_recorder.flush)
+
+# Structured metrics logs, e.g. METRICS_ENABLED=true METRICS_LOG_INTERVAL=60. This is the
+# supported export on Cloud Functions: each instance keeps its own registry, so a separate
+# /metrics function would never see this traffic. Prometheus scraping is served by the
+# long-running runners (socket_main.py, async_main.py).
+if metrics.registry.enabled and metrics.METRICS_LOG_INTERVAL > 0:
+    metrics.registry.start_log_exporter(metrics.METRICS_LOG_INTERVAL)
+
+def parse_json_body(request, raw_body):
+    """
+    Parses a JSON request body once; returns None for form-encoded (interaction) requests.
+    """
+    if request.mimetype != "application/json":
+        return None
+    try:
+        return json.loads(raw_body)
+    except ValueError:
+        return None
+
 def slackbot(request):
+    dedup_keys = []
     try:
+        # Read the raw body once; it is reused for the signature check and JSON parsing
+        raw_body = request.get_data()
+
         # Verify Slack request
-        if not verify_slack_request(request):
+        if not verify_slack_request(request, raw_body):
             return {"statusCode": 403, "body": "Invalid request"}
 
-        # Check for retry headers
-        retry_num = request.headers.get("X-Slack-Retry-Num")
-        if retry_num and int(retry_num) > 0:
-            logger.info(f"Ignoring Slack retry: X-Slack-Retry-Num={retry_num}")
-            return {"statusCode": 200, "body": "Ignoring retry"}
+        if traffic_recorder is not None:
+            traffic_recorder.record(raw_body, request.mimetype, request.headers.get("X-Slack-Retry-Num"))
+
+        request_json = parse_json_body(request, raw_body)
+
+        # Ack events the bot ignores (thread replies, bot messages, joins...) without Bolt
+        if is_ignorable_event(request_json):
+            return {"statusCode": 200, "body": "Ignored"}
 
-        request_json = request.get_json(silent=True)
+        # Drop events already handled; retries of events whose first delivery failed still run
+        dedup_keys = event_dedup_keys(request_json)
+        if not deduplicator.is_new(dedup_keys):
+            retry_num = request.headers.get("X-Slack-Retry-Num")
+            logger.info(f"Ignoring duplicate event {dedup_keys} (X-Slack-Retry-Num={retry_num})")
+            return {"statusCode": 200, "body": "Duplicate event"}
 
         # Handle Slack URL verification challenge
         if (
@@ -41,13 +101,17 @@ def slackbot(request):
             return {"statusCode": 200, "body": challenge}
 
         # Process Slack interactions
-        if "payload" in request.form:
+        if logger.isEnabledFor(logging.DEBUG) and "payload" in request.form:
             payload = json.loads(request.form["payload"])
-            logger.info(f"Interaction payload received: {payload}")
+            logger.debug(f"Interaction payload received: {payload}")
 
         # Process Slack events
-        return slack_handler.handle(request)
+        response = slack_handler.handle(request)
+        if response.status_code >= 500:
+            deduplicator.forget(dedup_keys)
+        return response
     except Exception as e:
         logger.error(f"Error handling request: {e}")
+        deduplicator.forget(dedup_keys)
         return {"statusCode": 500, "body": "Internal server error"}
 
@@ -0,0 +1,232 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# Metrics are off unless METRICS_ENABLED is set; disabled spans and counters return immediately.
+# METRICS_LOG_INTERVAL > 0 also logs a JSON snapshot every that many seconds.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+METRICS_LOG_INTERVAL = float(os.environ.get("METRICS_LOG_INTERVAL", 0))
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0,
+)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram; quantiles are interpolated within buckets, so memory stays
+    constant however many samples are observed.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """
+    Counters and latency histograms keyed by name and labels, plus collectors that report
+    the stats() of existing components (caches, queues, clients) as gauges.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = {}
+
+    def increment(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def span(self, name, **labels):
+        """
+        Times the block into the <name>_seconds histogram and counts exceptions in <name>_errors_total.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, labels)
+
+    @contextmanager
+    def _span(self, name, labels):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.increment(f"{name}_errors_total", error=type(e).__name__, **labels)
+            raise
+        finally:
+            self.observe(f"{name}_seconds", time.perf_counter() - start, **labels)
+
+    def timed(self, name, **labels):
+        """
+        Decorator form of span().
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self._span(name, labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def register_collector(self, name, collect):
+        """
+        Registers a callable returning a dict of numbers, exported as <name>_<key> gauges.
+        """
+        with self._lock:
+            self._collectors[name] = collect
+
+    def _collect_gauges(self):
+        with self._lock:
+            collectors = list(self._collectors.items())
+        gauges = {}
+        for name, collect in collectors:
+            try:
+                stats = collect()
+            except Exception as e:
+                logger.error(f"Error collecting metrics from '{name}': {e}")
+                continue
+            if not stats:
+                continue
+            for key, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    gauges[f"{name}_{key}"] = value
+        return gauges
+
+    def snapshot(self):
+        """
+        Returns counters, histogram summaries (count, sum, p50/p95/p99) and gauges as plain data.
+        """
+        with self._lock:
+            counters = {_series(name, labels): value for (name, labels), value in self._counters.items()}
+            histograms = {
+                _series(name, labels): {
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "p50": histogram.quantile(0.5),
+                    "p95": histogram.quantile(0.95),
+                    "p99": histogram.quantile(0.99),
+                }
+                for (name, labels), histogram in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms, "gauges": self._collect_gauges()}
+
+    def render_prometheus(self):
+        """
+        Renders all metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = [
+                (key, list(h.buckets), list(h.counts), h.count, h.sum)
+                for key, h in sorted(self._histograms.items(), key=lambda item: item[0])
+            ]
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{_series(name, labels)} {value}")
+        for (name, labels), buckets, counts, count, total in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{_series(name + '_bucket', labels + (('le', repr(bound)),))} {cumulative}")
+            lines.append(f"{_series(name + '_bucket', labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{_series(name + '_sum', labels)} {total}")
+            lines.append(f"{_series(name + '_count', labels)} {count}")
+        for name, value in sorted(self._collect_gauges().items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def log_snapshot(self):
+        logger.info(json.dumps({"metrics": self.snapshot()}, sort_keys=True))
+
+    def start_log_exporter(self, interval):
+        """
+        Logs a JSON snapshot every interval seconds from a daemon thread.
+        """
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.log_snapshot()
+                except Exception as e:
+                    logger.error(f"Error logging metrics: {e}")
+
+        thread = threading.Thread(target=run, name="metrics-log-exporter", daemon=True)
+        thread.start()
+        return thread
+
+
+_NULL_SPAN = nullcontext()
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+    rendered = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return f"{name}{{{rendered}}}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry(enabled=METRICS_ENABLED)
+increment = registry.increment
+observe = registry.observe
+span = registry.span
+timed = registry.timed
+register_collector = registry.register_collector
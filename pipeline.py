@@ -0,0 +1,138 @@
+import asyncio
+import inspect
+import logging
+import time
+import metrics
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, wait
+
+logger = logging.getLogger(__name__)
+
+# name: unique stage name, also the keyword its result is passed as to dependent stages
+# func: callable receiving the results of its deps as keyword arguments
+# deps: names of the stages that must finish first
+# timeout: seconds the stage may run before its fallback is used (None for no limit)
+# fallback: value used as the stage result when it fails or times out
+Stage = namedtuple("Stage", ["name", "func", "deps", "timeout", "fallback"])
+Stage.__new__.__defaults__ = ((), None, None)
+
+
+def _run_stage(stage, kwargs):
+    with metrics.span("pipeline_stage", stage=stage.name):
+        return stage.func(**kwargs)
+
+
+async def _run_stage_async(stage, kwargs):
+    with metrics.span("pipeline_stage", stage=stage.name):
+        result = stage.func(**kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+
+def _ready_stages(pending, results):
+    """
+    Removes and yields (stage, kwargs) for every pending stage whose dependencies have results.
+    """
+    for name, stage in list(pending.items()):
+        if all(dep in results for dep in stage.deps):
+            del pending[name]
+            yield stage, {dep: results[dep] for dep in stage.deps}
+
+
+def _expires_at(stage, end):
+    expires_at = time.monotonic() + stage.timeout if stage.timeout is not None else None
+    if end is not None:
+        expires_at = end if expires_at is None else min(expires_at, end)
+    return expires_at
+
+
+def _wait_timeout(running):
+    expiries = [expires_at for _, expires_at in running.values() if expires_at is not None]
+    return max(min(expiries) - time.monotonic(), 0) if expiries else None
+
+
+def _collect(done, running, results, errors):
+    """
+    Records the results of finished stages, using the fallback for those that raised.
+    """
+    for future in done:
+        stage, _ = running.pop(future)
+        try:
+            results[stage.name] = future.result()
+        except Exception as e:
+            logger.error(f"Pipeline stage '{stage.name}' failed: {e}")
+            errors[stage.name] = e
+            results[stage.name] = stage.fallback
+
+
+def _expire(running, results, errors):
+    """
+    Cancels stages past their timeout and uses their fallback.
+    """
+    now = time.monotonic()
+    for future, (stage, expires_at) in list(running.items()):
+        if expires_at is not None and expires_at <= now:
+            del running[future]
+            future.cancel()
+            logger.warning(f"Pipeline stage '{stage.name}' timed out, using fallback.")
+            metrics.increment("pipeline_stage_timeouts_total", stage=stage.name)
+            errors[stage.name] = TimeoutError(f"Stage '{stage.name}' timed out")
+            results[stage.name] = stage.fallback
+
+
+def run_pipeline(stages, executor, deadline=None):
+    """
+    Runs the stages as a dependency graph on the given executor.
+    Each stage starts as soon as its dependencies have results, so independent branches overlap.
+    A stage that raises or exceeds its timeout (or the overall deadline) yields its fallback,
+    and dependent stages still run with it.
+    Returns (results, errors): stage name -> result, and stage name -> exception.
+    """
+    pending = {stage.name: stage for stage in stages}
+    results = {}
+    errors = {}
+    running = {}
+    end = time.monotonic() + deadline if deadline is not None else None
+
+    while pending or running:
+        # Start every stage whose dependencies are resolved
+        for stage, kwargs in _ready_stages(pending, results):
+            running[executor.submit(_run_stage, stage, kwargs)] = (stage, _expires_at(stage, end))
+
+        if not running:
+            raise ValueError(f"Unresolvable pipeline dependencies: {sorted(pending)}")
+
+        done, _ = wait(running, timeout=_wait_timeout(running), return_when=FIRST_COMPLETED)
+        _collect(done, running, results, errors)
+        _expire(running, results, errors)
+
+    return results, errors
+
+
+async def run_pipeline_async(stages, deadline=None):
+    """
+    run_pipeline() on the running event loop: each stage runs as a task, and its func may
+    return an awaitable (awaited in the task) or a plain value. Timed-out tasks are cancelled.
+    """
+    pending = {stage.name: stage for stage in stages}
+    results = {}
+    errors = {}
+    running = {}
+    end = time.monotonic() + deadline if deadline is not None else None
+
+    while pending or running:
+        for stage, kwargs in _ready_stages(pending, results):
+            task = asyncio.ensure_future(_run_stage_async(stage, kwargs))
+            running[task] = (stage, _expires_at(stage, end))
+
+        if not running:
+            raise ValueError(f"Unresolvable pipeline dependencies: {sorted(pending)}")
+
+        done, _ = await asyncio.wait(
+            running, timeout=_wait_timeout(running), return_when=asyncio.FIRST_COMPLETED
+        )
+        _collect(done, running, results, errors)
+        _expire(running, results, errors)
+
+    return results, errors
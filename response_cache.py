@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Slack user/channel mentions and special mentions: <@U123>, <#C123|general>, <!here>
+_MENTION_RE = re.compile(r"<[@#!][^>]*>")
+# Slack emoji shortcodes (:thumbsup:, :skin-tone-2:) and Unicode emoji/pictographs
+_EMOJI_RE = re.compile(
+    r":(?:[a-z][a-z0-9_+\-']*|[+\-]1):"
+    "|[\U0001F000-\U0001FAFF\u2600-\u27BF\uFE0F\u200D]",
+    re.IGNORECASE,
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(text):
+    """
+    Normalizes a user message so trivially different copies of a question share a cache key:
+    mentions and emoji are removed, whitespace is collapsed and case is folded.
+    """
+    text = _MENTION_RE.sub(" ", text or "")
+    text = _EMOJI_RE.sub(" ", text)
+    return _WHITESPACE_RE.sub(" ", text).strip().casefold()
+
+
+def make_cache_key(model, system_prompt, user_message, **params):
+    """
+    Builds a cache key from everything that determines the answer, so changing the model,
+    the system prompt or generation parameters never serves a stale response.
+    """
+    material = json.dumps(
+        {
+            "model": model,
+            "system": system_prompt,
+            "message": normalize_prompt(user_message),
+            "params": params,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class SQLiteBackend:
+    """
+    Shared cache tier stored in a SQLite database (WAL mode), so entries survive cold starts
+    and can be shared by instances that mount the same file. Any object with the same
+    get/set/delete methods (e.g. a Redis or Firestore wrapper) can be used instead; get returns
+    (value, expires_at) with expires_at as a Unix timestamp, or None.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return row[0], row[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def purge_expired(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+
+
+class ResponseCache:
+    """
+    Two-tier exact-match response cache: an in-process LRU in front of an optional shared backend.
+    Backend errors are logged and treated as misses, so the cache never breaks an answer.
+    """
+
+    def __init__(self, ttl=24 * 60 * 60, maxsize=1024, backend=None):
+        self.ttl = ttl
+        self.backend = backend
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._stats = {"local_hits": 0, "backend_hits": 0, "misses": 0}
+
+    def get(self, key):
+        value = self._local.get(key)
+        if value is not None:
+            self._count("local_hits")
+            return value
+        if self.backend is not None:
+            try:
+                entry = self.backend.get(key)
+            except Exception as e:
+                logger.error(f"Error reading response cache backend: {e}")
+                entry = None
+            if entry is not None:
+                # The local copy expires with the shared entry, not a full TTL after this read
+                value, expires_at = entry
+                remaining = expires_at - time.time()
+                if remaining > 0:
+                    self._local.set(key, value, ttl=remaining)
+                self._count("backend_hits")
+                return value
+        self._count("misses")
+        return None
+
+    def set(self, key, value):
+        self._local.set(key, value)
+        if self.backend is not None:
+            try:
+                self.backend.set(key, value, self.ttl)
+            except Exception as e:
+                logger.error(f"Error writing response cache backend: {e}")
+
+    def delete(self, key):
+        self._local.invalidate(key)
+        if self.backend is not None:
+            try:
+                self.backend.delete(key)
+            except Exception as e:
+                logger.error(f"Error deleting from response cache backend: {e}")
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["local_hits"] + stats["backend_hits"] + stats["misses"]
+        stats["hit_rate"] = (lookups - stats["misses"]) / lookups if lookups else 0.0
+        stats["local_size"] = len(self._local)
+        return stats
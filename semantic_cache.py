@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+import numpy as np
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    Caches answers by question meaning rather than exact text.
+    Question embeddings are kept L2-normalized in one matrix, so a lookup is a single
+    matrix-vector product followed by an argmax over cosine similarities.
+    When full, the entry with the lowest score (hit count decayed by time since last use)
+    is evicted.
+    Each entry carries a namespace (e.g. a hash of the model, system prompt and knowledge
+    base version); lookups only match entries from the same namespace.
+    """
+
+    def __init__(self, embed, capacity=500, threshold=0.92, recency_half_life=24 * 60 * 60):
+        self._embed = embed
+        self.capacity = capacity
+        self.threshold = threshold
+        self.recency_half_life = recency_half_life
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._hits = np.zeros(capacity, dtype=np.int64)
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._questions = [None] * capacity
+        self._answers = [None] * capacity
+        self._namespaces = [None] * capacity
+        self._size = 0
+        # Recent embeddings, so a lookup followed by add() embeds the question only once
+        self._embeddings = TTLCache(maxsize=256, ttl=300)
+        self._stats = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "total_lookup_time": 0.0,
+            "max_lookup_time": 0.0,
+        }
+
+    def embed(self, text):
+        """
+        Returns the normalized embedding for text, reusing recently computed ones.
+        """
+        vector = self._embeddings.get(text)
+        if vector is None:
+            vector = np.asarray(self._embed(text), dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector = vector / norm
+            self._embeddings.set(text, vector)
+        return vector
+
+    def _nearest(self, vector, namespace):
+        """
+        Returns (index, similarity) of the closest cached question in namespace.
+        Caller holds the lock.
+        """
+        if self._size == 0:
+            return None, 0.0
+        similarities = self._matrix[: self._size] @ vector
+        stale = [i for i in range(self._size) if self._namespaces[i] != namespace]
+        if stale:
+            if len(stale) == self._size:
+                return None, 0.0
+            similarities[stale] = -np.inf
+        index = int(np.argmax(similarities))
+        return index, float(similarities[index])
+
+    def lookup(self, question, namespace=None):
+        """
+        Returns the cached answer for a question similar enough to this one, or None.
+        Entries stored under a different namespace are never returned.
+        """
+        start = time.monotonic()
+        vector = self.embed(question)
+        with self._lock:
+            index, similarity = self._nearest(vector, namespace)
+            hit = index is not None and similarity >= self.threshold
+            if hit:
+                self._hits[index] += 1
+                self._last_used[index] = time.time()
+                answer = self._answers[index]
+            elapsed = time.monotonic() - start
+            self._stats["lookups"] += 1
+            self._stats["hits" if hit else "misses"] += 1
+            self._stats["total_lookup_time"] += elapsed
+            self._stats["max_lookup_time"] = max(self._stats["max_lookup_time"], elapsed)
+        if hit:
+            logger.info(f"Semantic cache hit (similarity {similarity:.3f}) for: {question}")
+            return answer
+        return None
+
+    def add(self, question, answer, namespace=None):
+        vector = self.embed(question)
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+
+            # Refresh an existing entry for the same question instead of duplicating it
+            index, similarity = self._nearest(vector, namespace)
+            if index is None or similarity < self.threshold:
+                if self._size >= self.capacity:
+                    index = self._evict_one(namespace)
+                else:
+                    index = self._size
+                self._size = max(self._size, index + 1)
+                self._hits[index] = 0
+            self._matrix[index] = vector
+            self._questions[index] = question
+            self._answers[index] = answer
+            self._namespaces[index] = namespace
+            self._last_used[index] = time.time()
+
+    def _evict_one(self, namespace):
+        """
+        Evicts the lowest-scoring entry and returns its (now free) slot, preferring entries
+        from another namespace since they can no longer be served. Caller holds the lock.
+        """
+        age = time.time() - self._last_used[: self._size]
+        scores = (self._hits[: self._size] + 1) * np.exp2(-age / self.recency_half_life)
+        stale = [i for i in range(self._size) if self._namespaces[i] != namespace]
+        if stale:
+            scores[stale] = -1.0
+        index = int(np.argmin(scores))
+        self._stats["evictions"] += 1
+        return index
+
+    def _remove(self, index):
+        """
+        Removes an entry by moving the last one into its slot. Caller holds the lock.
+        """
+        last = self._size - 1
+        if index != last:
+            self._matrix[index] = self._matrix[last]
+            self._hits[index] = self._hits[last]
+            self._last_used[index] = self._last_used[last]
+            self._questions[index] = self._questions[last]
+            self._answers[index] = self._answers[last]
+            self._namespaces[index] = self._namespaces[last]
+        self._questions[last] = self._answers[last] = self._namespaces[last] = None
+        self._size = last
+
+    def invalidate(self, question):
+        """
+        Drops every cached answer for questions similar to this one, e.g. after negative feedback.
+        Returns the number of entries removed.
+        """
+        vector = self.embed(question)
+        removed = 0
+        with self._lock:
+            if self._size:
+                similarities = self._matrix[: self._size] @ vector
+                # Remove from the highest index down so swapped-in rows are already checked
+                for index in sorted(np.nonzero(similarities >= self.threshold)[0], reverse=True):
+                    self._remove(int(index))
+                    removed += 1
+            self._stats["invalidations"] += removed
+        return removed
+
+    def __len__(self):
+        return self._size
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = self._size
+        stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        stats["avg_lookup_time"] = (
+            stats["total_lookup_time"] / stats["lookups"] if stats["lookups"] else 0.0
+        )
+        return stats
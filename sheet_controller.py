@@ -1,11 +1,14 @@
 import os
+import sys
 import json
 import time
+import queue
+import atexit
 import logging
+import datetime
 import threading
-from cryptography.fernet import Fernet
-from googleapiclient.discovery import build
-from google.oauth2.service_account import Credentials
+import metrics
+from singleflight import SingleFlight
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -19,68 +22,332 @@ DECRYPTION_KEY ="ZRDNAJbZi394lmgW4Tqpb_jteSu5Rdx8rX08YNDkmhk="
 if not DECRYPTION_KEY:
     raise ValueError("Decryption key not found in environment variables.")
 
+# Endpoint overrides, e.g. local stand-ins for benchmarks
+SHEETS_API_URL = os.environ.get("SHEETS_API_URL")
+GOOGLE_TOKEN_URI = os.environ.get("GOOGLE_TOKEN_URI")
+
+# The service is built once, without a discovery fetch, from sheets_discovery.json: the sheets v4
+# document bundled with google-api-python-client, trimmed to spreadsheets.values.append (building
+# from the full document generates docstrings for every Sheets method). Regenerate it with
+# `python sheet_controller.py discovery`. All requests share one authorized httplib2 transport;
+# httplib2.Http is not thread-safe, so only the sheet writer thread sends appends. The access
+# token is refreshed SHEETS_TOKEN_REFRESH_MARGIN seconds before it expires, so appends never wait
+# for a token fetch.
+SHEETS_HTTP_TIMEOUT = float(os.environ.get("SHEETS_HTTP_TIMEOUT", 30))
+SHEETS_TOKEN_REFRESH_MARGIN = float(os.environ.get("SHEETS_TOKEN_REFRESH_MARGIN", 300))
+SHEETS_DISCOVERY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sheets_discovery.json")
+SHEETS_DISCOVERY_METHODS = [("spreadsheets", "values", "append")]
+
 # Initialize global variables for credentials and service
 decrypted_json = None
+credentials = None
+authorized_http = None
 service = None
+values_resource = None
+_service_flight = SingleFlight()
+_credentials_lock = threading.Lock()
+_token_lock = threading.Lock()
+
+def load_credentials():
+    """
+    Decrypts the service account key and creates its credentials once; later calls reuse them,
+    also when building the service failed.
+    """
+    global decrypted_json, credentials
+    with _credentials_lock:
+        if credentials is None:
+            from cryptography.fernet import Fernet
+            from google.oauth2.service_account import Credentials
 
-def initialize_service():
-    global decrypted_json, service
-    if decrypted_json is None or service is None:
-        try:
             # Decrypt the JSON credentials
             fernet = Fernet(DECRYPTION_KEY)
             decrypted_json = json.loads(fernet.decrypt(ENCRYPTED_JSON).decode())
 
-            # Authenticate with Google Sheets API
-            credentials = Credentials.from_service_account_info(
+            service_account_credentials = Credentials.from_service_account_info(
                 decrypted_json,
                 scopes=["https://www.googleapis.com/auth/spreadsheets"]
             )
-            service = build('sheets', 'v4', credentials=credentials)
-            logger.info("Google Sheets service initialized.")
-        except Exception as e:
-            logger.error(f"Error initializing Google Sheets service: {e}")
-            raise
+            if GOOGLE_TOKEN_URI:
+                service_account_credentials = service_account_credentials.with_token_uri(GOOGLE_TOKEN_URI)
+            credentials = service_account_credentials
+    return credentials
+
+def initialize_service():
+    """
+    Builds the Google Sheets service once, on first use. Concurrent callers wait for the build
+    in progress and get its result or error instead of building their own.
+    cryptography and googleapiclient are imported on first use to keep them off the cold-start path.
+    """
+    if service is None:
+        _service_flight.do("sheets", _build_service)
+
+def _build_service():
+    global authorized_http, service, values_resource
+    # A caller that arrived just after the previous build finished
+    if service is not None:
+        return
+    try:
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
+        from googleapiclient.discovery import build_from_document
+
+        authorized_http = AuthorizedHttp(load_credentials(), http=httplib2.Http(timeout=SHEETS_HTTP_TIMEOUT))
+        with open(SHEETS_DISCOVERY_PATH) as f:
+            discovery_document = f.read()
+        client_options = {"api_endpoint": SHEETS_API_URL} if SHEETS_API_URL else None
+        sheets_service = build_from_document(
+            discovery_document, http=authorized_http, client_options=client_options
+        )
+        sheets_values = sheets_service.spreadsheets().values()
+    except Exception as e:
+        logger.error(f"Error initializing Google Sheets service: {e}")
+        raise
+
+    # Fetch the first token now rather than on the first append; a failure is retried then
+    try:
+        refresh_token_if_expiring()
+    except Exception as e:
+        logger.warning(f"Error fetching Google Sheets access token: {e}")
+    values_resource = sheets_values
+    service = sheets_service
+    logger.info("Google Sheets service initialized.")
+
+def refresh_token_if_expiring():
+    """
+    Refreshes the access token if there is none yet or it expires within
+    SHEETS_TOKEN_REFRESH_MARGIN seconds. Returns True if a new token was fetched.
+    """
+    from google_auth_httplib2 import Request
+
+    with _token_lock:
+        # google-auth keeps expiry as a naive UTC datetime
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        margin = datetime.timedelta(seconds=SHEETS_TOKEN_REFRESH_MARGIN)
+        if credentials.token and credentials.expiry and credentials.expiry - now > margin:
+            return False
+        with metrics.span("sheets_token_refresh"):
+            credentials.refresh(Request(authorized_http.http))
+        return True
+
+def trim_discovery_document(document, methods):
+    """
+    Returns a copy of a discovery document with only the given methods (resource path plus
+    method name) and the schemas they reference.
+    """
+    trimmed = {key: value for key, value in document.items() if key not in ("resources", "schemas")}
+    refs = []
+    for *resource_path, method_name in methods:
+        source, target = document, trimmed
+        for name in resource_path:
+            source = source["resources"][name]
+            target = target.setdefault("resources", {}).setdefault(name, {})
+        method = source["methods"][method_name]
+        target.setdefault("methods", {})[method_name] = method
+        refs += [method[key]["$ref"] for key in ("request", "response") if key in method]
+
+    schemas = {}
+    while refs:
+        name = refs.pop()
+        if name not in schemas:
+            schemas[name] = document["schemas"][name]
+            refs += _schema_refs(schemas[name])
+    trimmed["schemas"] = schemas
+    return trimmed
+
+def _schema_refs(value):
+    if isinstance(value, dict):
+        refs = [value["$ref"]] if "$ref" in value else []
+        for item in value.values():
+            refs += _schema_refs(item)
+        return refs
+    if isinstance(value, list):
+        return [ref for item in value for ref in _schema_refs(item)]
+    return []
+
+def write_discovery_document():
+    """
+    Writes SHEETS_DISCOVERY_PATH from the discovery document bundled with google-api-python-client.
+    """
+    from googleapiclient.discovery_cache import get_static_doc
+
+    document = json.loads(get_static_doc("sheets", "v4"))
+    with open(SHEETS_DISCOVERY_PATH, "w") as f:
+        json.dump(trim_discovery_document(document, SHEETS_DISCOVERY_METHODS), f, indent=2, sort_keys=True)
+        f.write("\n")
 
 # Google Sheets details
 SPREADSHEET_ID = '176Qo1lKMwSwFi84HomyfGLs5CNwL1ADf1WMVOOoYsy8'  # Replace with your actual spreadsheet ID
 RANGE_NAME = 'Sheet1!A1:D'  # Adjust the range as needed
 
-def append_to_sheet(ticket_number, feedback, user_email):
+# Background writer configuration
+SHEET_QUEUE_SIZE = int(os.environ.get("SHEET_QUEUE_SIZE", 1000))
+SHEET_BATCH_SIZE = int(os.environ.get("SHEET_BATCH_SIZE", 50))
+SHEET_FLUSH_INTERVAL = float(os.environ.get("SHEET_FLUSH_INTERVAL", 2.0))
+SHEET_ENQUEUE_TIMEOUT = float(os.environ.get("SHEET_ENQUEUE_TIMEOUT", 0.05))
+
+def append_rows_to_sheet(rows):
     """
-    Appends feedback to the Google Sheet.
+    Appends the given rows to the Google Sheet in a single API call.
     """
-    try:
-        initialize_service()
+    initialize_service()
+    refresh_token_if_expiring()
 
-        # Prepare the data to append
-        values = [
-            [ticket_number, feedback, user_email, time.strftime("%Y-%m-%d %H:%M:%S")]
-        ]
-        body = {"values": values}
-
-        # Append the data to the sheet
-        sheet = service.spreadsheets()
-        result = sheet.values().append(
+    body = {"values": rows}
+
+    # Append the data to the sheet
+    with metrics.span("sheets_append"):
+        result = values_resource.append(
             spreadsheetId=SPREADSHEET_ID,
             range=RANGE_NAME,
             valueInputOption='RAW',
             body=body
-        ).execute()
+        ).execute(num_retries=3)
+
+    logger.info(f"{result.get('updates').get('updatedCells')} cells appended to the Google Sheet.")
+    return result
 
-        logger.info(f"{result.get('updates').get('updatedCells')} cells appended to the Google Sheet.")
+def append_to_sheet(ticket_number, feedback, user_email):
+    """
+    Appends feedback to the Google Sheet.
+    """
+    try:
+        # Prepare the data to append
+        append_rows_to_sheet(
+            [[ticket_number, feedback, user_email, time.strftime("%Y-%m-%d %H:%M:%S")]]
+        )
     except Exception as e:
         logger.error(f"Error appending to Google Sheet: {e}")
 
-def append_to_sheet_async(ticket_number, feedback, user_email):
+
+class SheetWriter:
     """
-    Runs append_to_sheet in a separate thread to make it asynchronous.
+    Single long-lived background writer that batches rows into multi-row appends.
+    Rows are queued in a bounded queue and flushed when batch_size rows are pending or the
+    oldest pending row is flush_interval seconds old. When the queue is full, submit() waits
+    up to enqueue_timeout and then drops the row rather than blocking the caller.
     """
-    def task():
+
+    def __init__(self, append_rows, max_queue=SHEET_QUEUE_SIZE, batch_size=SHEET_BATCH_SIZE,
+                 flush_interval=SHEET_FLUSH_INTERVAL, enqueue_timeout=SHEET_ENQUEUE_TIMEOUT):
+        self.append_rows = append_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._metrics = {
+            "enqueued": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "rows_written": 0,
+            "rows_failed": 0,
+            "last_flush_latency": 0.0,
+            "max_flush_latency": 0.0,
+            "total_flush_latency": 0.0,
+        }
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="sheet-writer", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, row):
+        """
+        Queues a row for appending. Returns False if the row was dropped because the queue is full.
+        """
+        self.start()
+        try:
+            self._queue.put(row, timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self._lock:
+                self._metrics["dropped"] += 1
+            logger.warning("Sheet writer queue is full, dropping feedback row.")
+            return False
+        with self._lock:
+            self._metrics["enqueued"] += 1
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+
+            # Collect more rows until the batch is full or the oldest row is due
+            flush_at = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = 0 if self._stop.is_set() else flush_at - time.monotonic()
+                try:
+                    if timeout > 0:
+                        batch.append(self._queue.get(timeout=timeout))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        start = time.monotonic()
         try:
-            append_to_sheet(ticket_number, feedback, user_email)
+            self.append_rows(batch)
+            failed = False
         except Exception as e:
-            logger.error(f"Error in asynchronous append_to_sheet: {e}")
+            logger.error(f"Error appending {len(batch)} rows to Google Sheet: {e}")
+            failed = True
+        latency = time.monotonic() - start
+        with self._lock:
+            self._metrics["flushes"] += 1
+            self._metrics["last_flush_latency"] = latency
+            self._metrics["max_flush_latency"] = max(self._metrics["max_flush_latency"], latency)
+            self._metrics["total_flush_latency"] += latency
+            if failed:
+                self._metrics["failed_flushes"] += 1
+                self._metrics["rows_failed"] += len(batch)
+            else:
+                self._metrics["rows_written"] += len(batch)
+
+    def shutdown(self, timeout=10):
+        """
+        Flushes every queued row and stops the writer thread.
+        """
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics["queue_depth"] = self._queue.qsize()
+        metrics["avg_flush_latency"] = (
+            metrics["total_flush_latency"] / metrics["flushes"] if metrics["flushes"] else 0.0
+        )
+        return metrics
+
+
+sheet_writer = SheetWriter(append_rows_to_sheet)
+atexit.register(sheet_writer.shutdown)
+metrics.register_collector("sheet_writer", sheet_writer.metrics)
+
+def append_to_sheet_async(ticket_number, feedback, user_email):
+    """
+    Queues the feedback row for the background sheet writer.
+    The timestamp is taken now, not when the batch is flushed.
+    """
+    row = [ticket_number, feedback, user_email, time.strftime("%Y-%m-%d %H:%M:%S")]
+    return sheet_writer.submit(row)
 
-    thread = threading.Thread(target=task)
-    thread.start()
\ No newline at end of file
+if __name__ == "__main__":
+    if sys.argv[1:] != ["discovery"]:
+        sys.exit("usage: python sheet_controller.py discovery")
+    write_discovery_document()
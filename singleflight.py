@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlightTimeout(TimeoutError):
+    """
+    Raised to a follower that gave up waiting for the in-flight call it joined.
+    """
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller (the leader) runs the
+    function and every caller that arrives while it is running (followers) gets its result,
+    or its exception re-raised. A key is only shared while a call is in flight; nothing is cached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"leaders": 0, "followers": 0, "follower_timeouts": 0, "errors": 0}
+
+    def do(self, key, func, timeout=None):
+        """
+        Runs func() once for all concurrent callers with this key and returns its result.
+        Followers wait at most timeout seconds and then raise SingleFlightTimeout.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._stats["leaders" if leader else "followers"] += 1
+
+        if leader:
+            try:
+                call.result = func()
+            except Exception as e:
+                call.error = e
+                with self._lock:
+                    self._stats["errors"] += 1
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result
+
+        if not call.done.wait(timeout):
+            with self._lock:
+                self._stats["follower_timeouts"] += 1
+            raise SingleFlightTimeout(f"Timed out after {timeout}s waiting for an identical request")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        return stats
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines on one event loop: followers await the leader's task.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._stats = {"leaders": 0, "followers": 0, "follower_timeouts": 0, "errors": 0}
+
+    async def do(self, key, func, timeout=None):
+        """
+        Awaits func() once for all concurrent callers with this key and returns its result.
+        Followers wait at most timeout seconds and then raise SingleFlightTimeout.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            self._stats["leaders"] += 1
+            task = self._calls[key] = asyncio.ensure_future(func())
+            try:
+                return await asyncio.shield(task)
+            except Exception:
+                self._stats["errors"] += 1
+                raise
+            finally:
+                del self._calls[key]
+
+        self._stats["followers"] += 1
+        try:
+            # Shielded, so a follower giving up does not cancel the leader's call
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            self._stats["follower_timeouts"] += 1
+            raise SingleFlightTimeout(f"Timed out after {timeout}s waiting for an identical request")
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats["in_flight"] = len(self._calls)
+        return stats
@@ -0,0 +1,218 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+import metrics
+from slack_sdk.errors import SlackApiError
+
+logger = logging.getLogger(__name__)
+
+# (requests per second, burst) per Web API method, kept below Slack's tiers. Tier limits apply
+# per workspace and method: chat.update and conversations.replies are Tier 3 (~50/min),
+# users.info Tier 4 (~100/min), users.list Tier 2 (~20/min). chat.postMessage is limited to
+# ~1/s per channel instead. Slack tolerates short bursts above the tier rates.
+DEFAULT_RATE_LIMITS = {
+    "chat_postMessage": (1.0, 3),
+    "chat_update": (0.8, 20),
+    "conversations_replies": (0.8, 20),
+    "users_info": (1.5, 10),
+    "users_list": (0.3, 2),
+}
+# Methods limited per channel rather than per workspace
+PER_CHANNEL_METHODS = {"chat_postMessage"}
+# Per-channel buckets kept; the least recently used is dropped beyond this (an idle bucket
+# has refilled anyway)
+MAX_CHANNEL_BUCKETS = 1000
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations: callers take a token even when none is left
+    and wait the returned delay, so waiting callers are served in arrival order.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def reserve(self, now):
+        """
+        Takes one token and returns the number of seconds to wait before using it.
+        Caller holds the client lock.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(delay, self.blocked_until - now)
+
+    def try_take(self, now):
+        """
+        Takes one token if one is available right away. Caller holds the client lock.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1 or self.blocked_until > now:
+            return False
+        self.tokens -= 1
+        return True
+
+    def block(self, until):
+        self.blocked_until = max(self.blocked_until, until)
+
+
+class _PendingUpdate:
+    """
+    A chat.update waiting for its token; later updates to the same message replace its arguments.
+    """
+
+    def __init__(self, kwargs):
+        self.kwargs = kwargs
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class RateLimitedClient:
+    """
+    Wraps a slack_sdk WebClient so calls stay within Slack's rate limits.
+    Rate-limited methods wait on per-method token buckets (per channel for chat.postMessage); a 429 pauses
+    that bucket for Retry-After seconds and the call is retried. chat.update calls for the same
+    message that are still waiting are coalesced, so only the latest content is sent.
+    Every other attribute is passed through to the wrapped client.
+    """
+
+    def __init__(self, client, rate_limits=None, max_retries=3):
+        self._client = client
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits)
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+        self._pending_updates = {}
+        self._sending_updates = {}
+        self._waiting = 0
+        self._stats = {
+            "calls": 0,
+            "throttled_calls": 0,
+            "throttle_time": 0.0,
+            "max_throttle_time": 0.0,
+            "rate_limited": 0,
+            "coalesced_updates": 0,
+            "skipped_calls": 0,
+        }
+
+    def __getattr__(self, name):
+        if name in self.rate_limits:
+            if name == "chat_update":
+                return self._chat_update
+            return lambda **kwargs: self._call(name, kwargs)
+        return getattr(self._client, name)
+
+    def _bucket(self, method, kwargs):
+        key = (method, kwargs.get("channel") if method in PER_CHANNEL_METHODS else None)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(*self.rate_limits[method])
+            if len(self._buckets) > MAX_CHANNEL_BUCKETS + len(self.rate_limits):
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _wait_for_token(self, method, kwargs):
+        with self._lock:
+            delay = self._bucket(method, kwargs).reserve(time.monotonic())
+            self._stats["calls"] += 1
+            if delay > 0:
+                self._stats["throttled_calls"] += 1
+                self._stats["throttle_time"] += delay
+                self._stats["max_throttle_time"] = max(self._stats["max_throttle_time"], delay)
+                self._waiting += 1
+        if delay > 0:
+            metrics.observe("slack_throttle_seconds", delay, method=method)
+            try:
+                time.sleep(delay)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+
+    def _call(self, method, kwargs, token_taken=False):
+        for attempt in range(self.max_retries + 1):
+            if attempt or not token_taken:
+                self._wait_for_token(method, kwargs)
+            try:
+                with metrics.span("slack_api_request", method=method):
+                    return getattr(self._client, method)(**kwargs)
+            except SlackApiError as e:
+                if e.response is None or e.response.status_code != 429 or attempt == self.max_retries:
+                    raise
+                headers = e.response.headers or {}
+                retry_after = float(headers.get("Retry-After", headers.get("retry-after", 1)))
+                logger.warning(f"Slack rate limited {method}, retrying in {retry_after}s.")
+                with self._lock:
+                    self._stats["rate_limited"] += 1
+                    self._bucket(method, kwargs).block(time.monotonic() + retry_after)
+
+    def try_call(self, method, **kwargs):
+        """
+        Makes the call only if its bucket has a token right away, and returns None otherwise.
+        For cosmetic calls (progress updates) that are better skipped than queued ahead of replies.
+        """
+        with self._lock:
+            taken = self._bucket(method, kwargs).try_take(time.monotonic())
+            self._stats["calls" if taken else "skipped_calls"] += 1
+        if not taken:
+            return None
+        return self._call(method, kwargs, token_taken=True)
+
+    def _chat_update(self, **kwargs):
+        key = (kwargs.get("channel"), kwargs.get("ts"))
+        with self._lock:
+            pending = self._pending_updates.get(key)
+            if pending is not None:
+                # An earlier update of this message has not been sent yet: send ours instead
+                pending.kwargs = kwargs
+                self._stats["coalesced_updates"] += 1
+                follower = True
+            else:
+                pending = self._pending_updates[key] = _PendingUpdate(kwargs)
+                follower = False
+
+        if follower:
+            pending.done.wait()
+        else:
+            try:
+                self._wait_for_token("chat_update", kwargs)
+                with self._lock:
+                    # Updates arriving from now on start a new batch
+                    del self._pending_updates[key]
+                    kwargs = pending.kwargs
+                    previous = self._sending_updates.get(key)
+                    self._sending_updates[key] = pending
+                # Keep updates of one message in order
+                if previous is not None:
+                    previous.done.wait()
+                pending.response = self._call("chat_update", kwargs, token_taken=True)
+            except Exception as e:
+                pending.error = e
+            finally:
+                with self._lock:
+                    if self._pending_updates.get(key) is pending:
+                        del self._pending_updates[key]
+                    if self._sending_updates.get(key) is pending:
+                        del self._sending_updates[key]
+                pending.done.set()
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.response
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["queue_depth"] = self._waiting
+            stats["pending_updates"] = len(self._pending_updates)
+        return stats
@@ -1,61 +1,294 @@
+import atexit
+import hashlib
 import logging
-import time
+import os
 import json
+import time
+import threading
+import metrics
+from concurrent.futures import ThreadPoolExecutor
 from slack_bolt import App
-from slack_bolt.adapter.google_cloud_functions import SlackRequestHandler
-from ai_controller import get_openai_response, summarize_message
-from jira_controller import create_jira_ticket
+from admission import AdmissionRejected
+from ai_controller import (
+    get_openai_response,
+    lookup_cached_response,
+    report_bad_response,
+    store_cached_response,
+    stream_openai_response,
+    summarize_message,
+)
+from jira_controller import (
+    JiraTicketError,
+    account_id_invalidation_listeners,
+    create_jira_ticket,
+    resolve_request_ids,
+)
 from sheet_controller import append_to_sheet_async
-from config import TICKET_CREATION_URL, bot_user_id
+from cache import TTLCache
+from pipeline import Stage, run_pipeline
+from task_queue import InProcessTaskQueue
+from ticket_outbox import RetryLater, TicketOutbox
+from slack_client import RateLimitedClient
+from user_directory import UserDirectory
+from config import (
+    DEFERRED_MAX_PENDING,
+    DEFERRED_MAX_WORKERS,
+    DEFERRED_PROCESSING,
+    TICKET_CREATION_URL,
+    get_bot_user_id,
+    peek_bot_user_id,
+    slack_client,
+)
 
 logger = logging.getLogger(__name__)
 
+# Negative-feedback pipeline: bounded worker pool and per-stage deadlines (seconds)
+PIPELINE_MAX_WORKERS = int(os.environ.get("PIPELINE_MAX_WORKERS", 8))
+PIPELINE_DEADLINE = float(os.environ.get("PIPELINE_DEADLINE", 45))
+JIRA_PROJECT_KEY = "SD"
+JIRA_REQUEST_TYPE_NAME = "Get IT help"
+
+pipeline_executor = ThreadPoolExecutor(
+    max_workers=PIPELINE_MAX_WORKERS, thread_name_prefix="feedback-pipeline"
+)
+
+USER_MESSAGE_NOT_FOUND = "User message not found."
+# Ticket number and feedback columns of the sheet row recorded for positive feedback
+POSITIVE_FEEDBACK_ROW = ("AI_Ticket", "Positive Feedback")
+
+# Replies shared by the sync handlers and the asyncio server mode (async_controller.py)
+ERROR_REPLY = "Sorry, something went wrong. Please try again later."
+EMAIL_NOT_FOUND_REPLY = "Unable to retrieve your email. Please contact support manually."
+POSITIVE_FEEDBACK_REPLY = "Thank you for your feedback! 😊 I'm glad I could help!"
+FEEDBACK_BUSY_REPLY = "I'm receiving a lot of requests right now and couldn't record your feedback. Please try again in a few minutes."
+TICKET_QUEUED_REPLY = "I'm sorry I couldn't resolve your query. I'm creating a support ticket for you and will post the link here shortly."
+CREATE_TICKET_ACTIONS = {
+    "type": "actions",
+    "elements": [
+        {
+            "type": "button",
+            "text": {"type": "plain_text", "text": "Create Ticket"},
+            "url": TICKET_CREATION_URL,
+            "action_id": "create_ticket_button",
+        },
+    ],
+}
+
+# The question travels in the "No" button's value so negative feedback needs no thread fetch.
+# Values are limited to 2000 characters; longer questions are kept in a local store and
+# referenced by hash (other instances fall back to scanning the thread).
+BUTTON_VALUE_LIMIT = 2000
+QUESTION_STORE_TTL = int(os.environ.get("QUESTION_STORE_TTL", 7 * 24 * 60 * 60))
+THREAD_SCAN_PAGE_SIZE = 50
+question_store = TTLCache(maxsize=1000, ttl=QUESTION_STORE_TTL)
+
+# Slack user profiles (email, name, Jira account ID), so feedback clicks rarely call users.info.
+# USER_DIRECTORY_SNAPSHOT_PATH keeps a gzipped snapshot for cold starts.
+USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", 24 * 60 * 60))
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 5000))
+USER_DIRECTORY_SNAPSHOT_PATH = os.environ.get("USER_DIRECTORY_SNAPSHOT_PATH")
+
+user_directory = UserDirectory(
+    maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL, snapshot_path=USER_DIRECTORY_SNAPSHOT_PATH
+)
+atexit.register(user_directory.save_snapshot)
+# A stale Jira account ID must not come back from the directory after Jira rejected it
+account_id_invalidation_listeners.append(user_directory.forget_jira_account_id)
+
+# Deferred work queue for answering messages and processing feedback after the ack
+task_queue = InProcessTaskQueue(max_workers=DEFERRED_MAX_WORKERS, max_pending=DEFERRED_MAX_PENDING)
+atexit.register(task_queue.drain, 30)
+# "High load" replies for tasks shed by a full task queue; they wait for Slack's rate limits
+# here rather than before the ack, and are dropped if this queue fills up as well
+shed_reply_queue = InProcessTaskQueue(max_workers=2, max_pending=DEFERRED_MAX_PENDING)
+atexit.register(shed_reply_queue.drain, 5)
+
+# Durable outbox for Jira tickets: with JIRA_OUTBOX_PATH set, negative feedback stores the ticket
+# intent in a local SQLite file and replies at once; outbox workers create the ticket, retrying
+# while Jira is unavailable, and post its link in the thread.
+JIRA_OUTBOX_PATH = os.environ.get("JIRA_OUTBOX_PATH")
+JIRA_OUTBOX_WORKERS = int(os.environ.get("JIRA_OUTBOX_WORKERS", 4))
+JIRA_OUTBOX_BATCH_SIZE = int(os.environ.get("JIRA_OUTBOX_BATCH_SIZE", 10))
+JIRA_OUTBOX_MAX_ATTEMPTS = int(os.environ.get("JIRA_OUTBOX_MAX_ATTEMPTS", 8))
+JIRA_OUTBOX_RETRY_BASE = float(os.environ.get("JIRA_OUTBOX_RETRY_BASE", 5))
+JIRA_OUTBOX_RETRY_MAX = float(os.environ.get("JIRA_OUTBOX_RETRY_MAX", 600))
+
+ticket_outbox = None
+if JIRA_OUTBOX_PATH:
+    ticket_outbox = TicketOutbox(
+        JIRA_OUTBOX_PATH,
+        handler=lambda payload: process_ticket_outbox_entry(payload),
+        on_failure=lambda payload, error: handle_ticket_outbox_failure(payload, error),
+        workers=JIRA_OUTBOX_WORKERS,
+        batch_size=JIRA_OUTBOX_BATCH_SIZE,
+        max_attempts=JIRA_OUTBOX_MAX_ATTEMPTS,
+        retry_base=JIRA_OUTBOX_RETRY_BASE,
+        retry_max=JIRA_OUTBOX_RETRY_MAX,
+    )
+    atexit.register(ticket_outbox.shutdown)
+    metrics.register_collector("ticket_outbox", ticket_outbox.stats)
+
+metrics.register_collector("task_queue", task_queue.stats)
+metrics.register_collector("shed_reply_queue", shed_reply_queue.stats)
+metrics.register_collector("user_directory", user_directory.stats)
+if isinstance(slack_client, RateLimitedClient):
+    metrics.register_collector("slack_client", slack_client.stats)
+
+# Seconds between "thinking" placeholder updates while an answer is pending
+THINKING_UPDATE_INTERVAL = float(os.environ.get("THINKING_UPDATE_INTERVAL", 4))
+
+# Streaming mode: partial answers are written into the placeholder as they arrive.
+# Edits are coalesced to at most one per STREAM_UPDATE_INTERVAL seconds, and only once
+# STREAM_UPDATE_MIN_CHUNKS new fragments are pending (or the interval has passed twice).
+STREAM_RESPONSES = os.environ.get("STREAM_RESPONSES", "false").lower() in ("1", "true", "yes")
+STREAM_UPDATE_INTERVAL = float(os.environ.get("STREAM_UPDATE_INTERVAL", 1.0))
+STREAM_UPDATE_MIN_CHUNKS = int(os.environ.get("STREAM_UPDATE_MIN_CHUNKS", 8))
+
+def defer_task(name, payload):
+    """
+    Hands a task to the deferred work queue, or runs it inline when deferral is disabled.
+    When the queue is full the task is shed: the handler registered for it on shed_reply_queue
+    posts a short "high load" reply, so OpenAI and Jira calls never run before the ack.
+    """
+    if not DEFERRED_PROCESSING:
+        task_queue.run(name, payload)
+    elif not task_queue.enqueue(name, payload):
+        metrics.increment("deferred_tasks_shed_total", task=name)
+        shed_reply_queue.enqueue(name, payload)
+
+def shed_message_event(event):
+    """
+    Replies in the thread of a message there was no room to answer.
+    """
+    text, blocks = high_load_reply()
+    slack_client.chat_postMessage(
+        channel=event.get("channel"), thread_ts=event.get("thread_ts", event.get("ts")), text=text, blocks=blocks
+    )
+
+def shed_feedback(payload):
+    """
+    Replies in the thread of a feedback click there was no room to process; negative feedback
+    also gets the ticket button.
+    """
+    container = payload["body"]["container"]
+    text, blocks = (FEEDBACK_BUSY_REPLY, None) if payload["positive"] else high_load_reply()
+    slack_client.chat_postMessage(
+        channel=container["channel_id"], thread_ts=container["thread_ts"], text=text, blocks=blocks
+    )
+
 def handle_message_events(app: App):
+    task_queue.register("message_event", lambda event: process_message_event(slack_client, event))
+    shed_reply_queue.register("message_event", shed_message_event)
+
     @app.event("message")
-    def message_event_handler(body, say, client):
+    def message_event_handler(body, client):
         """
-        Handles messages and shows a sand clock animation while processing. Ensures replies are in a thread.
+        Filters incoming messages and defers answering them, so the event is acked right away.
         """
         try:
-            event = body["event"]
-            user_id = event.get("user")
-            user_message = event.get("text", "").strip()
-            channel_type = event.get("channel_type")  # 'channel', 'group', 'im'
+            event = message_to_answer(body)
+            if event is not None:
+                defer_task("message_event", event)
+        except Exception as e:
+            logger.error("Error handling message event: %s", str(e))
 
-            # Ignore messages we don't need to process
-            if should_ignore_message(event, user_id, channel_type):
-                return
+def message_to_answer(body):
+    """
+    Returns the message event the bot should answer, or None for messages it ignores.
+    """
+    event = body["event"]
+    user_id = event.get("user")
+    user_message = event.get("text", "").strip()
+    channel_type = event.get("channel_type")  # 'channel', 'group', 'im'
 
-            if not user_message:
-                logger.warning("No text found in the message event. Skipping.")
-                return
+    # Ignore messages we don't need to process
+    if should_ignore_message(event, user_id, channel_type):
+        return None
 
-            # Get the channel ID and thread timestamp
-            channel_id = event.get("channel")
-            thread_ts = event.get("thread_ts", event.get("ts"))
+    if not user_message:
+        logger.warning("No text found in the message event. Skipping.")
+        return None
 
-            # Send sand clock animation
-            initial_message_ts = send_sand_clock_animation(client, channel_id, thread_ts)
+    return event
 
+@metrics.timed("handler", stage="answer_message")
+def process_message_event(client, event):
+    """
+    Answers a message and shows a thinking indicator while processing. Ensures replies are in a thread.
+    """
+    user_message, user_id, channel_id, thread_ts = message_context(event)
+
+    try:
+        # Post the placeholder in the background and query OpenAI right away
+        indicator = ThinkingIndicator(client, channel_id, thread_ts)
+        indicator.start()
+        try:
             # Process the user message
-            bot_response = get_openai_response(user_message)
+            if STREAM_RESPONSES:
+                bot_response = stream_bot_reply(client, channel_id, indicator, user_message, user_id)
+            else:
+                bot_response = get_openai_response(user_message, user_id, channel_id)
+        except AdmissionRejected:
+            bot_response = None
+        finally:
+            initial_message_ts = indicator.stop()
 
-            # Construct and send the bot's reply
-            send_bot_reply(client, channel_id, initial_message_ts, bot_response)
+        # Replace the placeholder with the answer, or the "high load" reply if it was shed
+        text, blocks = message_reply(user_id, user_message, bot_response)
+        client.chat_update(channel=channel_id, ts=initial_message_ts, text=text, blocks=blocks)
 
-        except Exception as e:
-            logger.error("Error handling message event: %s", str(e))
-            say(text="Sorry, something went wrong. Please try again later.")
+    except Exception as e:
+        logger.error("Error handling message event: %s", str(e))
+        client.chat_postMessage(channel=channel_id, thread_ts=thread_ts, text=ERROR_REPLY)
+
+def message_context(event):
+    """
+    Returns (user_message, user_id, channel_id, thread_ts) for a message to answer.
+    Replies always go in a thread: the message's own, or a new one under it.
+    """
+    user_message = event.get("text", "").strip()
+    thread_ts = event.get("thread_ts", event.get("ts"))
+    return user_message, event.get("user"), event.get("channel"), thread_ts
+
+def message_reply(user_id, user_message, bot_response):
+    """
+    Returns the text and blocks replacing the thinking placeholder: the answer with feedback
+    buttons, or the "high load" reply when the LLM request was shed (bot_response is None).
+    """
+    # The LLM is overloaded: answer now instead of keeping the user waiting
+    if bot_response is None:
+        metrics.increment("llm_requests_shed_total")
+        return high_load_reply()
+    question_reference = encode_question_reference(user_id, user_message)
+    return answer_reply(bot_response, question_reference)
 
-def should_ignore_message(event, user_id, channel_type):
+def is_ignorable_event(body):
+    """
+    Cheap check on a parsed Events API body: True for events no listener would act on
+    (non-message events and messages rejected by should_ignore_message or without text),
+    so they can be acked before Bolt dispatch. It never calls Slack: while the bot user ID is
+    unresolved, the bot's own messages fall through to Bolt, which filters them.
+    """
+    if not isinstance(body, dict) or body.get("type") != "event_callback":
+        return False
+    event = body.get("event") or {}
+    if event.get("type") != "message":
+        return True
+    if should_ignore_message(event, event.get("user"), event.get("channel_type"), resolve_bot_user_id=False):
+        return True
+    return not event.get("text", "").strip()
+
+def should_ignore_message(event, user_id, channel_type, resolve_bot_user_id=True):
     """
     Determines whether to ignore the incoming message.
+    Without resolve_bot_user_id, the bot's own messages are only recognized once its user ID
+    is known, so auth.test is never called.
     """
     # 1) Ignore direct messages, bot messages, message deletions, channel joins, or messages from the bot itself
     if (
         channel_type == "im"
         or event.get("subtype") in ["bot_message", "message_deleted", "channel_join"]
-        or user_id == bot_user_id
+        or is_own_message(user_id, resolve_bot_user_id)
     ):
         return True
     
@@ -67,32 +300,181 @@ def should_ignore_message(event, user_id, channel_type):
     
     return False
 
+def is_own_message(user_id, resolve_bot_user_id=True):
+    """
+    True if the message was posted by the bot. Without resolve_bot_user_id, an unresolved
+    bot user ID counts as not the bot's.
+    """
+    if resolve_bot_user_id:
+        return user_id == get_bot_user_id()
+    bot_user_id = peek_bot_user_id()
+    return bot_user_id is not None and user_id == bot_user_id
+
 
-def send_sand_clock_animation(client, channel_id, thread_ts):
+class ThinkingIndicator:
     """
-    Sends a sand clock animation in the thread and returns the message timestamp.
+    Posts a "thinking" placeholder in the thread and refreshes it on a timer until stopped.
+    Runs in its own thread so the answer is requested while the placeholder is being posted.
     """
-    initial_message = client.chat_postMessage(
-        channel=channel_id, text="⏳ Thinking...", thread_ts=thread_ts
-    )
-    initial_message_ts = initial_message["ts"]
-
-    sand_clock_steps = ["⏳ Thinking...", "⌛ Still working...", "⏳ Almost done..."]
-    for step in sand_clock_steps:
-        client.chat_update(
-            channel=channel_id,
-            ts=initial_message_ts,
-            text=step,
+
+    STEPS = ["⏳ Thinking...", "⌛ Still working...", "⏳ Almost done..."]
+
+    def __init__(self, client, channel_id, thread_ts, interval=THINKING_UPDATE_INTERVAL):
+        self.client = client
+        self.channel_id = channel_id
+        self.thread_ts = thread_ts
+        self.interval = interval
+        self.message_ts = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="thinking-indicator", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the updates and returns the placeholder's timestamp, posting it now if the
+        background post failed.
+        """
+        self._stop.set()
+        self._thread.join()
+        if self.message_ts is None:
+            self.message_ts = self._post()
+        return self.message_ts
+
+    def _post(self):
+        message = self.client.chat_postMessage(
+            channel=self.channel_id, text=self.STEPS[0], thread_ts=self.thread_ts
         )
-        time.sleep(1)
-    return initial_message_ts
+        return message["ts"]
+
+    def _run(self):
+        try:
+            self.message_ts = self._post()
+            step = 0
+            while not self._stop.wait(self.interval):
+                step += 1
+                update_progress(
+                    self.client,
+                    channel=self.channel_id,
+                    ts=self.message_ts,
+                    text=self.STEPS[step % len(self.STEPS)],
+                )
+        except Exception as e:
+            logger.error("Error updating thinking indicator: %s", str(e))
+
+def update_progress(client, **kwargs):
+    """
+    Sends a cosmetic chat_update (thinking steps, partial answers). With the rate-limited client
+    it is skipped when chat.update has no token to spare, so it never delays final replies.
+    """
+    if isinstance(client, RateLimitedClient):
+        return client.try_call("chat_update", **kwargs)
+    return client.chat_update(**kwargs)
+
+def stream_bot_reply(client, channel_id, indicator, user_message, user_id=None):
+    """
+    Streams the OpenAI answer into the thinking placeholder with coalesced chat_update edits
+    and returns the full answer. The caller sends the final reply with feedback buttons.
+    Falls back to a non-streaming request if the stream fails.
+    """
+    cached = lookup_cached_response(user_message)
+    if cached is not None:
+        return cached
+
+    fragments = []
+    pending = 0
+    started = time.monotonic()
+    last_update = None
+    try:
+        for fragment in stream_openai_response(user_message, user_id, channel_id):
+            fragments.append(fragment)
+            pending += 1
+            now = time.monotonic()
+            if last_update is None:
+                due = pending >= STREAM_UPDATE_MIN_CHUNKS or now - started >= STREAM_UPDATE_INTERVAL
+            else:
+                elapsed = now - last_update
+                due = elapsed >= STREAM_UPDATE_INTERVAL and (
+                    pending >= STREAM_UPDATE_MIN_CHUNKS or elapsed >= 2 * STREAM_UPDATE_INTERVAL
+                )
+            if not due:
+                continue
+
+            # The first edit replaces the placeholder, so stop its timer first
+            message_ts = indicator.stop()
+            try:
+                update_progress(client, channel=channel_id, ts=message_ts, text="".join(fragments) + " …")
+            except Exception as e:
+                logger.error("Error updating streamed reply: %s", str(e))
+            last_update = now
+            pending = 0
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        logger.error("Error streaming OpenAI response, falling back: %s", str(e))
+        return get_openai_response(user_message, user_id, channel_id)
+
+    if not fragments:
+        logger.warning("OpenAI stream returned no content, falling back.")
+        return get_openai_response(user_message, user_id, channel_id)
+    bot_response = "".join(fragments)
+    store_cached_response(user_message, bot_response)
+    return bot_response
+
+def high_load_reply():
+    """
+    Returns the text and blocks of the "high load" reply.
+    """
+    text = "I'm receiving a lot of questions right now and couldn't get to yours in time. Please try again in a few minutes, or create a ticket using the button below."
+    return text, [
+        {
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": text},
+        },
+        CREATE_TICKET_ACTIONS,
+    ]
 
-def send_bot_reply(client, channel_id, message_ts, bot_response):
+def encode_question_reference(user_id, user_message):
     """
-    Constructs and sends the bot's reply, replacing the sand clock message.
+    Encodes the asker and their question as a button value, storing long questions locally by hash.
+    """
+    value = json.dumps({"user": user_id, "question": user_message})
+    if len(value) <= BUTTON_VALUE_LIMIT:
+        return value
+    digest = hashlib.sha256(user_message.encode("utf-8")).hexdigest()
+    question_store.set(digest, user_message)
+    return json.dumps({"user": user_id, "ref": digest})
+
+def decode_question_reference(body, user_id):
+    """
+    Returns the question carried by the clicked button, or None if it is missing,
+    was asked by another user, or its local reference is unavailable.
+    """
+    try:
+        reference = json.loads(body["actions"][0]["value"])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+    if not isinstance(reference, dict) or reference.get("user") != user_id:
+        return None
+    if "question" in reference:
+        return reference["question"]
+    return question_store.get(reference.get("ref"))
+
+def answer_reply(bot_response, question_reference=None):
+    """
+    Returns the text and blocks of an answer with feedback buttons.
     """
     bot_reply = f"{bot_response}\n\n*Please let me know if this answer is sufficient!*"
 
+    negative_button = {
+        "type": "button",
+        "text": {"type": "plain_text", "text": "👎 No"},
+        "action_id": "feedback_negative",
+    }
+    if question_reference:
+        negative_button["value"] = question_reference
+
     feedback_blocks = [
         {
             "type": "section",
@@ -107,57 +489,45 @@ def send_bot_reply(client, channel_id, message_ts, bot_response):
                     "text": {"type": "plain_text", "text": "👍 Yes"},
                     "action_id": "feedback_positive",
                 },
-                {
-                    "type": "button",
-                    "text": {"type": "plain_text", "text": "👎 No"},
-                    "action_id": "feedback_negative",
-                },
+                negative_button,
             ],
         },
     ]
-
-    client.chat_update(
-        channel=channel_id,
-        ts=message_ts,
-        text=bot_reply,
-        blocks=feedback_blocks,
-    )
+    return bot_reply, feedback_blocks
 
 def handle_feedback_actions(app: App):
-    @app.action("feedback_positive")
-    def handle_positive_feedback(ack, body, client):
-        ack()
+    def feedback_task(payload):
         try:
-            process_feedback(body, client, positive_feedback=True)
+            process_feedback(payload["body"], slack_client, positive_feedback=payload["positive"])
         except Exception as e:
-            logger.error("Error handling positive feedback: %s", str(e))
+            kind = "positive" if payload["positive"] else "negative"
+            logger.error("Error handling %s feedback: %s", kind, str(e))
+
+    task_queue.register("feedback", feedback_task)
+    shed_reply_queue.register("feedback", shed_feedback)
+
+    @app.action("feedback_positive")
+    def handle_positive_feedback(ack, body):
+        ack()
+        defer_task("feedback", {"body": body, "positive": True})
 
     @app.action("feedback_negative")
-    def handle_negative_feedback(ack, body, client):
+    def handle_negative_feedback(ack, body):
         ack()
-        try:
-            process_feedback(body, client, positive_feedback=False)
-        except Exception as e:
-            logger.error("Error handling negative feedback: %s", str(e))
+        defer_task("feedback", {"body": body, "positive": False})
 
+@metrics.timed("handler", stage="feedback")
 def process_feedback(body, client, positive_feedback):
     """
     Processes user feedback, updates the message, and takes appropriate actions.
     """
-    thread_ts = body["container"]["thread_ts"]
-    message_ts = body["container"]["message_ts"]
-    channel_id = body["container"]["channel_id"]
-    user_id = body["user"]["id"]
+    channel_id, thread_ts, message_ts, user_id = feedback_context(body)
 
     # Get user's email
     user_email, user_name = get_user_email_and_name(client, user_id)
     if not user_email:
         logger.error("Unable to retrieve user's email.")
-        client.chat_postMessage(
-            channel=channel_id,
-            thread_ts=thread_ts,
-            text="Unable to retrieve your email. Please contact support manually.",
-        )
+        client.chat_postMessage(channel=channel_id, thread_ts=thread_ts, text=EMAIL_NOT_FOUND_REPLY)
         return
 
     # Update the original message
@@ -167,22 +537,65 @@ def process_feedback(body, client, positive_feedback):
     if positive_feedback:
         handle_positive_feedback_action(client, channel_id, thread_ts, user_email)
     else:
-        handle_negative_feedback_action(client, channel_id, thread_ts, user_id, user_email)
+        original_message = decode_question_reference(body, user_id)
+        handle_negative_feedback_action(
+            client, channel_id, thread_ts, user_id, user_email, original_message
+        )
+
+def feedback_context(body):
+    """
+    Returns (channel_id, thread_ts, message_ts, user_id) for a feedback button click.
+    """
+    container = body["container"]
+    return container["channel_id"], container["thread_ts"], container["message_ts"], body["user"]["id"]
 
 def get_user_email_and_name(client, user_id):
     """
-    Retrieves the user's email and name from Slack.
+    Retrieves the user's email and name from the user directory, falling back to Slack.
+    """
+    profile = user_directory.get(client, user_id)
+    return profile.email, profile.name
+
+def resolve_reporter_request_ids(user_id, user_email):
+    """
+    Resolves the Jira IDs for the reporter, reusing the account ID kept in the user directory.
+    """
+    known_account_id = known_jira_account_id(user_id, user_email)
+    request_ids = resolve_request_ids(
+        user_email, JIRA_PROJECT_KEY, JIRA_REQUEST_TYPE_NAME, account_id=known_account_id
+    )
+    remember_jira_account_id(user_id, known_account_id, request_ids)
+    return request_ids
+
+def known_jira_account_id(user_id, user_email):
+    """
+    Returns the Jira account ID the user directory holds for this reporter, or None.
+    """
+    profile = user_directory.peek(user_id)
+    return profile.jira_account_id if profile and profile.email == user_email else None
+
+def remember_jira_account_id(user_id, known_account_id, request_ids):
+    """
+    Keeps a newly resolved Jira account ID in the user directory.
     """
-    user_info = client.users_info(user=user_id)
-    user_profile = user_info.get('user', {}).get('profile', {})
-    user_email = user_profile.get('email')
-    user_name = user_profile.get('real_name') or user_profile.get('display_name') or user_id
-    return user_email, user_name
+    if request_ids and request_ids.account_id != known_account_id:
+        user_directory.set_jira_account_id(user_id, request_ids.account_id)
 
 def update_original_message(client, body, channel_id, message_ts, positive_feedback):
     """
     Updates the original message to remove feedback buttons and add feedback received context.
     """
+    client.chat_update(
+        channel=channel_id,
+        ts=message_ts,
+        text=body["message"]["text"],
+        blocks=feedback_received_blocks(body, positive_feedback),
+    )
+
+def feedback_received_blocks(body, positive_feedback):
+    """
+    Returns the clicked message's blocks without the feedback buttons, plus the feedback received.
+    """
     feedback_text = "👍" if positive_feedback else "👎"
     original_blocks = body["message"]["blocks"]
     modified_blocks = [
@@ -194,88 +607,218 @@ def update_original_message(client, body, channel_id, message_ts, positive_feedb
             "elements": [{"type": "mrkdwn", "text": f"Feedback received: {feedback_text}"}],
         }
     )
-    client.chat_update(
-        channel=channel_id,
-        ts=message_ts,
-        text=body["message"]["text"],
-        blocks=modified_blocks,
-    )
+    return modified_blocks
 
 def handle_positive_feedback_action(client, channel_id, thread_ts, user_email):
     """
     Handles actions after receiving positive feedback.
     """
     # Append feedback asynchronously
-    ticket_number = "AI_Ticket"
-    feedback = "Positive Feedback"
-    append_to_sheet_async(ticket_number, feedback, user_email)
+    append_to_sheet_async(*POSITIVE_FEEDBACK_ROW, user_email)
 
     # Reply in thread
-    client.chat_postMessage(
-        channel=channel_id,
-        thread_ts=thread_ts,
-        text="Thank you for your feedback! 😊 I'm glad I could help!",
-    )
+    client.chat_postMessage(channel=channel_id, thread_ts=thread_ts, text=POSITIVE_FEEDBACK_REPLY)
 
-def handle_negative_feedback_action(client, channel_id, thread_ts, user_id, user_email):
+def handle_negative_feedback_action(client, channel_id, thread_ts, user_id, user_email, original_message=None):
     """
     Handles actions after receiving negative feedback, including creating a Jira ticket.
+    With the ticket outbox enabled, the ticket is queued and created in the background.
     """
-    # Get the user's original message from the thread
-    user_message = get_user_original_message(client, channel_id, thread_ts, user_id)
+    if ticket_outbox is not None and queue_ticket_creation(
+        client, channel_id, thread_ts, user_id, user_email, original_message
+    ):
+        return
 
-    # Summarize the user message for the Jira ticket summary
-    ticket_summary = summarize_message(user_message)
+    user_message, issue_key, ticket_url, _ = create_ticket_for_thread(
+        client, channel_id, thread_ts, user_id, user_email, original_message
+    )
+    post_ticket_result(client, channel_id, thread_ts, issue_key, ticket_url)
+    report_rejected_answer(user_message)
 
-    # Create a Jira ticket
-    issue_key, ticket_url = create_jira_ticket(
-        summary=ticket_summary,
-        description=user_message,
-        reporter_email=user_email,
-        project_key="SD",
-        request_type_name="Get IT help"
+def report_rejected_answer(user_message):
+    """
+    Makes sure the answer rejected by negative feedback isn't served again from the caches.
+    """
+    if user_message != USER_MESSAGE_NOT_FOUND:
+        report_bad_response(user_message)
+
+def create_ticket_for_thread(client, channel_id, thread_ts, user_id, user_email, original_message=None,
+                             raise_errors=False):
+    """
+    Creates a Jira ticket for the user's question in the thread.
+    The Jira ID lookups run concurrently with fetching and summarizing the original message;
+    ticket creation starts once both branches are done.
+    Returns (user_message, issue_key, ticket_url, ticket_error); ticket_error is the
+    JiraTicketError raised when raise_errors is set.
+    """
+    stages = ticket_stages(
+        lambda: get_user_original_message(client, channel_id, thread_ts, user_id),
+        summarize_message,
+        lambda: resolve_reporter_request_ids(user_id, user_email),
+        original_message,
     )
+    results, errors = run_pipeline(stages, pipeline_executor, deadline=PIPELINE_DEADLINE)
+    if errors:
+        logger.warning(f"Negative feedback pipeline completed with errors in: {sorted(errors)}")
+
+    # Create the Jira ticket outside the pipeline: giving up on a POST at a deadline while Jira
+    # may still create the ticket would offer the manual button and lead to a duplicate.
+    # Jira's connect and read timeouts bound it; it resolves the IDs itself if the lookups failed.
+    ticket_error = None
+    try:
+        with metrics.span("pipeline_stage", stage="ticket"):
+            issue_key, ticket_url = create_jira_ticket(
+                **ticket_fields(results, user_email), raise_errors=raise_errors
+            )
+    except JiraTicketError as e:
+        issue_key, ticket_url, ticket_error = None, None, e
+    return results["user_message"], issue_key, ticket_url, ticket_error
+
+def ticket_stages(find_user_message, summarize, resolve_request_ids, original_message=None):
+    """
+    Returns the pipeline stages gathering a ticket's fields. The callables do the I/O, so the
+    same graph runs on threads (run_pipeline) or on the event loop (run_pipeline_async).
+    """
+    return [
+        # Use the question carried by the feedback button, or find it in the thread
+        Stage(
+            "user_message",
+            lambda: original_message or find_user_message(),
+            timeout=10,
+            fallback=USER_MESSAGE_NOT_FOUND,
+        ),
+        # Summarize the user message for the Jira ticket summary
+        Stage(
+            "ticket_summary",
+            lambda user_message: summarize(user_message),
+            deps=("user_message",),
+            timeout=20,
+            fallback="Support Request",
+        ),
+        # Resolve the Jira account, service desk and request type IDs
+        Stage("request_ids", resolve_request_ids, timeout=20),
+    ]
+
+def ticket_fields(results, user_email):
+    """
+    Returns the create_jira_ticket() arguments for the results of ticket_stages().
+    """
+    return {
+        "summary": results["ticket_summary"],
+        "description": results["user_message"],
+        "reporter_email": user_email,
+        "project_key": JIRA_PROJECT_KEY,
+        "request_type_name": JIRA_REQUEST_TYPE_NAME,
+        "request_ids": results["request_ids"],
+    }
 
+def post_ticket_result(client, channel_id, thread_ts, issue_key, ticket_url):
+    """
+    Posts the ticket link in the thread, or a button to create a ticket manually.
+    """
+    text, blocks = ticket_result_reply(issue_key, ticket_url)
+    client.chat_postMessage(channel=channel_id, thread_ts=thread_ts, text=text, blocks=blocks)
+
+def ticket_result_reply(issue_key, ticket_url):
+    """
+    Returns the text and blocks (None for plain text) announcing the ticket or its failure.
+    """
     if issue_key and ticket_url:
-        client.chat_postMessage(
-            channel=channel_id,
-            thread_ts=thread_ts,
-            text=f"I'm sorry I couldn't resolve your query. A support ticket has been created for you: <{ticket_url}|{issue_key}>. Our team will get back to you shortly.",
-        )
-    else:
-        client.chat_postMessage(
-            channel=channel_id,
-            thread_ts=thread_ts,
-            text="I'm sorry I couldn't resolve your query, and there was an error creating a support ticket automatically. Please use the button below to create a ticket manually.",
-            blocks=[
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": "Please use the button below to create a ticket:",
-                    },
-                },
-                {
-                    "type": "actions",
-                    "elements": [
-                        {
-                            "type": "button",
-                            "text": {"type": "plain_text", "text": "Create Ticket"},
-                            "url": TICKET_CREATION_URL,
-                            "action_id": "create_ticket_button",
-                        },
-                    ],
-                },
-            ],
-        )
+        return f"I'm sorry I couldn't resolve your query. A support ticket has been created for you: <{ticket_url}|{issue_key}>. Our team will get back to you shortly.", None
+    return "I'm sorry I couldn't resolve your query, and there was an error creating a support ticket automatically. Please use the button below to create a ticket manually.", [
+        {
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": "Please use the button below to create a ticket:",
+            },
+        },
+        CREATE_TICKET_ACTIONS,
+    ]
+
+def queue_ticket_creation(client, channel_id, thread_ts, user_id, user_email, original_message=None):
+    """
+    Stores the ticket intent in the outbox and tells the user the ticket is on its way.
+    Returns False if the outbox could not be written (the caller creates the ticket inline).
+    """
+    try:
+        queued = enqueue_ticket(channel_id, thread_ts, user_id, user_email, original_message)
+    except Exception as e:
+        logger.error(f"Error writing ticket to the outbox, creating it inline: {e}")
+        return False
+    if queued:
+        client.chat_postMessage(channel=channel_id, thread_ts=thread_ts, text=TICKET_QUEUED_REPLY)
+    return True
+
+def enqueue_ticket(channel_id, thread_ts, user_id, user_email, original_message=None):
+    """
+    Adds a ticket to the outbox. The idempotency key is the thread and user, so repeated
+    clicks queue one ticket. Returns False if it was already queued.
+    """
+    payload = {
+        "channel_id": channel_id,
+        "thread_ts": thread_ts,
+        "user_id": user_id,
+        "user_email": user_email,
+        "original_message": original_message,
+    }
+    queued = ticket_outbox.enqueue(f"ticket:{channel_id}:{thread_ts}:{user_id}", payload)
+    if not queued:
+        logger.info(f"Ticket for thread {thread_ts} by {user_id} is already queued.")
+    return queued
+
+def process_ticket_outbox_entry(payload):
+    """
+    Outbox handler: creates the ticket and posts its link. Raises RetryLater when Jira could
+    not take the request, and JiraTicketError when the ticket was not created for good.
+    """
+    channel_id, thread_ts = payload["channel_id"], payload["thread_ts"]
+    user_message, issue_key, ticket_url, ticket_error = create_ticket_for_thread(
+        slack_client,
+        channel_id,
+        thread_ts,
+        payload["user_id"],
+        payload["user_email"],
+        payload.get("original_message"),
+        raise_errors=True,
+    )
+    report_rejected_answer(user_message)
+    if isinstance(ticket_error, JiraTicketError) and ticket_error.retryable:
+        raise RetryLater(str(ticket_error)) from ticket_error
+    if not issue_key:
+        raise JiraTicketError(f"Ticket was not created: {ticket_error}")
+
+    # The ticket exists; failing to post the link must not create it again
+    try:
+        post_ticket_result(slack_client, channel_id, thread_ts, issue_key, ticket_url)
+    except Exception as e:
+        logger.error(f"Error posting ticket {issue_key} to thread {thread_ts}: {e}")
+    return {"issue_key": issue_key, "ticket_url": ticket_url}
+
+def handle_ticket_outbox_failure(payload, error):
+    """
+    Called when a queued ticket could not be created: offers the manual ticket button instead.
+    """
+    logger.error(f"Giving up on ticket for thread {payload['thread_ts']}: {error}")
+    post_ticket_result(slack_client, payload["channel_id"], payload["thread_ts"], None, None)
 
 def get_user_original_message(client, channel_id, thread_ts, user_id):
     """
     Retrieves the user's original message from the thread.
+    Pages through the replies and stops at the first message from the user (usually the parent).
     """
-    response = client.conversations_replies(channel=channel_id, ts=thread_ts)
-    messages = response["messages"]
-    for msg in messages:
-        if msg.get("user") == user_id:
-            return msg.get("text")
-    return "User message not found."
+    cursor = None
+    while True:
+        response = client.conversations_replies(
+            channel=channel_id, ts=thread_ts, limit=THREAD_SCAN_PAGE_SIZE, cursor=cursor
+        )
+        for msg in response["messages"]:
+            if msg.get("user") == user_id:
+                return msg.get("text")
+        cursor = response.get("response_metadata", {}).get("next_cursor")
+        if not cursor:
+            return USER_MESSAGE_NOT_FOUND
+
+# Resume tickets queued before a restart; handlers above must exist before workers start
+if ticket_outbox is not None and ticket_outbox.has_due_work():
+    ticket_outbox.start()
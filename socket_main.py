@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import signal
+import threading
+import time
+import metrics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from slack_bolt.adapter.socket_mode import SocketModeHandler
+from slack_bolt.adapter.socket_mode.internals import run_bolt_app, send_response
+from slack_sdk.socket_mode.response import SocketModeResponse
+from slack_controller import handle_message_events, handle_feedback_actions, is_ignorable_event, task_queue
+from dedup import create_deduplicator, event_dedup_keys
+from warmup import WARMUP_CLIENTS, warm_up_clients
+from config import app
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Socket Mode runner for self-hosted deployments: one long-running process holds a WebSocket
+# connection to Slack (no public endpoint, no cold starts) and dispatches to the same handlers
+# as the Cloud Function in main.py.
+#   SLACK_APP_TOKEN=xapp-... python socket_main.py
+# SOCKET_MODE_WORKERS threads receive envelopes and run Bolt; the handlers' slow work runs on the
+# deferred task queue (DEFERRED_MAX_WORKERS), or on these threads with DEFERRED_PROCESSING=false.
+# Each process opens its own connection and Slack spreads events across up to 10 of them, so run
+# several processes to use more cores.
+SLACK_APP_TOKEN = os.environ.get("SLACK_APP_TOKEN")
+SOCKET_MODE_WORKERS = int(os.environ.get("SOCKET_MODE_WORKERS", 10))
+SOCKET_MODE_PING_INTERVAL = float(os.environ.get("SOCKET_MODE_PING_INTERVAL", 10))
+# Clients initialized before connecting (see warmup.py); WARMUP_CLIENTS overrides the default
+SOCKET_MODE_WARMUP_CLIENTS = WARMUP_CLIENTS or ["slack", "openai", "sheets"]
+# Health (/healthz) and metrics (/metrics) endpoints; 0 disables them
+HEALTH_PORT = int(os.environ.get("PORT", 8080))
+# Seconds to let accepted work finish after SIGTERM
+SHUTDOWN_GRACE_PERIOD = float(os.environ.get("SHUTDOWN_GRACE_PERIOD", 20))
+
+# Register event handlers
+handle_message_events(app)
+handle_feedback_actions(app)
+
+# Event deduplication (DEDUP_TTL, DEDUP_DB_PATH; see dedup.py)
+deduplicator = create_deduplicator()
+metrics.register_collector("dedup", deduplicator.stats)
+
+
+class BotSocketModeHandler(SocketModeHandler):
+    """
+    SocketModeHandler with the same pre-Bolt steps as main.slackbot: ignorable events and
+    redelivered duplicates are acked without dispatching them. Once draining, envelopes are
+    left unacked so Slack delivers them to another connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.draining = False
+        self._in_flight = 0
+        self._idle = threading.Condition()
+
+    def handle(self, client, req):
+        with self._idle:
+            if self.draining:
+                return
+            self._in_flight += 1
+        try:
+            self._handle(client, req)
+        finally:
+            with self._idle:
+                self._in_flight -= 1
+                self._idle.notify_all()
+
+    def drain(self, timeout):
+        """
+        Stops taking envelopes and waits up to timeout seconds for the ones being handled to be
+        acked, while the connection is still open. Returns False on timeout.
+        """
+        # The message processor only stops once the client is marked closed
+        self.client.auto_reconnect_enabled = False
+        self.client.closed = True
+        self.client.message_processor.shutdown()
+        with self._idle:
+            self.draining = True
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout)
+
+    def _handle(self, client, req):
+        start = time.time()
+        dedup_keys = []
+        try:
+            if req.type == "events_api":
+                # Ack events the bot ignores (thread replies, bot messages, joins...) without Bolt
+                if is_ignorable_event(req.payload):
+                    client.send_socket_mode_response(SocketModeResponse(envelope_id=req.envelope_id))
+                    return
+                dedup_keys = event_dedup_keys(req.payload)
+                if not deduplicator.is_new(dedup_keys):
+                    logger.info(f"Ignoring duplicate event {dedup_keys} (retry_attempt={req.retry_attempt})")
+                    client.send_socket_mode_response(SocketModeResponse(envelope_id=req.envelope_id))
+                    return
+
+            bolt_response = run_bolt_app(self.app, req)
+            if bolt_response.status >= 500:
+                deduplicator.forget(dedup_keys)
+            send_response(client, req, bolt_response, start)
+        except Exception as e:
+            logger.error(f"Error handling Socket Mode request: {e}")
+            deduplicator.forget(dedup_keys)
+
+    def stats(self):
+        return {"connected": int(self.client.is_connected()), "draining": int(self.draining)}
+
+
+def start_health_server(handler, port):
+    """
+    Serves /healthz (503 while disconnected or draining) and /metrics in a daemon thread.
+    """
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/healthz":
+                stats = dict(handler.stats(), task_queue=task_queue.stats())
+                healthy = stats["connected"] and not stats["draining"]
+                self._send(200 if healthy else 503, json.dumps(stats), "application/json")
+            elif self.path == "/metrics":
+                if metrics.registry.enabled:
+                    self._send(200, metrics.registry.render_prometheus(), "text/plain; version=0.0.4")
+                else:
+                    self._send(404, "Metrics are disabled; set METRICS_ENABLED=true.\n", "text/plain")
+            else:
+                self._send(404, "Not found\n", "text/plain")
+
+        def _send(self, status, text, content_type):
+            data = text.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), HealthHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="health-server", daemon=True).start()
+    return server
+
+
+def run():
+    if not SLACK_APP_TOKEN:
+        raise SystemExit("SLACK_APP_TOKEN (an app-level xapp- token) is required for Socket Mode.")
+
+    handler = BotSocketModeHandler(
+        app,
+        app_token=SLACK_APP_TOKEN,
+        ping_interval=SOCKET_MODE_PING_INTERVAL,
+        concurrency=SOCKET_MODE_WORKERS,
+    )
+    metrics.register_collector("socket_mode", handler.stats)
+    if HEALTH_PORT:
+        start_health_server(handler, HEALTH_PORT)
+    if metrics.registry.enabled and metrics.METRICS_LOG_INTERVAL > 0:
+        metrics.registry.start_log_exporter(metrics.METRICS_LOG_INTERVAL)
+
+    # Warm clients before taking traffic so the first events don't pay for initialization
+    warm_up_clients(SOCKET_MODE_WARMUP_CLIENTS).join()
+
+    shutdown_requested = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda signum, frame: shutdown_requested.set())
+
+    handler.connect()
+    logger.info(f"Socket Mode runner started with {SOCKET_MODE_WORKERS} workers.")
+    shutdown_requested.wait()
+
+    # Stop taking envelopes and let the ones being dispatched send their acks before
+    # disconnecting (an unacked envelope is redelivered), then drain deferred work.
+    # Sheets rows, the ticket outbox and the user snapshot are flushed by their atexit hooks.
+    logger.info("Shutting down: draining in-flight work.")
+    deadline = time.monotonic() + SHUTDOWN_GRACE_PERIOD
+    if not handler.drain(SHUTDOWN_GRACE_PERIOD):
+        logger.warning("Disconnecting with envelopes still being handled.")
+    handler.close()
+    if not task_queue.drain(max(deadline - time.monotonic(), 0)):
+        logger.warning("Shutting down with deferred tasks still in flight.")
+    logger.info("Socket Mode runner stopped.")
+
+
+if __name__ == "__main__":
+    run()
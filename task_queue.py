@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class InProcessTaskQueue:
+    """
+    Local task queue that runs deferred work on a bounded thread pool in this process.
+    Tasks are addressed by name with a JSON-serializable payload, so an external queue
+    (Cloud Tasks, Pub/Sub) can implement the same register/enqueue interface.
+    """
+
+    def __init__(self, max_workers=8, max_pending=100):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._handlers = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="deferred-task")
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._stats = {
+            "enqueued": 0,
+            "rejected": 0,
+            "completed": 0,
+            "failed": 0,
+            "total_wait_time": 0.0,
+            "max_wait_time": 0.0,
+            "total_run_time": 0.0,
+        }
+
+    def register(self, name, handler):
+        self._handlers[name] = handler
+
+    def enqueue(self, name, payload):
+        """
+        Schedules the named task. Returns False if the queue is full and the task was not accepted.
+        """
+        if name not in self._handlers:
+            raise KeyError(f"No handler registered for task '{name}'")
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            logger.warning(f"Task queue is full, rejecting task '{name}'.")
+            return False
+        with self._lock:
+            self._stats["enqueued"] += 1
+            self._in_flight += 1
+        self._executor.submit(self._run, name, payload, time.monotonic())
+        return True
+
+    def run(self, name, payload):
+        """
+        Runs the named task synchronously in the calling thread (e.g. when deferral is disabled).
+        """
+        self._handlers[name](payload)
+
+    def _run(self, name, payload, enqueued_at):
+        started = time.monotonic()
+        failed = False
+        try:
+            self._handlers[name](payload)
+        except Exception as e:
+            failed = True
+            logger.error(f"Deferred task '{name}' failed: {e}")
+        finally:
+            finished = time.monotonic()
+            self._slots.release()
+            with self._lock:
+                wait = started - enqueued_at
+                self._stats["failed" if failed else "completed"] += 1
+                self._stats["total_wait_time"] += wait
+                self._stats["max_wait_time"] = max(self._stats["max_wait_time"], wait)
+                self._stats["total_run_time"] += finished - started
+                self._in_flight -= 1
+                if self._in_flight == 0:
+                    self._idle.notify_all()
+
+    def drain(self, timeout=None):
+        """
+        Waits until every accepted task has finished. Returns False on timeout.
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = self._in_flight
+        return stats
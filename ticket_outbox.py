@@ -0,0 +1,256 @@
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+
+class RetryLater(Exception):
+    """
+    Raised by an outbox handler when the entry should be attempted again after a backoff.
+    """
+
+
+class TicketOutbox:
+    """
+    Durable queue of work that must eventually reach an unreliable upstream (Jira tickets).
+    Entries are stored in a SQLite database in WAL mode, keyed by an idempotency key, so a
+    repeated enqueue of the same intent is a no-op and queued work survives restarts.
+
+    A dispatcher thread claims due entries as workers free up (up to batch_size per transaction),
+    runs them on a pool of `workers` threads and records outcomes as they complete, so one slow
+    upstream call never holds back the other entries. A claimed entry is
+    leased for `lease` seconds; entries whose lease expired (the instance died while working on
+    them) are claimed again, so processing is at-least-once. An entry whose handler raises
+    RetryLater is retried with exponential backoff up to max_attempts; any other exception, or
+    running out of attempts, marks it failed and calls on_failure(payload, error).
+    """
+
+    def __init__(self, path, handler, on_failure=None, workers=4, batch_size=10, max_attempts=8,
+                 retry_base=5.0, retry_max=600.0, lease=300.0, poll_interval=5.0, retention=7 * 24 * 60 * 60):
+        self.path = path
+        self.handler = handler
+        self.on_failure = on_failure
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ticket_outbox ("
+            " idempotency_key TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt_at REAL NOT NULL,"
+            " lease_until REAL,"
+            " result TEXT,"
+            " last_error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ticket_outbox_due ON ticket_outbox (status, next_attempt_at)"
+        )
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+        self._last_purge = 0.0
+        self._stats = {"enqueued": 0, "duplicates": 0, "completed": 0, "retried": 0, "failed": 0, "batches": 0}
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ticket-outbox")
+                self._thread = threading.Thread(target=self._run, name="ticket-outbox-dispatcher", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, idempotency_key, payload):
+        """
+        Persists a unit of work and wakes the workers. Returns False if an entry with the same
+        idempotency key already exists (it is not queued again).
+        """
+        now = time.time()
+        with self._db_lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO ticket_outbox"
+                " (idempotency_key, payload, status, next_attempt_at, created_at, updated_at)"
+                " VALUES (?, ?, 'pending', ?, ?, ?)",
+                (idempotency_key, json.dumps(payload), now, now, now),
+            )
+        inserted = cursor.rowcount > 0
+        with self._lock:
+            self._stats["enqueued" if inserted else "duplicates"] += 1
+        if inserted:
+            self.start()
+            self._wakeup.set()
+        return inserted
+
+    def has_due_work(self):
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM ticket_outbox WHERE status IN ('pending', 'in_progress') LIMIT 1"
+            ).fetchone()
+        return row is not None
+
+    def _claim(self, limit):
+        """
+        Leases up to limit due entries: pending ones whose backoff has elapsed and
+        in-progress ones whose lease expired.
+        """
+        now = time.time()
+        with self._db_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT idempotency_key, payload, attempts FROM ticket_outbox"
+                    " WHERE (status = 'pending' AND next_attempt_at <= ?)"
+                    " OR (status = 'in_progress' AND lease_until <= ?)"
+                    " ORDER BY next_attempt_at LIMIT ?",
+                    (now, now, limit),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE ticket_outbox SET status = 'in_progress', lease_until = ?,"
+                    " attempts = attempts + 1, updated_at = ? WHERE idempotency_key = ?",
+                    [(now + self.lease, now, key) for key, _, _ in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [(key, json.loads(payload), attempts + 1) for key, payload, attempts in rows]
+
+    def _next_wait(self):
+        """
+        Seconds until the earliest pending entry is due, capped at poll_interval.
+        """
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM ticket_outbox WHERE status = 'pending'"
+            ).fetchone()
+        if row[0] is None:
+            return self.poll_interval
+        return min(max(row[0] - time.time(), 0.0), self.poll_interval)
+
+    def _process(self, key, payload, attempt):
+        try:
+            result = self.handler(payload)
+            return key, payload, attempt, "done", result, None
+        except RetryLater as e:
+            if attempt < self.max_attempts:
+                return key, payload, attempt, "retry", None, e
+            return key, payload, attempt, "failed", None, e
+        except Exception as e:
+            logger.error(f"Outbox entry {key} failed: {e}")
+            return key, payload, attempt, "failed", None, e
+
+    def _record(self, outcomes):
+        now = time.time()
+        updates = []
+        for key, _, attempt, outcome, result, error in outcomes:
+            if outcome == "done":
+                updates.append(("done", now, json.dumps(result), None, now, key))
+            elif outcome == "retry":
+                delay = random.uniform(0.5, 1.0) * min(self.retry_max, self.retry_base * 2 ** (attempt - 1))
+                updates.append(("pending", now + delay, None, str(error), now, key))
+            else:
+                updates.append(("failed", now, None, str(error), now, key))
+        with self._db_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "UPDATE ticket_outbox SET status = ?, next_attempt_at = ?, lease_until = NULL,"
+                    " result = ?, last_error = ?, updated_at = ? WHERE idempotency_key = ?",
+                    updates,
+                )
+                if now - self._last_purge > 60 * 60:
+                    self._conn.execute(
+                        "DELETE FROM ticket_outbox WHERE status IN ('done', 'failed') AND updated_at < ?",
+                        (now - self.retention,),
+                    )
+                    self._last_purge = now
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        with self._lock:
+            self._stats["batches"] += 1
+            for _, _, _, outcome, _, _ in outcomes:
+                self._stats[{"done": "completed", "retry": "retried", "failed": "failed"}[outcome]] += 1
+
+    def _finish(self, outcomes):
+        self._record(outcomes)
+        for key, payload, _, outcome, _, error in outcomes:
+            if outcome == "failed" and self.on_failure is not None:
+                try:
+                    self.on_failure(payload, error)
+                except Exception as e:
+                    logger.error(f"Error handling failed outbox entry {key}: {e}")
+
+    def _run(self):
+        running = set()
+        while not self._stop.is_set():
+            try:
+                done = {future for future in running if future.done()}
+                if done:
+                    running -= done
+                    self._finish([future.result() for future in done])
+
+                # Claim only what free workers can start now; the rest stays claimable elsewhere
+                free = self.workers - len(running)
+                batch = self._claim(min(self.batch_size, free)) if free > 0 else []
+                for entry in batch:
+                    future = self._executor.submit(self._process, *entry)
+                    future.add_done_callback(lambda _: self._wakeup.set())
+                    running.add(future)
+
+                if not batch and not done:
+                    # Woken by a new entry or a finished one
+                    self._wakeup.wait(self._next_wait() if free > 0 else self.poll_interval)
+                    self._wakeup.clear()
+            except Exception as e:
+                logger.error(f"Ticket outbox dispatcher error: {e}")
+                self._stop.wait(self.poll_interval)
+
+        # Record the entries still being worked on; unrecorded ones are claimed again after their lease
+        if running:
+            wait(running)
+            try:
+                self._finish([future.result() for future in running])
+            except Exception as e:
+                logger.error(f"Ticket outbox dispatcher error: {e}")
+
+    def shutdown(self, timeout=10):
+        """
+        Stops claiming new work and waits for the entries being worked on. Unfinished entries
+        stay queued.
+        """
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        with self._db_lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM ticket_outbox GROUP BY status").fetchall()
+        for status in ("pending", "in_progress", "done", "failed"):
+            stats[status] = 0
+        stats.update(dict(rows))
+        return stats
@@ -0,0 +1,187 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+UserProfile = namedtuple("UserProfile", ["email", "name", "jira_account_id"])
+UserProfile.__new__.__defaults__ = (None,)
+
+
+def profile_from_slack_user(user):
+    """
+    Builds a UserProfile from a Slack user object (users.info / users.list).
+    """
+    profile = user.get("profile", {})
+    name = profile.get("real_name") or profile.get("display_name") or user.get("id")
+    return UserProfile(profile.get("email"), name)
+
+
+class UserDirectory:
+    """
+    Cache of Slack user profiles (email and name), bounded by size and TTL.
+    A miss falls back to users.info; prewarm() loads every user with paged users.list calls.
+    With a snapshot_path, the directory is saved as gzipped JSON so cold starts skip the API.
+    The Jira account ID resolved for a user is kept alongside, so it survives restarts too.
+    """
+
+    def __init__(self, maxsize=5000, ttl=24 * 60 * 60, snapshot_path=None):
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        # Values are (UserProfile, fetched_at), so snapshot entries keep their original expiry
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "api_calls": 0, "prewarmed": 0}
+        if snapshot_path:
+            self.load_snapshot()
+
+    def get(self, client, user_id):
+        """
+        Returns the UserProfile for user_id, calling users.info on a miss.
+        """
+        entry = self._cache.get(user_id)
+        if entry is not None:
+            self._count("hits")
+            return entry[0]
+        self._count("misses")
+        self._count("api_calls")
+        user_info = client.users_info(user=user_id)
+        profile = profile_from_slack_user(user_info.get("user", {}) or {"id": user_id})
+        # Users without a visible email are not cached, so a fixed profile is picked up
+        if profile.email:
+            self._cache.set(user_id, (profile, time.time()))
+        return profile
+
+    async def get_async(self, client, user_id):
+        """
+        get() for an AsyncWebClient: awaits users.info on a miss.
+        """
+        entry = self._cache.get(user_id)
+        if entry is not None:
+            self._count("hits")
+            return entry[0]
+        self._count("misses")
+        self._count("api_calls")
+        user_info = await client.users_info(user=user_id)
+        profile = profile_from_slack_user(user_info.get("user", {}) or {"id": user_id})
+        if profile.email:
+            self._cache.set(user_id, (profile, time.time()))
+        return profile
+
+    def peek(self, user_id):
+        """
+        Returns the cached UserProfile for user_id, or None, without calling Slack.
+        """
+        entry = self._cache.get(user_id)
+        return entry[0] if entry is not None else None
+
+    def set_jira_account_id(self, user_id, account_id):
+        """
+        Records the Jira account ID for a cached user without extending the profile's expiry.
+        """
+        entry = self._cache.get(user_id)
+        if entry is None or entry[0].jira_account_id == account_id:
+            return
+        profile, fetched_at = entry
+        remaining = fetched_at + self.ttl - time.time()
+        if remaining > 0:
+            self._cache.set(user_id, (profile._replace(jira_account_id=account_id), fetched_at), ttl=remaining)
+
+    def forget_jira_account_id(self, email):
+        """
+        Drops the Jira account ID recorded for users with the given email, e.g. after Jira
+        rejected it as stale, so the next ticket looks it up again.
+        """
+        for user_id, (profile, _) in self._cache.items():
+            if profile.email == email and profile.jira_account_id is not None:
+                self.set_jira_account_id(user_id, None)
+
+    def prewarm(self, client, page_size=200):
+        """
+        Loads all active users with paged users.list calls and saves a snapshot.
+        Returns the number of profiles loaded.
+        """
+        loaded = 0
+        cursor = None
+        while True:
+            self._count("api_calls")
+            response = client.users_list(limit=page_size, cursor=cursor)
+            now = time.time()
+            for user in response.get("members", []):
+                if user.get("deleted") or user.get("is_bot"):
+                    continue
+                profile = profile_from_slack_user(user)
+                if not profile.email:
+                    continue
+                previous = self._cache.get(user["id"])
+                if previous is not None and previous[0].email == profile.email:
+                    profile = profile._replace(jira_account_id=previous[0].jira_account_id)
+                self._cache.set(user["id"], (profile, now))
+                loaded += 1
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                break
+        with self._lock:
+            self._stats["prewarmed"] += loaded
+        logger.info(f"Prewarmed user directory with {loaded} profiles.")
+        self.save_snapshot()
+        return loaded
+
+    def load_snapshot(self):
+        """
+        Loads unexpired profiles from the snapshot file. Returns the number loaded.
+        """
+        try:
+            with gzip.open(self.snapshot_path, "rt", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading user directory snapshot {self.snapshot_path}: {e}")
+            return 0
+
+        now = time.time()
+        loaded = 0
+        for user_id, (email, name, jira_account_id, fetched_at) in snapshot.get("users", {}).items():
+            remaining = fetched_at + self.ttl - now
+            if remaining <= 0:
+                continue
+            self._cache.set(user_id, (UserProfile(email, name, jira_account_id), fetched_at), ttl=remaining)
+            loaded += 1
+        logger.info(f"Loaded {loaded} user profiles from {self.snapshot_path}.")
+        return loaded
+
+    def save_snapshot(self):
+        """
+        Writes the cached profiles to the snapshot file, replacing it atomically.
+        """
+        if not self.snapshot_path:
+            return
+        users = {
+            user_id: [profile.email, profile.name, profile.jira_account_id, fetched_at]
+            for user_id, (profile, fetched_at) in self._cache.items()
+        }
+        tmp_path = f"{self.snapshot_path}.tmp"
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump({"users": users}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.error(f"Error writing user directory snapshot {self.snapshot_path}: {e}")
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["size"] = len(self._cache)
+        return stats
@@ -8,10 +8,12 @@ from flask import Request
 logger = logging.getLogger(__name__)
 
 SLACK_SIGNING_SECRET = os.environ["SLACK_SIGNING_SECRET"]
+_SIGNING_KEY = SLACK_SIGNING_SECRET.encode("utf-8")
 
-def verify_slack_request(request: Request):
+def verify_slack_request(request: Request, body: bytes = None):
     """
     Verifies the incoming Slack request using the signing secret.
+    The signature is computed over the raw body bytes; pass them in if already read.
     """
     try:
         timestamp = request.headers.get("X-Slack-Request-Timestamp")
@@ -23,12 +25,10 @@ def verify_slack_request(request: Request):
             return False
 
         # Create the signature base string
-        sig_basestring = f"v0:{timestamp}:{request.get_data(as_text=True)}"
-        hashed = hmac.new(
-            SLACK_SIGNING_SECRET.encode("utf-8"),
-            sig_basestring.encode("utf-8"),
-            hashlib.sha256,
-        ).hexdigest()
+        if body is None:
+            body = request.get_data()
+        sig_basestring = b"v0:" + timestamp.encode("ascii") + b":" + body
+        hashed = hmac.new(_SIGNING_KEY, sig_basestring, hashlib.sha256).hexdigest()
 
         # Compare the computed signature with Slack's signature
         computed_signature = f"v0={hashed}"
@@ -36,7 +36,7 @@ def verify_slack_request(request: Request):
             logger.warning("Invalid Slack signature. Verification failed.")
             return False
 
-        logger.info("Slack request verification successful.")
+        logger.debug("Slack request verification successful.")
         return True
     except Exception as e:
         logger.error(f"Error verifying Slack request: {e}")
@@ -0,0 +1,37 @@
+import logging
+import os
+import threading
+from slack_controller import user_directory
+from ai_controller import get_openai
+from sheet_controller import initialize_service
+from config import get_bot_user_id, slack_client
+
+logger = logging.getLogger(__name__)
+
+# Clients warmed in a background thread at cold start, e.g. WARMUP_CLIENTS="slack,openai".
+# "users" loads the whole Slack user directory with paged users.list calls.
+# Everything else is initialized lazily by the first request that needs it.
+WARMUP_CLIENTS = [
+    name.strip() for name in os.environ.get("WARMUP_CLIENTS", "").split(",") if name.strip()
+]
+CLIENT_INITIALIZERS = {
+    "slack": get_bot_user_id,
+    "openai": get_openai,
+    "sheets": initialize_service,
+    "users": lambda: user_directory.prewarm(slack_client),
+}
+
+def warm_up_clients(names):
+    """
+    Initializes the named clients in a daemon thread without blocking the caller.
+    """
+    def task():
+        for name in names:
+            try:
+                CLIENT_INITIALIZERS[name]()
+            except Exception as e:
+                logger.error(f"Error warming up client '{name}': {e}")
+
+    thread = threading.Thread(target=task, name="client-warmup", daemon=True)
+    thread.start()
+    return thread